@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Synthetic recipe catalogs for load testing
+
+Generates a deterministic catalog (same --seed, same recipes) and loads it
+through the normal write path helpers, so derived fields, tag counters and
+indexes match production. Use a dedicated database per catalog size.
+
+Usage (from the backend directory, against a local mongod):
+    python -m benchmarks.datagen --recipes 1000 --db gutwise_bench_1k --drop
+    python -m benchmarks.datagen --recipes 100000 --db gutwise_bench_100k --drop
+    python -m benchmarks.datagen --recipes 1000000 --db gutwise_bench_1m --drop
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DIETARY_TAGS = ["gluten-free", "dairy-free", "low-fodmap", "vegan", "paleo", "keto"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+# Vocabulary shared with the load scenarios so searches and filters hit real data
+PROTEINS = ["chicken", "salmon", "turkey", "tofu", "lentil", "egg", "beef", "cod", "tempeh", "shrimp"]
+VEGETABLES = ["carrot", "zucchini", "spinach", "kale", "sweet potato", "pumpkin", "fennel",
+              "bok choy", "green bean", "parsnip", "cucumber", "bell pepper"]
+GRAINS = ["jasmine rice", "quinoa", "oat", "millet", "buckwheat", "rice noodle", "polenta"]
+FLAVOURS = ["ginger", "turmeric", "lemon", "basil", "cumin", "coconut milk", "miso", "parsley", "mint"]
+DISHES = ["bowl", "soup", "stew", "porridge", "salad", "curry", "bake", "broth", "stir-fry", "skillet"]
+ADJECTIVES = ["gentle", "soothing", "simple", "warming", "healing", "light", "hearty", "fresh"]
+SEARCH_TERMS = PROTEINS + [dish for dish in DISHES if dish != "stir-fry"] + ["ginger", "turmeric", "quinoa"]
+
+
+def generate_recipes(count: int, seed: int = 42, start: int = 0) -> Iterator[dict]:
+    """Yield RecipeCreate-shaped recipes with stable ids bench-<n>"""
+    rng = random.Random(seed + start)
+    for index in range(start, start + count):
+        protein = rng.choice(PROTEINS)
+        vegetables = rng.sample(VEGETABLES, rng.randint(1, 3))
+        grain = rng.choice(GRAINS)
+        flavours = rng.sample(FLAVOURS, rng.randint(1, 3))
+        dish = rng.choice(DISHES)
+        title = f"{rng.choice(ADJECTIVES).title()} {protein.title()} and {vegetables[0].title()} {dish.title()}"
+
+        ingredients = [f"{rng.randint(1, 4)} cups {grain}", f"{rng.randint(200, 600)}g {protein}"]
+        ingredients += [f"{rng.randint(1, 3)} cups {vegetable}, chopped" for vegetable in vegetables]
+        ingredients += [f"1 tsp {flavour}" for flavour in flavours]
+        yield {
+            "id": f"bench-{index}",
+            "title": title,
+            "description": f"A {dish} of {protein}, {', '.join(vegetables)} and {grain}, seasoned with {' and '.join(flavours)}.",
+            "image": f"https://images.example.com/recipes/{index % 500}.jpg",
+            "prep_time": f"{rng.choice([5, 10, 15, 20, 30])} min",
+            "cook_time": rng.choice([f"{rng.choice([10, 20, 25, 35, 45])} min", f"{rng.randint(1, 4)} hours"]),
+            "servings": rng.randint(1, 6),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "dietary_tags": sorted(rng.sample(DIETARY_TAGS, rng.randint(1, 4))),
+            "ingredients": ingredients,
+            "instructions": [f"Step {step}: prepare the {rng.choice(vegetables)}." for step in range(1, rng.randint(4, 9))],
+            "story": f"Batch {index // 1000} of the synthetic catalog.",
+        }
+
+
+def batched(items: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def insert_catalog(count: int, seed: int, batch_size: int) -> int:
+    """Insert the generated recipes through the server's write path helpers"""
+    from server import build_recipe, store
+
+    started = time.perf_counter()
+    inserted = 0
+    for batch in batched(generate_recipes(count, seed), batch_size):
+        failed = await store.insert_recipes([build_recipe(item).dict() for item in batch])
+        inserted += len(batch) - len(failed)
+        if inserted % (batch_size * 20) == 0:
+            print(f"  {inserted}/{count} recipes ({inserted / (time.perf_counter() - started):.0f}/s)")
+    return inserted
+
+
+async def load_catalog(count: int, seed: int, batch_size: int, drop: bool):
+    """Insert the catalog, then build counters, indexes and derived tables like startup does"""
+    from server import SIMILARITY_MODEL_ID, rebuild_tag_counts, seed_database, store
+
+    try:
+        if drop:
+            await store.drop()
+
+        started = time.perf_counter()
+        inserted = await insert_catalog(count, seed, batch_size)
+
+        # A non-empty catalog is not re-seeded; this adds the story and the indexes, and
+        # rebuilds the similar-recipe table unless the catalog is too large for it
+        await store.delete_marker(SIMILARITY_MODEL_ID)
+        await seed_database()
+        await rebuild_tag_counts()
+        print(f"Loaded {inserted} recipes into {store.name} in {time.perf_counter() - started:.1f}s")
+    finally:
+        store.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic recipe catalog")
+    parser.add_argument("--recipes", type=int, default=1000, help="Catalog size (e.g. 1000, 100000, 1000000)")
+    parser.add_argument("--db", required=True, help="Database to load into (dedicated to benchmarks)")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same catalog")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Recipes per insert batch")
+    parser.add_argument("--drop", action="store_true", help="Drop the database first")
+    args = parser.parse_args()
+
+    # server reads its connection settings at import time
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db
+    asyncio.run(load_catalog(args.recipes, args.seed, args.batch_size, args.drop))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
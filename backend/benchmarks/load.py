@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the recipe API
+
+Drives the FastAPI app in-process through httpx's ASGI transport (or a
+running server with --url) with concurrent async clients, one scenario at a
+time, and reports p50/p95/p99 latency, throughput, errors and peak memory.
+Results can be saved as a baseline and later runs compared against it, so a
+regression fails the run before deploy.
+
+Usage (from the backend directory, after loading a catalog with benchmarks.datagen):
+    python -m benchmarks.load --db gutwise_bench_100k --save-baseline baseline-100k.json
+    python -m benchmarks.load --db gutwise_bench_100k --baseline baseline-100k.json
+    python -m benchmarks.load --db gutwise_bench_1k --scenarios list,detail --concurrency 64
+    python -m benchmarks.load --engine memory --recipes 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.datagen import DIETARY_TAGS, SEARCH_TERMS, generate_recipes, insert_catalog  # noqa: E402
+
+# A scenario issues one request with the shared client and returns the response
+Scenario = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+# Metrics compared against the baseline, and whether higher is better
+COMPARED_METRICS = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "requests_per_second": True}
+
+
+class Workload:
+    """Request generators for each scenario, fed with ids sampled from the catalog"""
+
+    def __init__(self, recipe_ids: List[str]):
+        self.recipe_ids = recipe_ids
+
+    async def list(self, client, rng):
+        return await client.get("/api/recipes", params={"view": "summary", "limit": 20})
+
+    async def search(self, client, rng):
+        return await client.get("/api/recipes", params={"search": rng.choice(SEARCH_TERMS), "limit": 20, "view": "summary"})
+
+    async def tag_filter(self, client, rng):
+        tags = ",".join(rng.sample(DIETARY_TAGS, rng.randint(1, 2)))
+        return await client.get("/api/recipes", params={"dietary_tags": tags, "limit": 20, "view": "summary"})
+
+    async def detail(self, client, rng):
+        return await client.get(f"/api/recipes/{rng.choice(self.recipe_ids)}")
+
+    async def filters(self, client, rng):
+        return await client.get("/api/dietary-filters")
+
+    async def create(self, client, rng):
+        recipe = next(generate_recipes(1, seed=rng.randint(0, 1 << 30)))
+        recipe.pop("id")
+        return await client.post("/api/recipes", json=recipe)
+
+    def scenarios(self) -> Dict[str, Scenario]:
+        return {
+            "list": self.list,
+            "search": self.search,
+            "tag_filter": self.tag_filter,
+            "detail": self.detail,
+            "filters": self.filters,
+            "create": self.create,
+        }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def peak_rss_mib() -> float:
+    """Peak resident memory of this process (the app too when running in-process)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, scenario: Scenario,
+                       concurrency: int, requests: int, seed: int) -> dict:
+    """Run a fixed number of requests with the given number of concurrent workers"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker(worker_id: int):
+        nonlocal remaining, errors
+        rng = random.Random(seed * 1000 + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, rng)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+    }
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Describe every metric that is worse than the baseline by more than the tolerance"""
+    previous = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before[metric], result[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{result['scenario']} {metric}: {old} -> {new} ({change:+.0%})")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{result['scenario']} errors: {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def print_results(results: List[dict]):
+    print(f"{'scenario':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MiB':>10}")
+    for result in results:
+        print(
+            f"{result['scenario']:<12}{result['requests']:>10}{result['errors']:>8}{result['requests_per_second']:>10.1f}"
+            f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['peak_rss_mib']:>10.1f}"
+        )
+
+
+async def sample_recipe_ids(client: httpx.AsyncClient, size: int) -> List[str]:
+    """Recipe ids to request in the detail scenario"""
+    ids = []
+    cursor = None
+    while len(ids) < size:
+        params = {"view": "summary", "limit": 100, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/recipes", params=params)
+        response.raise_for_status()
+        ids += [recipe["id"] for recipe in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    return ids
+
+
+async def run(args) -> int:
+    server = None
+    if args.url:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+        base_url = args.url
+    else:
+        import server
+        if args.engine == "memory":
+            # The in-process database starts empty, so generate the catalog into it
+            await insert_catalog(args.recipes, args.seed, batch_size=5000)
+        # Worker startup, finished before the timed run begins
+        await server.seed_database()
+        await server.rebuild_suggestions()
+        transport = httpx.ASGITransport(app=server.app)
+        base_url = "http://benchmark"
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=30) as client:
+            workload = Workload(await sample_recipe_ids(client, 1000))
+            scenarios = workload.scenarios()
+            selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+            unknown = set(selected) - set(scenarios)
+            if unknown:
+                print(f"Unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(scenarios)})")
+                return 2
+
+            results = []
+            for name in selected:
+                # Warm caches and connection pools before timing
+                await run_scenario(client, name, scenarios[name], args.concurrency, args.warmup, args.seed)
+                results.append(await run_scenario(
+                    client, name, scenarios[name], args.concurrency, args.requests, args.seed
+                ))
+    finally:
+        if server is not None:
+            await asyncio.gather(*server.background_tasks)
+            await server.shutdown_db_client()
+
+    print(f"{args.requests} requests per scenario, concurrency {args.concurrency}, "
+          f"{'url ' + args.url if args.url else f'in-process, {args.engine} db ' + os.environ['DB_NAME']}")
+    print_results(results)
+
+    report = {
+        "target": args.url or f"{args.engine}:{os.environ['DB_NAME']}",
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the recipe API")
+    parser.add_argument("--db", help="Benchmark database for in-process runs (see benchmarks.datagen)")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--engine", choices=["mongodb", "memory"], default="mongodb",
+                        help="Storage engine for in-process runs; memory needs no mongod")
+    parser.add_argument("--recipes", type=int, default=1000, help="Catalog size generated for --engine memory")
+    parser.add_argument("--url", help="Load test a running server instead, e.g. http://localhost:8001")
+    parser.add_argument("--scenarios", help="Comma-separated subset of: list, search, tag_filter, detail, filters, create")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="Timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="Untimed requests per scenario")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for request parameters")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache (in-process runs)")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a saved baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    if not args.url:
+        if not args.db and args.engine == "mongodb":
+            parser.error("--db is required unless --url or --engine memory is given")
+        # server reads its settings at import time
+        os.environ["STORAGE_ENGINE"] = args.engine
+        os.environ["MONGO_URL"] = args.mongo_url
+        os.environ["DB_NAME"] = args.db or f"gutwise_bench_memory_{args.recipes}"
+        if args.no_cache:
+            os.environ["CACHE_TTL_SECONDS"] = "0"
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for recipe list responses
+
+Compares the default path (rebuild each Recipe model, then jsonable_encoder and
+json.dumps) with the FAST_RESPONSES path (orjson over the projected documents).
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization [--recipes 1000] [--rounds 20]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "gutwise_benchmark")
+
+from responses import dumps_json, orjson  # noqa: E402
+from server import RECIPE_PROJECTION, SEED_RECIPES, Recipe  # noqa: E402
+
+
+def synthetic_documents(count: int) -> list:
+    """Recipe documents shaped like a projected MongoDB read"""
+    documents = []
+    for index in range(count):
+        seed = SEED_RECIPES[index % len(SEED_RECIPES)]
+        recipe = Recipe(**{**seed, "id": f"bench-{index}"}).dict()
+        # MongoDB stores datetimes with millisecond precision
+        for field in ("created_at", "updated_at"):
+            value: datetime = recipe[field]
+            recipe[field] = value.replace(microsecond=value.microsecond // 1000 * 1000)
+        documents.append({field: recipe[field] for field in RECIPE_PROJECTION if field in recipe})
+    return documents
+
+
+def default_path(documents: list) -> bytes:
+    return dumps_json([Recipe(**document) for document in documents])
+
+
+def fast_path(documents: list) -> bytes:
+    return dumps_json(documents, fast=True)
+
+
+def measure(name: str, render, documents: list, rounds: int) -> dict:
+    """Time a rendering path and record its peak allocation"""
+    render(documents)  # warm up
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render(documents)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    render(documents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "median_ms": median * 1000,
+        "best_ms": min(timings) * 1000,
+        "recipes_per_second": len(documents) / median,
+        "peak_kib": peak / 1024,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark recipe list serialization")
+    parser.add_argument("--recipes", type=int, default=1000, help="Recipes per response")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per path")
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed; the fast path would fall back to json.dumps")
+        return 1
+
+    documents = synthetic_documents(args.recipes)
+
+    if json.loads(default_path(documents)) != json.loads(fast_path(documents)):
+        print("WARNING: default and fast paths produced different JSON")
+
+    results = [
+        measure("default (models + json)", default_path, documents, args.rounds),
+        measure("fast (documents + orjson)", fast_path, documents, args.rounds),
+    ]
+
+    print(f"{args.recipes} recipes per response, {args.rounds} rounds")
+    print(f"{'path':<28}{'median ms':>12}{'best ms':>12}{'recipes/s':>14}{'peak KiB':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<28}{result['median_ms']:>12.2f}{result['best_ms']:>12.2f}"
+            f"{result['recipes_per_second']:>14.0f}{result['peak_kib']:>12.0f}"
+        )
+    speedup = results[0]["median_ms"] / results[1]["median_ms"]
+    print(f"fast path speedup: {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
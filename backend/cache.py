@@ -0,0 +1,188 @@
+"""
+In-process response cache for the hot read endpoints
+
+Entries are keyed by tuples whose first element is a namespace
+("recipe", "recipes", ...), so writes can drop exactly the families of
+responses they affect. SingleFlight uses the same keys to coalesce
+concurrent misses, so a burst of identical requests runs one query.
+Every invalidation bumps its namespace's generation; a load that read the
+generation before querying passes it to set(), which drops the value if a
+write invalidated the namespace meanwhile, so a slow read cannot put data
+from before the write back into the cache.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """Size-bounded LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+
+    def generation(self, namespace: Hashable) -> int:
+        """Current generation of a namespace, to read before loading a value for it"""
+        return self._generations.get(namespace, 0)
+
+    def _bump(self, namespace: Hashable):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, generation: Optional[int] = None):
+        """Store a value, evicting the least recently used entries when full
+
+        With a generation, the value is dropped if the key's namespace has been
+        invalidated since that generation was read.
+        """
+        if generation is not None and generation != self.generation(key[0]):
+            self.stale_writes += 1
+            return
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Tuple[Hashable, ...]):
+        """Drop a single entry"""
+        # Loads in flight for any key of the namespace may predate the write
+        self._bump(key[0])
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_namespace(self, namespace: str):
+        """Drop every entry whose key starts with the given namespace"""
+        self._bump(namespace)
+        stale = [key for key in self._entries if key[0] == namespace]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop every entry"""
+        for namespace in {key[0] for key in self._entries} | set(self._generations):
+            self._bump(namespace)
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters used to size the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes,
+        }
+
+
+class NullCache(ResponseCache):
+    """Drop-in cache that never stores anything, used when caching is disabled"""
+
+    def __init__(self):
+        super().__init__(max_entries=0, ttl=0)
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, generation=None):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["enabled"] = False
+        return stats
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers with the same key"""
+
+    def __init__(self):
+        self._calls: Dict[Tuple, "asyncio.Task"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Tuple[Hashable, ...], compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the in-flight call for this key, starting one if there is none"""
+        task = self._calls.get(key)
+        if task is None:
+            # A task, so one caller disconnecting doesn't cancel the work for the rest
+            task = asyncio.ensure_future(compute())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Tuple, task: "asyncio.Task"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark failures as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def forget_namespace(self, namespace: str):
+        """Let later callers start fresh computations after a write; running ones finish as-is"""
+        for key in [key for key in self._calls if key[0] == namespace]:
+            del self._calls[key]
+
+    def clear(self):
+        """Let later callers start fresh computations for every key"""
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters showing how much duplicate work was avoided"""
+        requests = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+        }
+
+
+def build_cache(max_entries: int, ttl: float) -> ResponseCache:
+    """Create the configured cache, or a NullCache when size or TTL is zero"""
+    if max_entries <= 0 or ttl <= 0:
+        return NullCache()
+    return ResponseCache(max_entries=max_entries, ttl=ttl)
@@ -0,0 +1,273 @@
+"""
+Negotiated response compression
+
+CompressionMiddleware compresses responses with the best codec both sides
+support: zstd and brotli when their optional packages are installed, gzip
+always. Responses below the size threshold, already encoded (precompressed
+static files, export?compress=true), bodiless or of binary content types
+pass through untouched. Streamed responses (the NDJSON export) are
+compressed chunk by chunk with a flush after each, so clients still receive
+every batch as it is produced. Rendered JSON responses are compressed by
+conditional_response through the responder left in the scope, which stores
+the result with the rendered body so cache hits reuse it. Every response of
+a compressible type carries Vary: Accept-Encoding, compressed or not. Bytes
+in, bytes out and CPU time are counted per route and encoding to tune levels
+against bandwidth.
+"""
+
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from monitoring import (
+    HTTP_COMPRESSION_BYTES_IN, HTTP_COMPRESSION_BYTES_OUT, HTTP_COMPRESSION_CPU, HTTP_COMPRESSION_SKIPPED,
+    route_label,
+)
+from responses import COMPRESSION_SCOPE_KEY, RenderedResponse, accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is an optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is an optional codec
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                      "application/xml", "image/svg+xml", "application/manifest+json")
+# Server-sent events must reach the client unbuffered
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class GzipCodec:
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def compressor(self):
+        return _ZlibStream(zlib.compressobj(self.level, zlib.DEFLATED, 31))
+
+
+class _ZlibStream:
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush()
+
+
+class BrotliCodec:
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self.quality = quality
+
+    def compressor(self):
+        return _BrotliStream(brotli.Compressor(quality=self.quality))
+
+
+class _BrotliStream:
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdCodec:
+    encoding = "zstd"
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def compressor(self):
+        return _ZstdStream(zstandard.ZstdCompressor(level=self.level).compressobj())
+
+
+class _ZstdStream:
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush()
+
+
+def available_codecs(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> list:
+    """Installed codecs in order of preference"""
+    codecs = []
+    if zstandard is not None:
+        codecs.append(ZstdCodec(zstd_level))
+    if brotli is not None:
+        codecs.append(BrotliCodec(brotli_quality))
+    codecs.append(GzipCodec(gzip_level))
+    return codecs
+
+
+def _header(headers: List, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _with_vary(headers: List) -> List:
+    """Headers with Accept-Encoding added to Vary"""
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return [*headers, (b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return [(key, value) for key, value in headers if key.lower() != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the client's best supported encoding"""
+
+    def __init__(self, app, minimum_size: int = 1024, codecs: Optional[list] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.codecs = codecs if codecs is not None else available_codecs()
+
+    def negotiate(self, scope) -> Optional[object]:
+        accept_encoding = b""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value
+                break
+        if not accept_encoding:
+            return None
+        accepted = accepted_encodings(accept_encoding.decode("latin-1"))
+        for codec in self.codecs:
+            if codec.encoding in accepted:
+                return codec
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Also without a codec, to mark compressible responses with Vary
+        await CompressedResponder(self.app, self.negotiate(scope), self.minimum_size)(scope, receive, send)
+
+
+class CompressedResponder:
+    """Per-request state: holds the response start until the first body chunk decides"""
+
+    def __init__(self, app, codec, minimum_size: int):
+        self.app = app
+        self.codec = codec
+        self.minimum_size = minimum_size
+        self.scope = None
+        self.send = None
+        self.start_message: Optional[Dict] = None
+        self.compressor = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    async def __call__(self, scope, receive, send):
+        self.scope = scope
+        self.send = send
+        scope[COMPRESSION_SCOPE_KEY] = self
+        await self.app(scope, receive, self.send_wrapper)
+
+    def encode_rendered(self, rendered: RenderedResponse) -> Optional[Tuple[str, bytes]]:
+        """A rendered body in the negotiated encoding, or None if it goes out as is"""
+        if self.codec is None or rendered.encoded is None or len(rendered.body) < self.minimum_size:
+            return None
+        encoding = self.codec.encoding
+        body = rendered.encoded.get(encoding)
+        if body is None:
+            started = time.thread_time()
+            body = self.codec.compressor().finish(rendered.body)
+            route = route_label(self.scope)
+            HTTP_COMPRESSION_CPU.labels(route, encoding).inc(time.thread_time() - started)
+            HTTP_COMPRESSION_BYTES_IN.labels(route, encoding).inc(len(rendered.body))
+            HTTP_COMPRESSION_BYTES_OUT.labels(route, encoding).inc(len(body))
+            rendered.encoded[encoding] = body
+        return encoding, body
+
+    def skip_reason(self, message: Dict) -> Optional[str]:
+        """Why a response should go out as is, judged from its start message and first chunk"""
+        headers = self.start_message["headers"]
+        if _header(headers, b"content-encoding") is not None:
+            return "encoded"
+        if self.start_message["status"] < 200 or self.start_message["status"] in (204, 304):
+            return "no_body"
+        content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSED_TYPES):
+            return "content_type"
+        if self.codec is None:
+            return "not_accepted"
+        if not message.get("more_body", False) and len(message.get("body", b"")) < self.minimum_size:
+            return "too_small"
+        return None
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        started = time.thread_time()
+        output = self.compressor.finish(body) if final else self.compressor.compress(body)
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(output)
+        return output
+
+    async def send_wrapper(self, message: Dict):
+        if message["type"] == "http.response.start":
+            # Wait for the first body chunk before choosing between compressed and as-is
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        final = not message.get("more_body", False)
+        if self.compressor is None:
+            reason = self.skip_reason(message)
+            if reason is not None:
+                self.passthrough = True
+                HTTP_COMPRESSION_SKIPPED.labels(route_label(self.scope), reason).inc()
+                start = self.start_message
+                if reason in ("not_accepted", "too_small"):
+                    # Other clients or bodies at this URL are compressed, so shared caches must key on it
+                    start = {**start, "headers": _with_vary(start["headers"])}
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = self.codec.compressor()
+            headers = [
+                (key, value) for key, value in self.start_message["headers"]
+                if key.lower() not in (b"content-length", b"etag")
+            ]
+            etag = _header(self.start_message["headers"], b"etag")
+            if etag is not None:
+                # The encoded bytes differ, so the validator can only be weak
+                headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+            headers.append((b"content-encoding", self.codec.encoding.encode()))
+            headers = _with_vary(headers)
+            body = self._compress(message.get("body", b""), final)
+            if final:
+                headers.append((b"content-length", str(len(body)).encode()))
+            await self.send({**self.start_message, "headers": headers})
+        else:
+            body = self._compress(message.get("body", b""), final)
+
+        await self.send({"type": "http.response.body", "body": body, "more_body": not final})
+        if final:
+            route = route_label(self.scope)
+            HTTP_COMPRESSION_BYTES_IN.labels(route, self.codec.encoding).inc(self.bytes_in)
+            HTTP_COMPRESSION_BYTES_OUT.labels(route, self.codec.encoding).inc(self.bytes_out)
+            HTTP_COMPRESSION_CPU.labels(route, self.codec.encoding).inc(self.cpu_seconds)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+GutWise maintenance commands
+
+Usage:
+    python manage.py init [--force]
+    python manage.py rebuild-tag-counts
+    python manage.py verify-tag-counts [--fix]
+    python manage.py import-recipes recipes.jsonl[.gz] [--batch-size 1000]
+    python manage.py rebuild-similar
+    python manage.py backfill-derived-fields [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import gzip
+import sys
+import time
+
+from server import (
+    BULK_BATCH_SIZE,
+    DATABASE_VERSION,
+    background_tasks,
+    backfill_derived_fields,
+    ingest_recipes,
+    initialize_database,
+    logger,
+    parse_json_line,
+    rebuild_similarities,
+    rebuild_tag_counts,
+    store,
+    verify_tag_counts,
+)
+
+
+async def cmd_init(args) -> int:
+    """Seed the database and build its indexes, for deployments with STARTUP_MODE=external"""
+    if await initialize_database(force=args.force):
+        logger.info(f"Database initialized at version {DATABASE_VERSION}")
+    else:
+        logger.info(f"Database already initialized at version {DATABASE_VERSION}")
+    return 0
+
+async def cmd_rebuild_tag_counts(args) -> int:
+    """Recompute the dietary tag counters from scratch"""
+    await rebuild_tag_counts()
+    logger.info("Dietary tag counters rebuilt")
+    return 0
+
+async def cmd_verify_tag_counts(args) -> int:
+    """Report counters that drifted from the stored recipes"""
+    drift = await verify_tag_counts()
+    if not drift:
+        logger.info("Dietary tag counters are consistent")
+        return 0
+
+    for tag, (stored, actual) in sorted(drift.items()):
+        logger.warning(f"Tag {tag}: stored {stored}, actual {actual}")
+
+    if args.fix:
+        await rebuild_tag_counts()
+        logger.info("Dietary tag counters rebuilt")
+        return 0
+    return 1
+
+async def iter_jsonl_file(path: str):
+    """Yield decoded items from a JSONL file (optionally gzipped, '-' for stdin) one line at a time"""
+    if path == "-":
+        stream = sys.stdin.buffer
+    elif path.endswith(".gz"):
+        stream = gzip.open(path, "rb")
+    else:
+        stream = open(path, "rb")
+
+    try:
+        index = 0
+        for line in stream:
+            if line.strip():
+                yield parse_json_line(index, line)
+                index += 1
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+async def cmd_import_recipes(args) -> int:
+    """Stream a JSONL file into the catalog in batches"""
+    started = time.perf_counter()
+    # The caches and in-memory indexes maintained on insert live in the API workers, not here
+    result = await ingest_recipes(iter_jsonl_file(args.path), batch_size=args.batch_size, worker_hooks=False)
+    elapsed = time.perf_counter() - started
+
+    logger.info(
+        f"Imported {result.inserted}/{result.received} recipes in {elapsed:.1f}s "
+        f"({result.inserted / elapsed if elapsed else 0:.0f}/s), {result.failed} failed"
+    )
+    for error in result.errors[:20]:
+        logger.warning(f"Item {error.index} ({error.id or 'no id'}): {error.error}")
+    if result.inserted:
+        logger.info(
+            "Run 'python manage.py rebuild-similar' to compute similar recipes for the import, "
+            "then restart the API workers so their search suggestions include it"
+        )
+    return 0 if result.failed == 0 else 1
+
+async def cmd_rebuild_similar(args) -> int:
+    """Recompute the precomputed similar-recipe table"""
+    await rebuild_similarities()
+    return 0
+
+async def cmd_backfill_derived_fields(args) -> int:
+    """Recompute the derived time and ingredient fields for stored recipes"""
+    updated = await backfill_derived_fields(batch_size=args.batch_size, worker_hooks=False)
+    logger.info(f"Backfilled derived fields for {updated} recipes")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="GutWise maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="Seed the database and build indexes (once per deploy)")
+    init.add_argument("--force", action="store_true", help="Run again even if this version is already initialized")
+    init.set_defaults(handler=cmd_init)
+
+    rebuild = commands.add_parser("rebuild-tag-counts", help="Recompute dietary tag counters")
+    rebuild.set_defaults(handler=cmd_rebuild_tag_counts)
+
+    verify = commands.add_parser("verify-tag-counts", help="Check dietary tag counters for drift")
+    verify.add_argument("--fix", action="store_true", help="Rebuild the counters if drift is found")
+    verify.set_defaults(handler=cmd_verify_tag_counts)
+
+    importer = commands.add_parser("import-recipes", help="Bulk import recipes from a JSONL file")
+    importer.add_argument("path", help="JSONL file, .gz compressed file, or - for stdin")
+    importer.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="Recipes per insert batch")
+    importer.set_defaults(handler=cmd_import_recipes)
+
+    similar = commands.add_parser("rebuild-similar", help="Recompute similar-recipe neighbours")
+    similar.set_defaults(handler=cmd_rebuild_similar)
+
+    backfill = commands.add_parser("backfill-derived-fields", help="Recompute minutes and ingredient keys for stored recipes")
+    backfill.add_argument("--batch-size", type=int, default=1000, help="Recipes per update batch")
+    backfill.set_defaults(handler=cmd_backfill_derived_fields)
+
+    return parser
+
+async def run(args) -> int:
+    try:
+        result = await args.handler(args)
+        # Let follow-up work scheduled by the command finish before exiting
+        await asyncio.gather(*background_tasks)
+        return result
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(asyncio.run(run(args)))
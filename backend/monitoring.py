@@ -0,0 +1,219 @@
+"""
+Prometheus metrics for HTTP requests and MongoDB traffic
+
+MetricsMiddleware records per-route request counts, latency, response sizes
+and in-flight requests. Routes are labelled by their template
+("/api/recipes/{recipe_id}"), never the raw path, so label cardinality stays
+bounded. The pymongo listeners time every command per collection and the
+connection pool's checkout waits, and feed slow commands to the slow-query
+log; they are passed to the Motor client via event_listeners.
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+from starlette.responses import Response
+
+from slow_queries import SlowQueryLog
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000)
+DOCUMENT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1_000, 10_000)
+
+# Label for requests that did not match any route (404s, static mounts)
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled",
+    ["method", "route", "status"], registry=REGISTRY
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte",
+    ["method", "route"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size as sent (after any compression)",
+    ["method", "route"], buckets=SIZE_BUCKETS, registry=REGISTRY
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled",
+    ["method"], registry=REGISTRY
+)
+
+HTTP_COMPRESSION_BYTES_IN = Counter(
+    "http_compression_input_bytes_total", "Response bytes before compression",
+    ["route", "encoding"], registry=REGISTRY
+)
+HTTP_COMPRESSION_BYTES_OUT = Counter(
+    "http_compression_output_bytes_total", "Response bytes after compression",
+    ["route", "encoding"], registry=REGISTRY
+)
+HTTP_COMPRESSION_CPU = Counter(
+    "http_compression_cpu_seconds_total", "CPU time spent compressing responses",
+    ["route", "encoding"], registry=REGISTRY
+)
+HTTP_COMPRESSION_SKIPPED = Counter(
+    "http_compression_skipped_total", "Responses sent uncompressed, by reason",
+    ["route", "reason"], registry=REGISTRY
+)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round-trip time",
+    ["command", "collection"], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error",
+    ["command", "collection"], registry=REGISTRY
+)
+MONGO_DOCUMENTS_RETURNED = Histogram(
+    "mongodb_documents_returned", "Documents returned per find/aggregate/getMore batch",
+    ["command", "collection"], buckets=DOCUMENT_BUCKETS, registry=REGISTRY
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongodb_pool_checked_out_connections", "Connections currently checked out of the pool",
+    registry=REGISTRY
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures_total", "Connection checkouts that failed",
+    ["reason"], registry=REGISTRY
+)
+
+
+def route_label(scope) -> str:
+    """Route template of a handled request; the router stores the matched route on the scope"""
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count, latency, size and concurrency per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.labels(method).dec()
+            route = route_label(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+
+
+def metrics_response() -> Response:
+    """Current metrics in the Prometheus text exposition format"""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times MongoDB commands per collection and counts the documents they return"""
+
+    def __init__(self, slow_log: Optional[SlowQueryLog] = None):
+        self.slow_log = slow_log
+        self._started: Dict[Tuple, Tuple[str, str, Optional[dict]]] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return event.connection_id, event.request_id
+
+    @staticmethod
+    def _collection(event) -> str:
+        # getMore carries the cursor id under its own name and the collection separately
+        target = event.command.get(event.command_name)
+        if isinstance(target, str):
+            return target
+        return event.command.get("collection", "")
+
+    def started(self, event):
+        # Only keep the command document around when the slow-query log may need it
+        document = event.command if self.slow_log and self.slow_log.wants(event.command_name) else None
+        self._started[self._key(event)] = (event.command_name, self._collection(event), document)
+
+    def succeeded(self, event):
+        command, collection, document = self._started.pop(self._key(event), (event.command_name, "", None))
+        MONGO_COMMAND_LATENCY.labels(command, collection).observe(event.duration_micros / 1_000_000)
+        if document is not None:
+            self.slow_log.record(command, collection, document, event.duration_micros / 1000)
+
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict):
+            batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+            if batch is not None:
+                MONGO_DOCUMENTS_RETURNED.labels(command, collection).observe(len(batch))
+
+    def failed(self, event):
+        command, collection, _ = self._started.pop(self._key(event), (event.command_name, "", None))
+        MONGO_COMMAND_LATENCY.labels(command, collection).observe(event.duration_micros / 1_000_000)
+        MONGO_COMMAND_FAILURES.labels(command, collection).inc()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection checkout wait times and the number of connections in use"""
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc()
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    # Lifecycle events that carry no timing we report
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def mongo_listeners(slow_log: Optional[SlowQueryLog] = None) -> list:
+    """Event listeners to pass to the Motor client"""
+    return [CommandMetrics(slow_log), PoolMetrics()]
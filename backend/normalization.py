@@ -0,0 +1,123 @@
+"""
+Normalization of free-text recipe fields
+
+Times and ingredients are stored as written ("12 hours", "2 cups jasmine
+rice"); the helpers here derive numeric minutes and canonical ingredient
+keys ("jasmine rice") that can be indexed and compared across recipes.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+UNITS = {
+    "cup", "cups", "tbsp", "tablespoon", "tablespoons", "tsp", "teaspoon", "teaspoons",
+    "lb", "lbs", "pound", "pounds", "oz", "ounce", "ounces", "g", "gram", "grams",
+    "kg", "ml", "l", "liter", "liters", "litre", "litres", "inch", "inches",
+    "clove", "cloves", "pinch", "dash", "handful", "can", "cans", "slice", "slices",
+    "piece", "pieces", "stalk", "stalks", "sprig", "sprigs", "bunch",
+}
+
+DESCRIPTORS = {
+    "fresh", "raw", "filtered", "chopped", "diced", "sliced", "minced", "peeled",
+    "rinsed", "medium", "large", "small", "optional", "organic", "of",
+}
+
+IRREGULAR_PLURALS = {"leaves": "leaf", "halves": "half", "loaves": "loaf"}
+
+# Trailing serving notes that do not change what the ingredient is
+TRAILING_NOTES = re.compile(r"\s+(for garnish|for topping|for serving|to taste|as needed)$")
+PARENTHETICAL = re.compile(r"\([^)]*\)")
+QUANTITY = re.compile(r"^[\d\s/.\-–½⅓⅔¼¾⅛]+")
+NON_WORD = re.compile(r"[^a-z\s-]")
+
+# "15 min", "1 hr 30 min", "12-24 hours" (ranges count as their upper bound)
+DURATION = re.compile(
+    r"(\d+(?:\.\d+)?)(?:\s*[-–]\s*(\d+(?:\.\d+)?))?\s*"
+    r"(hours|hour|hrs|hr|h|minutes|minute|mins|min|m)\b"
+)
+
+# Connecting words that are not useful as ingredient filter terms
+KEY_STOPWORDS = {"or", "and", "with", "in"}
+
+# Bump when derive_recipe_fields changes: database initialization then
+# recomputes the derived fields of every stored recipe
+DERIVED_FIELDS_VERSION = 1
+
+
+def singularize(word: str) -> str:
+    """Cheap English singular form, good enough for ingredient names"""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(ingredient: str) -> str:
+    """Canonical key for an ingredient line, e.g. '2 cups jasmine rice' -> 'jasmine rice'"""
+    text = ingredient.lower()
+    if text.startswith("optional:"):
+        text = text[len("optional:"):]
+    text = PARENTHETICAL.sub(" ", text)
+    # Preparation notes follow the first comma: "2 carrots, diced small"
+    text = text.split(",", 1)[0]
+    text = QUANTITY.sub("", text.strip())
+    text = NON_WORD.sub(" ", text)
+    text = TRAILING_NOTES.sub("", " ".join(text.split()))
+
+    words = [word for word in text.split() if word not in DESCRIPTORS]
+    # Only strip units from the front so "lemon slice" keeps its meaning
+    while words and words[0] in UNITS and len(words) > 1:
+        words.pop(0)
+    words = [word for word in words if word not in DESCRIPTORS]
+    return " ".join(singularize(word) for word in words)
+
+
+def ingredient_keys(ingredients: Iterable[str]) -> List[str]:
+    """Distinct canonical keys for a recipe's ingredient list, in order"""
+    keys = (normalize_ingredient(ingredient) for ingredient in ingredients)
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+def ingredient_filter_keys(ingredients: Iterable[str]) -> List[str]:
+    """Canonical keys plus their component words, so 'ginger' matches 'ginger root'"""
+    keys = ingredient_keys(ingredients)
+    words = (
+        word for key in keys if " " in key
+        for word in key.split() if word not in KEY_STOPWORDS
+    )
+    return list(dict.fromkeys([*keys, *words]))
+
+
+def parse_minutes(text: Optional[str]) -> Optional[int]:
+    """Minutes in a free-text duration such as '1 hr 30 min', or None if unparseable"""
+    if not text:
+        return None
+    total = 0.0
+    matched = False
+    for match in DURATION.finditer(text.lower()):
+        value = float(match.group(2) or match.group(1))
+        total += value * 60 if match.group(3).startswith("h") else value
+        matched = True
+    return int(round(total)) if matched else None
+
+
+def derive_recipe_fields(prep_time: str, cook_time: str, ingredients: Iterable[str]) -> Dict[str, object]:
+    """Structured, indexable fields computed from a recipe's free-text fields"""
+    prep_minutes = parse_minutes(prep_time)
+    cook_minutes = parse_minutes(cook_time)
+    total_minutes = None
+    if prep_minutes is not None and cook_minutes is not None:
+        total_minutes = prep_minutes + cook_minutes
+    return {
+        "prep_minutes": prep_minutes,
+        "cook_minutes": cook_minutes,
+        "total_minutes": total_minutes,
+        "ingredient_keys": ingredient_filter_keys(ingredients),
+    }
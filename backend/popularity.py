@@ -0,0 +1,80 @@
+"""
+Write-behind recipe view counters and a time-decayed trending ranking
+
+Recording a view is two dict updates in the worker's memory: one to the
+pending counts that are periodically flushed to MongoDB as a single unordered
+bulk write, one to the trending scores. Scores decay exponentially with a
+configurable half-life using forward decay: each view adds 2^(age of the
+clock / half-life) rather than decaying every score on every tick, so a view
+costs O(1) and the ranking only needs a top-N selection over stored values.
+Trending is per process and is seeded from the persisted counts at startup;
+those counts are the long-term total.
+"""
+
+import heapq
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+# Rebase the decay clock before weights grow past float precision (2^64 is far below the limit)
+MAX_DECAY_EXPONENT = 64
+# After a rebase, forget recipes whose score has decayed to under a hundredth of a view
+MIN_SCORE = 0.01
+
+
+class ViewCounter:
+    """Pending per-recipe view counts plus exponentially decayed trending scores"""
+
+    def __init__(self, half_life: float, clock: Callable[[], float] = time.monotonic):
+        self.half_life = half_life
+        self.clock = clock
+        self.pending: Counter = Counter()
+        self.scores: Dict[str, float] = {}
+        self._epoch = clock()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def _exponent(self, now: float) -> float:
+        return (now - self._epoch) / self.half_life
+
+    def _rebase(self, now: float):
+        """Move the decay clock to now, scaling stored scores down and pruning cold ones"""
+        scale = 2.0 ** -self._exponent(now)
+        self.scores = {
+            recipe_id: score * scale for recipe_id, score in self.scores.items() if score * scale >= MIN_SCORE
+        }
+        self._epoch = now
+
+    def record(self, recipe_id: str, views: int = 1):
+        now = self.clock()
+        if self._exponent(now) > MAX_DECAY_EXPONENT:
+            self._rebase(now)
+        self.pending[recipe_id] += views
+        self.scores[recipe_id] = self.scores.get(recipe_id, 0.0) + views * 2.0 ** self._exponent(now)
+
+    def seed(self, recipe_id: str, views: float, age: float):
+        """Add views that happened age seconds ago to the trending scores only
+
+        Seeded views are already persisted, so they are not queued for a flush.
+        """
+        now = self.clock()
+        if self._exponent(now) > MAX_DECAY_EXPONENT:
+            self._rebase(now)
+        weight = 2.0 ** (self._exponent(now) - age / self.half_life)
+        self.scores[recipe_id] = self.scores.get(recipe_id, 0.0) + views * weight
+
+    def drain(self) -> Counter:
+        """Hand over the counts recorded since the last drain"""
+        pending, self.pending = self.pending, Counter()
+        return pending
+
+    def restore(self, counts: Counter):
+        """Put back counts whose flush failed, so the next flush retries them"""
+        self.pending.update(counts)
+
+    def trending(self, limit: int) -> List[Tuple[str, float]]:
+        """The top recipes by decayed views, as (recipe_id, views-equivalent now) pairs"""
+        scale = 2.0 ** -self._exponent(self.clock())
+        top = heapq.nlargest(limit, self.scores.items(), key=lambda item: item[1])
+        return [(recipe_id, score * scale) for recipe_id, score in top]
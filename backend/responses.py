@@ -0,0 +1,162 @@
+"""
+Pre-rendered JSON responses with HTTP validators
+
+Handlers render their payload once into a RenderedResponse (body bytes plus
+an ETag and Last-Modified). The rendered form is what the response cache
+stores, so conditional requests against a warm cache are answered with a 304
+without touching MongoDB or serializing anything, and the compressed bodies
+are kept with it so a warm hit is not compressed again. The ETag is weak from
+the start: the same validator then covers every encoding of the body, on 200s
+and 304s alike.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+# Where the compression middleware leaves its per-request responder in the ASGI scope
+COMPRESSION_SCOPE_KEY = "compression"
+
+
+class RenderedResponse(NamedTuple):
+    """A serialized JSON body together with its validators"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime] = None
+    headers: Tuple[Tuple[str, str], ...] = ()
+    # Compressed bodies by encoding, added the first time each is requested
+    encoded: Optional[Dict[str, bytes]] = None
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime (naive values are UTC) as an HTTP-date"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _orjson_default(value: Any) -> Any:
+    """Fallback for types orjson does not serialize natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps_json(payload: Any, fast: bool = False) -> bytes:
+    """Serialize with orjson in fast mode, otherwise exactly like JSONResponse"""
+    if fast and orjson is not None:
+        return orjson.dumps(payload, default=_orjson_default)
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def render_json(payload: Any, last_modified: Optional[datetime] = None,
+                headers: Optional[Dict[str, str]] = None,
+                fast: bool = False) -> RenderedResponse:
+    """Serialize a payload and compute its ETag"""
+    body = dumps_json(payload, fast=fast)
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return RenderedResponse(
+        body=body,
+        etag=etag,
+        last_modified=last_modified,
+        headers=tuple((headers or {}).items()),
+        encoded={},
+    )
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Encodings the client accepts (q > 0), lowercased"""
+    accepted = []
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.append(coding.strip())
+    return accepted
+
+
+def is_not_modified(request: Request, rendered: RenderedResponse) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, rendered.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and rendered.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        last_modified = rendered.last_modified
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP-dates have one second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def conditional_response(request: Request, rendered: RenderedResponse,
+                         cache_control: str) -> Response:
+    """Send the rendered body, or a bodiless 304 when the client copy is fresh
+
+    Behind the compression middleware the body goes out in the negotiated
+    encoding, compressed once per rendered response.
+    """
+    headers = {"ETag": rendered.etag, "Cache-Control": cache_control}
+    if rendered.last_modified is not None:
+        headers["Last-Modified"] = http_date(rendered.last_modified)
+    compression = request.scope.get(COMPRESSION_SCOPE_KEY)
+    if compression is not None:
+        headers["Vary"] = "Accept-Encoding"
+
+    if is_not_modified(request, rendered):
+        return Response(status_code=304, headers=headers)
+
+    headers.update(rendered.headers)
+    encoded = compression.encode_rendered(rendered) if compression is not None else None
+    if encoded is not None:
+        encoding, body = encoded
+        headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+    return Response(content=rendered.body, media_type="application/json", headers=headers)
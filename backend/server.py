@@ -1,27 +1,108 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from bson import json_util
+from pymongo.errors import ExecutionTimeout
+from cache import SingleFlight, build_cache
+from compression import CompressionMiddleware, available_codecs
+from monitoring import MetricsMiddleware, metrics_response, mongo_listeners
+from popularity import ViewCounter
+from slow_queries import EXPLAIN_VERBOSITIES, SLOW_QUERY_SORTS, SlowQueryLog
+from responses import RenderedResponse, conditional_response, dumps_json, render_json
+from similarity import SimilarityIndex, recipe_features, score_new_recipes
+from static import StaticBundle
+from storage import (
+    EXPECTED_INDEXES, INDEX_DEFINITIONS, RECIPE_SORTS, SORT_KEYS, STORAGE_ENGINES, RecipeFilter, open_storage,
+    search_words,
+)
+from suggest import SUGGESTION_TYPES, SuggestIndex
+from normalization import DERIVED_FIELDS_VERSION, derive_recipe_fields, normalize_ingredient
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import os
+import asyncio
 import logging
+import re
+import socket
 import ssl
+import time
+import hashlib
+import hmac
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 import uuid
+import json
+import base64
+import binascii
+import zlib
+from collections import Counter
 from datetime import datetime
-import re
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Storage engine: MongoDB through Motor (default), or STORAGE_ENGINE=memory for
+# an in-process database that needs no MONGO_URL (single worker, not persisted)
+STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'mongodb').lower()
+if STORAGE_ENGINE not in STORAGE_ENGINES:
+    raise RuntimeError(f"Invalid STORAGE_ENGINE '{STORAGE_ENGINE}', expected one of: {', '.join(STORAGE_ENGINES)}")
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+mongo_url = os.environ['MONGO_URL'] if STORAGE_ENGINE == "mongodb" else None
+# Commands slower than SLOW_QUERY_MS are grouped by shape, with sampled explain plans.
+# queryPlanner only plans the command; executionStats runs it again in full to
+# count the documents examined, so it doubles the cost of every sampled query.
+slow_query_log = SlowQueryLog(
+    threshold_ms=float(os.environ.get('SLOW_QUERY_MS', '100')),
+    explain_rate=float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', '0.1'))
+)
+SLOW_QUERY_EXPLAIN_VERBOSITY = os.environ.get('SLOW_QUERY_EXPLAIN_VERBOSITY', 'queryPlanner')
+if SLOW_QUERY_EXPLAIN_VERBOSITY not in EXPLAIN_VERBOSITIES:
+    raise RuntimeError(
+        f"Invalid SLOW_QUERY_EXPLAIN_VERBOSITY '{SLOW_QUERY_EXPLAIN_VERBOSITY}', "
+        f"expected one of: {', '.join(EXPLAIN_VERBOSITIES)}"
+    )
+
+# Server-side time budget for every query on the request path; a query that
+# runs over is aborted by MongoDB and the request gets a 503
+QUERY_TIME_BUDGET_MS = int(os.environ.get('QUERY_TIME_BUDGET_MS', '2000'))
+
+# Every handler reads and writes through this repository. Command and connection
+# pool listeners feed the /metrics endpoint and the slow-query log
+store = open_storage(
+    STORAGE_ENGINE,
+    mongo_url,
+    os.environ['DB_NAME'] if STORAGE_ENGINE == "mongodb" else os.environ.get('DB_NAME', 'gutwise'),
+    event_listeners=mongo_listeners(slow_query_log),
+    query_time_ms=QUERY_TIME_BUDGET_MS
+)
+
+# In-process read cache for hot endpoints. Each worker holds its own copy and
+# only sees its own invalidations, so the TTL bounds cross-worker staleness.
+response_cache = build_cache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '1024')),
+    ttl=float(os.environ.get('CACHE_TTL_SECONDS', '60'))
+)
+
+# Concurrent cache misses for the same key share one database round trip
+single_flight = SingleFlight()
+
+# Fast response mode: documents read back from MongoDB were validated when they
+# were written, so they are serialized as-is with orjson instead of being rebuilt
+# through the Pydantic models on every read
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+
+# Cache-Control policies for the conditional GET endpoints
+CACHE_CONTROL = {
+    "recipe": "public, max-age=300, stale-while-revalidate=86400",
+    "recipes": "public, max-age=60, stale-while-revalidate=300",
+    "dietary-filters": "public, max-age=60, stale-while-revalidate=300",
+    "personal-story": "public, max-age=3600, stale-while-revalidate=86400",
+    "home": "public, max-age=60, stale-while-revalidate=300",
+    "trending": "public, max-age=30",
+}
 
 # Create the main app without a prefix
 app = FastAPI(title="GutWise Recipe API", version="1.0.0")
@@ -44,9 +125,36 @@ class Recipe(BaseModel):
     ingredients: List[str]
     instructions: List[str]
     story: str  # Personal healing story
+    # Derived at write time from the free-text fields above, and indexed
+    prep_minutes: Optional[int] = None
+    cook_minutes: Optional[int] = None
+    total_minutes: Optional[int] = None
+    ingredient_keys: List[str] = Field(default_factory=list)  # Canonical keys and their words
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class RecipeSummary(BaseModel):
+    """Lightweight recipe card used by listing views"""
+    id: str
+    title: str
+    description: str
+    image: str
+    prep_time: str
+    cook_time: str
+    servings: int
+    difficulty: str
+    dietary_tags: List[str]
+    total_minutes: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+class RecipeSearchResult(BaseModel):
+    """One page of search results with the total match count and tag facets"""
+    results: List[RecipeSummary]
+    total: int
+    facets: List["DietaryFilter"]
+    next_cursor: Optional[str] = None
+
 class RecipeCreate(BaseModel):
     title: str
     description: str
@@ -74,96 +182,1241 @@ class DietaryFilter(BaseModel):
     label: str
     count: int
 
+class HomeStats(BaseModel):
+    recipe_count: int
+    dietary_filters: List[DietaryFilter]
+
+class HomeBundle(BaseModel):
+    """Everything the landing page renders, in one response"""
+    featured_recipes: List[RecipeSummary]
+    stats: HomeStats
+    personal_story: Optional[PersonalStory] = None
+
+class SimilarRecipe(RecipeSummary):
+    score: float  # Cosine similarity over dietary tags and ingredients
+
+class TrendingRecipe(RecipeSummary):
+    views: float  # Recent detail views, decayed by TRENDING_HALF_LIFE_HOURS
+
+class Suggestion(BaseModel):
+    type: str  # recipe, ingredient or tag
+    value: str  # Recipe id, canonical ingredient or dietary tag id
+    text: str  # What to show in the search box
+    count: int  # Number of recipes behind the suggestion
+
+class RecipeBatchRequest(BaseModel):
+    ids: List[str]
+
+class RecipeBatchResult(BaseModel):
+    recipes: List[Union[Recipe, RecipeSummary]]  # Found recipes in request order
+    missing: List[str]
+
+class BulkItemError(BaseModel):
+    index: int  # Position of the item in the submitted array or stream
+    id: Optional[str] = None
+    error: str
+
+class BulkInsertResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkItemError]  # Capped at MAX_REPORTED_BULK_ERRORS
+
+RecipeSearchResult.model_rebuild()
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "GutWise Recipe API - Helping heal one recipe at a time"}
 
+# Recipe search and sorting
+# Search modes: stemmed full-text (default), literal substring, or an opt-in regex.
+# Substring and regex searches cannot use the text index, so they rely on the
+# query time budget and the pattern checks below to stay bounded.
+SEARCH_MODES = ("text", "substring", "regex")
+MAX_SEARCH_LENGTH = 200
+MAX_REGEX_LENGTH = 100
+# Backreferences force backtracking and are never needed for recipe search
+BACKREFERENCE = re.compile(r"\\[1-9]")
+
+# Pagination
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Listing views
+RECIPE_VIEWS = ("full", "summary")
+RECIPE_FIELDS = tuple(Recipe.model_fields)
+SUMMARY_FIELDS = tuple(RecipeSummary.model_fields)
+STORY_FIELDS = tuple(PersonalStory.model_fields)
+
+def parse_dietary_tags(dietary_tags: Optional[str]) -> List[str]:
+    """Split the comma-separated dietary_tags parameter"""
+    if not dietary_tags:
+        return []
+    return [tag.strip() for tag in dietary_tags.split(",") if tag.strip()]
+
+def parse_ingredients(ingredient: Optional[str]) -> List[str]:
+    """Canonical keys for the comma-separated ingredient parameter"""
+    if not ingredient:
+        return []
+    keys = (normalize_ingredient(item) for item in ingredient.split(","))
+    return list(dict.fromkeys(key for key in keys if key))
+
+def has_nested_quantifier(pattern: str) -> bool:
+    """Whether a quantified group contains a quantifier or an alternation, e.g. (a+)+ or (a|ab)*"""
+    # Such patterns backtrack exponentially on a near miss
+    groups = [set()]  # Per open group: which of "quantifier", "alternation" it contains so far
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == "\\":
+            position += 2
+            continue
+        if char == "[":
+            # Quantifier characters inside a character class are literals
+            position = pattern.find("]", position + 2) + 1 or len(pattern)
+            continue
+        if char == "(":
+            groups.append(set())
+        elif char == ")" and len(groups) > 1:
+            inner = groups.pop()
+            quantified = pattern[position + 1:position + 2] in ("+", "*", "{")
+            if inner and quantified:
+                return True
+            groups[-1] |= inner
+            if quantified:
+                groups[-1].add("quantifier")
+        elif char in "+*{":
+            groups[-1].add("quantifier")
+        elif char == "|":
+            groups[-1].add("alternation")
+        position += 1
+    return False
+
+def validate_search_pattern(pattern: str) -> str:
+    """Reject regex searches that are invalid or prone to catastrophic backtracking"""
+    if len(pattern) > MAX_REGEX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Regex search is limited to {MAX_REGEX_LENGTH} characters")
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regex: {e}")
+    if has_nested_quantifier(pattern) or BACKREFERENCE.search(pattern):
+        raise HTTPException(status_code=400, detail="Regex search does not allow nested quantifiers, quantified alternations or backreferences")
+    return pattern
+
+def validate_search_mode(search_mode: str):
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid search_mode '{search_mode}', expected one of: {', '.join(SEARCH_MODES)}"
+        )
+
+def build_recipe_filter(
+    search: Optional[str],
+    dietary_tags: Optional[str],
+    max_total_time: Optional[int] = None,
+    ingredient: Optional[str] = None,
+    search_mode: str = "text"
+) -> RecipeFilter:
+    """Build the filter shared by the recipe listing endpoints"""
+    validate_search_mode(search_mode)
+    search = search.strip() if search and search.strip() else None
+    # Full-text search is served by the weighted text index; user input is only
+    # used as a pattern when regex mode is asked for explicitly
+    if search and search_mode == "regex":
+        validate_search_pattern(search)
+
+    # Structured filters use the fields derived at write time
+    return RecipeFilter(
+        search=search,
+        search_mode=search_mode,
+        dietary_tags=tuple(parse_dietary_tags(dietary_tags)),
+        max_total_time=max_total_time,
+        ingredients=tuple(parse_ingredients(ingredient)),
+    )
+
+def resolve_recipe_sort(sort: Optional[str], recipe_filter: RecipeFilter) -> Tuple[str, RecipeFilter]:
+    """Validate the requested sort order, defaulting to relevance when searching"""
+    if sort is None:
+        return ("relevance" if recipe_filter.text_search else "oldest"), recipe_filter
+    if sort not in RECIPE_SORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort '{sort}', expected one of: {', '.join(RECIPE_SORTS)}"
+        )
+    if sort == "relevance" and not recipe_filter.text_search:
+        raise HTTPException(status_code=400, detail="sort=relevance requires a search term")
+    if sort == "total_time":
+        # Only recipes with a parsed time can be ordered (and keyset-paged) by it
+        recipe_filter = recipe_filter._replace(timed=True)
+    return sort, recipe_filter
+
+def recipe_fields(view: str) -> Tuple[str, ...]:
+    """Fields read for a listing view"""
+    if view not in RECIPE_VIEWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid view '{view}', expected one of: {', '.join(RECIPE_VIEWS)}"
+        )
+    return SUMMARY_FIELDS if view == "summary" else RECIPE_FIELDS
+
+def response_documents(documents: List[dict], model: type) -> list:
+    """Response items: validated models, or the projected documents in fast mode"""
+    if FAST_RESPONSES:
+        for document in documents:
+            document.pop("score", None)
+        return documents
+    return [model(**document) for document in documents]
+
+def encode_cursor(sort: str, recipe: dict) -> str:
+    """Opaque keyset cursor pointing just past the given recipe"""
+    values = [recipe[field] for field, _ in SORT_KEYS[sort]]
+    payload = json_util.dumps({"s": sort, "k": values})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def cursor_value_types(sort: str) -> Tuple[tuple, tuple]:
+    """Types a keyset cursor may carry for each field of a sort"""
+    first = (int,) if sort == "total_time" else (datetime,)
+    return first, (str,)
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """Decode a keyset cursor, rejecting tampered or mismatched ones"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = payload["k"]
+        cursor_sort = payload["s"]
+        matches_sort = (
+            cursor_sort == sort and isinstance(values, list)
+            and len(values) == len(SORT_KEYS[sort])
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not matches_sort:
+        raise HTTPException(status_code=400, detail="Pagination cursor does not match the requested sort")
+    # Only plain values of the sort fields' types reach the filter, never operator documents
+    for value, types in zip(values, cursor_value_types(sort)):
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+def cursor_position(cursor: Optional[str], offset: int, sort: str) -> Optional[list]:
+    """Validate the paging parameters and decode the keyset position of a cursor"""
+    if not cursor:
+        return None
+    if offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    if sort == "relevance":
+        raise HTTPException(status_code=400, detail="Cursor pagination is not available for sort=relevance")
+    return decode_cursor(cursor, sort)
+
+def recipe_filter_key(search: Optional[str], search_mode: str, dietary_tags: Optional[str],
+                      max_total_time: Optional[int], ingredient: Optional[str]) -> tuple:
+    """Normalized filter parameters for cache and single-flight keys"""
+    # Regex escapes are case sensitive (\\s is not \\S), the other modes are not
+    if search and search_mode != "regex":
+        search_key = " ".join(search.lower().split())
+    else:
+        search_key = search.strip() if search else None
+    tags_key = tuple(sorted(set(parse_dietary_tags(dietary_tags))))
+    ingredients_key = tuple(sorted(parse_ingredients(ingredient)))
+    return (search_mode, search_key or None, tags_key, max_total_time, ingredients_key)
+
+async def find_recipe_page(recipe_filter: RecipeFilter, fields: Tuple[str, ...], sort: str, offset: int,
+                           limit: int, after: Optional[list] = None) -> Tuple[List[dict], Optional[str]]:
+    """One page of recipes from an indexed find, with the cursor for the next page"""
+    # Fetch one extra row to know whether another page exists
+    recipes = await store.find_recipes(recipe_filter, fields, sort, offset=offset, limit=limit + 1, after=after)
+
+    next_cursor = None
+    if len(recipes) > limit:
+        recipes = recipes[:limit]
+        if sort != "relevance":
+            next_cursor = encode_cursor(sort, recipes[-1])
+    return recipes, next_cursor
+
+async def with_text_fallback(recipe_filter: RecipeFilter, sort: str) -> Tuple[RecipeFilter, str]:
+    """The filter and sort to run, matching word prefixes when a text search finds nothing
+
+    Text search only matches whole stemmed words, so a partly typed word
+    ("ging") finds nothing. The fallback matches every typed word as the start
+    of a word in the search fields, in catalog order rather than by relevance.
+    Like substring mode it cannot use the text index and relies on the time budget.
+    """
+    if not recipe_filter.text_search:
+        return recipe_filter, sort
+    if not search_words(recipe_filter.search) or await store.has_text_match(recipe_filter.search):
+        return recipe_filter, sort
+    return recipe_filter._replace(search_mode="prefix"), "oldest" if sort == "relevance" else sort
+
 # Recipe Endpoints
-@api_router.get("/recipes", response_model=List[Recipe])
+@api_router.get("/recipes", response_model=List[Union[Recipe, RecipeSummary]])
 async def get_recipes(
-    search: Optional[str] = Query(None, description="Search recipes by title, description, or ingredients"),
+    request: Request,
+    search: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH, description="Search over title, description and ingredients"),
+    search_mode: str = Query("text", description="'text' (stemmed full-text, default), 'substring' (literal match) or 'regex' (opt-in pattern)"),
     dietary_tags: Optional[str] = Query(None, description="Filter by dietary tags (comma-separated)"),
-    limit: Optional[int] = Query(None, description="Limit number of results"),
-    offset: Optional[int] = Query(0, description="Offset for pagination")
+    max_total_time: Optional[int] = Query(None, ge=0, description="Only recipes whose prep plus cook time is at most this many minutes"),
+    ingredient: Optional[str] = Query(None, description="Only recipes containing these ingredients (comma-separated)"),
+    sort: Optional[str] = Query(None, description="Sort order: 'relevance' (default when searching), 'oldest' (default otherwise), 'newest' or 'total_time'"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Offset for pagination (prefer cursor for deep pages)"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    view: str = Query("full", description="'full' for complete recipes or 'summary' for lightweight listing cards")
 ):
-    query = {}
-    
-    # Build search query
-    if search:
-        search_regex = re.compile(search, re.IGNORECASE)
-        query["$or"] = [
-            {"title": search_regex},
-            {"description": search_regex},
-            {"ingredients": {"$elemMatch": {"$regex": search_regex}}}
-        ]
-    
-    # Build dietary tags filter
-    if dietary_tags:
-        tags_list = [tag.strip() for tag in dietary_tags.split(",")]
-        query["dietary_tags"] = {"$all": tags_list}
-    
-    # Execute query with pagination
-    cursor = db.recipes.find(query).skip(offset)
-    if limit:
-        cursor = cursor.limit(limit)
-    
-    recipes = await cursor.to_list(length=None)
-    return [Recipe(**recipe) for recipe in recipes]
+    recipe_filter = build_recipe_filter(search, dietary_tags, max_total_time, ingredient, search_mode)
+    sort, recipe_filter = resolve_recipe_sort(sort, recipe_filter)
+
+    # Keyset pagination resumes from the last recipe of the previous page,
+    # so deep pages are served by the sort index instead of skipping rows
+    after = cursor_position(cursor, offset, sort)
+
+    # Summary listings only pull the card fields out of the database
+    fields = recipe_fields(view)
+    model = RecipeSummary if view == "summary" else Recipe
+
+    # Requests are keyed by their normalized parameters; browsing pages without
+    # free-text search are also cached under that key
+    filter_key = recipe_filter_key(search, search_mode, dietary_tags, max_total_time, ingredient)
+    request_key = ("recipes", view, sort, *filter_key, limit, offset, cursor)
+    cacheable = not filter_key[1]
+    if cacheable:
+        cached = response_cache.get(request_key)
+        if cached is not None:
+            return conditional_response(request, cached, CACHE_CONTROL["recipes"])
+
+    async def load() -> RenderedResponse:
+        # A write landing while this query runs must stop its result from being cached
+        generation = response_cache.generation("recipes")
+        page_filter, page_sort = await with_text_fallback(recipe_filter, sort)
+        recipes, next_cursor = await find_recipe_page(page_filter, fields, page_sort, offset, limit, after)
+        if page_sort != sort:
+            # Relevance pages are reached by offset, also when they fell back
+            next_cursor = None
+
+        rendered = render_json(
+            response_documents(recipes, model),
+            last_modified=max((recipe["updated_at"] for recipe in recipes), default=None),
+            headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None,
+            fast=FAST_RESPONSES
+        )
+        if cacheable:
+            response_cache.set(request_key, rendered, generation=generation)
+        return rendered
+
+    rendered = await single_flight.run(request_key, load)
+    return conditional_response(request, rendered, CACHE_CONTROL["recipes"])
+
+async def count_recipe_matches(recipe_filter: RecipeFilter) -> Tuple[int, List[DietaryFilter]]:
+    """Total matches and dietary tag facets for a recipe filter"""
+    if recipe_filter.matches_all:
+        # The whole catalog is described by collection metadata and the tag counters
+        total, (filters, _) = await asyncio.gather(store.estimated_recipe_count(), load_dietary_filters())
+        return total, filters
+
+    total, tags = await store.count_recipes(recipe_filter)
+    return total, [
+        DietaryFilter(id=tag, label=dietary_tag_label(tag), count=count)
+        for tag, count in sorted(tags.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+@api_router.get("/recipes/search", response_model=RecipeSearchResult)
+async def search_recipes(
+    request: Request,
+    search: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH, description="Search over title, description and ingredients"),
+    search_mode: str = Query("text", description="'text' (stemmed full-text, default), 'substring' (literal match) or 'regex' (opt-in pattern)"),
+    dietary_tags: Optional[str] = Query(None, description="Filter by dietary tags (comma-separated)"),
+    max_total_time: Optional[int] = Query(None, ge=0, description="Only recipes whose prep plus cook time is at most this many minutes"),
+    ingredient: Optional[str] = Query(None, description="Only recipes containing these ingredients (comma-separated)"),
+    sort: Optional[str] = Query(None, description="Sort order: 'relevance' (default when searching), 'oldest' (default otherwise), 'newest' or 'total_time'"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Offset for pagination (prefer cursor for deep pages)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor of the previous page")
+):
+    recipe_filter = build_recipe_filter(search, dietary_tags, max_total_time, ingredient, search_mode)
+    sort, recipe_filter = resolve_recipe_sort(sort, recipe_filter)
+    after = cursor_position(cursor, offset, sort)
+
+    # The page comes from the same indexed keyset find as GET /recipes. The total
+    # and tag facets describe the whole match set, so they are computed once per
+    # filter and shared by every page of it ("Load more" only runs the find)
+    filter_key = recipe_filter_key(search, search_mode, dietary_tags, max_total_time, ingredient)
+    # Ordering by total_time leaves out untimed recipes, so it counts separately
+    counts_key = ("recipes", "search-counts", *filter_key, recipe_filter.timed)
+    request_key = ("recipes", "search", sort, *filter_key, limit, offset, cursor)
+    cacheable = not filter_key[1]
+    if cacheable:
+        cached = response_cache.get(request_key)
+        if cached is not None:
+            return conditional_response(request, cached, CACHE_CONTROL["recipes"])
+
+    async def counts(matched_filter: RecipeFilter) -> Tuple[int, List[DietaryFilter]]:
+        async def load_counts() -> Tuple[int, List[DietaryFilter]]:
+            generation = response_cache.generation("recipes")
+            counts = await count_recipe_matches(matched_filter)
+            if cacheable:
+                response_cache.set(counts_key, counts, generation=generation)
+            return counts
+
+        cached_counts = response_cache.get(counts_key) if cacheable else None
+        return cached_counts if cached_counts is not None else await single_flight.run(counts_key, load_counts)
+
+    async def load() -> RenderedResponse:
+        generation = response_cache.generation("recipes")
+        matched_filter, page_sort = await with_text_fallback(recipe_filter, sort)
+        (recipes, next_cursor), (total, facets) = await asyncio.gather(
+            find_recipe_page(matched_filter, SUMMARY_FIELDS, page_sort, offset, limit, after),
+            counts(matched_filter)
+        )
+        if page_sort != sort:
+            next_cursor = None
+        result = {
+            "results": response_documents(recipes, RecipeSummary),
+            "total": total,
+            "facets": facets,
+            "next_cursor": next_cursor,
+        }
+        rendered = render_json(
+            result if FAST_RESPONSES else RecipeSearchResult(**result),
+            last_modified=max((recipe["updated_at"] for recipe in recipes), default=None),
+            fast=FAST_RESPONSES
+        )
+        if cacheable:
+            response_cache.set(request_key, rendered, generation=generation)
+        return rendered
+
+    rendered = await single_flight.run(request_key, load)
+    return conditional_response(request, rendered, CACHE_CONTROL["recipes"])
+
+# Catalog export
+EXPORT_BATCH_SIZE = 500
+EXPORT_GZIP_LEVEL = 6
+
+async def export_ndjson(recipe_filter: RecipeFilter) -> AsyncIterator[bytes]:
+    """Stream matching recipes as NDJSON, one cursor batch per chunk"""
+    # Exports are long-running by design, so they are not held to the query time budget
+    chunk = []
+    async for recipe in store.iter_recipes(RECIPE_FIELDS, recipe_filter, batch_size=EXPORT_BATCH_SIZE):
+        chunk.append(dumps_json(recipe, fast=True))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip an async byte stream incrementally"""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@api_router.get("/recipes/export")
+async def export_recipes(
+    search: Optional[str] = Query(None, max_length=MAX_SEARCH_LENGTH, description="Search over title, description and ingredients"),
+    search_mode: str = Query("text", description="'text' (stemmed full-text, default), 'substring' (literal match) or 'regex' (opt-in pattern)"),
+    dietary_tags: Optional[str] = Query(None, description="Filter by dietary tags (comma-separated)"),
+    compress: bool = Query(False, description="Always gzip the stream, regardless of Accept-Encoding")
+):
+    """Stream the catalog as NDJSON straight from the database cursor"""
+    recipe_filter = build_recipe_filter(search, dietary_tags, search_mode=search_mode)
+
+    body = export_ndjson(recipe_filter)
+    headers = {"Content-Disposition": 'attachment; filename="recipes.ndjson"'}
+    if compress:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+# Batch lookups
+MAX_BATCH_IDS = 100
+
+@api_router.post("/recipes/batch", response_model=RecipeBatchResult)
+async def get_recipes_batch(
+    batch: RecipeBatchRequest,
+    view: str = Query("full", description="'full' for complete recipes or 'summary' for lightweight listing cards")
+):
+    """Resolve many recipe ids with one indexed $in query"""
+    # Keep the first occurrence of each id so the response follows request order
+    ids = list(dict.fromkeys(batch.ids))
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids can be requested at once")
+
+    fields = recipe_fields(view)
+    model = RecipeSummary if view == "summary" else Recipe
+    found = {recipe["id"]: recipe for recipe in await store.get_recipes(ids, fields)}
+
+    payload = {
+        "recipes": response_documents([found[recipe_id] for recipe_id in ids if recipe_id in found], model),
+        "missing": [recipe_id for recipe_id in ids if recipe_id not in found]
+    }
+    return Response(content=dumps_json(payload, fast=FAST_RESPONSES), media_type="application/json")
+
+# View counts and trending recipes
+# Detail views are counted in memory and written behind: a background task
+# flushes the buffered counts to the stored view counts in one write every
+# VIEW_FLUSH_SECONDS, and the last ones on shutdown. Trending is ranked
+# in this worker's memory from the same events, so tracking stays off the
+# request path's database traffic; at startup the ranking is warmed from the
+# most recently viewed recipes so a restart doesn't empty it.
+VIEW_FLUSH_SECONDS = float(os.environ.get('VIEW_FLUSH_SECONDS', '10'))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '6'))
+MAX_TRENDING = 50
+TRENDING_SEED_SIZE = 500
+if VIEW_FLUSH_SECONDS <= 0 or TRENDING_HALF_LIFE_HOURS <= 0:
+    raise RuntimeError("VIEW_FLUSH_SECONDS and TRENDING_HALF_LIFE_HOURS must be positive")
+
+view_counter = ViewCounter(half_life=TRENDING_HALF_LIFE_HOURS * 3600)
+view_flusher: Optional[asyncio.Task] = None
+
+async def flush_view_counts() -> int:
+    """Write the buffered view counts, returning how many recipes were updated"""
+    counts = view_counter.drain()
+    if not counts:
+        return 0
+    try:
+        await store.add_recipe_views(counts)
+    except (Exception, asyncio.CancelledError):
+        # Keep the counts for the next flush rather than losing them; a write
+        # cancelled after it reached the server may be counted twice
+        view_counter.restore(counts)
+        raise
+    return len(counts)
+
+async def flush_view_counts_periodically():
+    while True:
+        await asyncio.sleep(VIEW_FLUSH_SECONDS)
+        try:
+            await flush_view_counts()
+        except Exception as e:
+            logger.error(f"Error flushing view counts: {e}")
+
+async def seed_trending():
+    """Warm the trending ranking from the most recently viewed recipes
+
+    Persisted counts are lifetime totals, so each is decayed from its last
+    view as if all of its views happened then; an approximation that only
+    matters until live views take over the ranking.
+    """
+    now = datetime.utcnow()
+    for viewed in await store.recent_recipe_views(TRENDING_SEED_SIZE):
+        age = (now - viewed["updated_at"]).total_seconds() if viewed["updated_at"] else 0.0
+        view_counter.seed(viewed["id"], viewed["views"], max(age, 0.0))
+
+@api_router.get("/recipes/trending", response_model=List[TrendingRecipe])
+async def get_trending_recipes(
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_TRENDING, description="Number of trending recipes")
+):
+    # Ask for a few extra in case some of the top ids have since been removed
+    trending = view_counter.trending(limit + 5)
+    found = {
+        recipe["id"]: recipe
+        for recipe in await store.get_recipes([recipe_id for recipe_id, _ in trending], SUMMARY_FIELDS)
+    }
+    response.headers["Cache-Control"] = CACHE_CONTROL["trending"]
+    return [
+        TrendingRecipe(**found[recipe_id], views=round(views, 3))
+        for recipe_id, views in trending if recipe_id in found
+    ][:limit]
 
 @api_router.get("/recipes/{recipe_id}", response_model=Recipe)
-async def get_recipe(recipe_id: str):
-    recipe = await db.recipes.find_one({"id": recipe_id})
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    return Recipe(**recipe)
+async def get_recipe(recipe_id: str, request: Request):
+    cache_key = ("recipe", recipe_id)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        view_counter.record(recipe_id)
+        return conditional_response(request, cached, CACHE_CONTROL["recipe"])
+
+    async def load() -> RenderedResponse:
+        generation = response_cache.generation("recipe")
+        recipe = await store.get_recipe(recipe_id, RECIPE_FIELDS)
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+
+        result = recipe if FAST_RESPONSES else Recipe(**recipe)
+        rendered = render_json(result, last_modified=recipe["updated_at"], fast=FAST_RESPONSES)
+        response_cache.set(cache_key, rendered, generation=generation)
+        return rendered
+
+    rendered = await single_flight.run(cache_key, load)
+    view_counter.record(recipe_id)
+    return conditional_response(request, rendered, CACHE_CONTROL["recipe"])
 
 @api_router.post("/recipes", response_model=Recipe)
 async def create_recipe(recipe_data: RecipeCreate):
-    recipe = Recipe(**recipe_data.dict())
-    await db.recipes.insert_one(recipe.dict())
+    recipe = build_recipe(recipe_data.dict())
+    document = recipe.dict()
+    if await store.insert_recipes([document]):
+        raise HTTPException(status_code=409, detail="A recipe with this id already exists")
+    await on_recipes_added([document])
     return recipe
 
-# Dietary Filter Endpoints
-@api_router.get("/dietary-filters", response_model=List[DietaryFilter])
-async def get_dietary_filters():
-    # Aggregate dietary tag counts
-    pipeline = [
-        {"$unwind": "$dietary_tags"},
-        {"$group": {"_id": "$dietary_tags", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    
-    result = await db.recipes.aggregate(pipeline).to_list(length=None)
-    
-    # Map to readable labels
-    label_map = {
-        "gluten-free": "Gluten-Free",
-        "dairy-free": "Dairy-Free", 
-        "low-fodmap": "Low-FODMAP",
-        "vegan": "Vegan",
-        "paleo": "Paleo",
-        "keto": "Keto"
+def build_recipe(data: dict) -> Recipe:
+    """Validate a new recipe and attach its derived, indexed fields"""
+    recipe = Recipe(**data)
+    for field, value in derive_recipe_fields(recipe.prep_time, recipe.cook_time, recipe.ingredients).items():
+        setattr(recipe, field, value)
+    return recipe
+
+def invalidate_recipe_caches(recipe_ids: List[str] = ()):
+    """Drop the cached responses that a recipe write can change"""
+    for namespace in ("recipes", "dietary-filters", "recipe", "home"):
+        # Requests arriving after the write must not join a read started before it
+        single_flight.forget_namespace(namespace)
+    response_cache.invalidate_namespace("recipes")
+    response_cache.invalidate_namespace("dietary-filters")
+    response_cache.invalidate_namespace("home")
+    for recipe_id in recipe_ids:
+        response_cache.invalidate(("recipe", recipe_id))
+    # Rebuild the landing page ahead of the next visitor's request
+    if response_cache.max_entries > 0:
+        schedule_home_rebuild()
+
+async def on_recipes_added(recipes: List[dict], worker_hooks: bool = True):
+    """Keep derived data in step after recipes are inserted
+
+    Without worker_hooks only the stored tag counters are updated: the caches,
+    suggestion index and incremental similar-recipe updates belong to the
+    serving workers, and a process that isn't one (manage.py import-recipes)
+    would only slow itself down maintaining them.
+    """
+    await apply_tag_count_deltas(tag_count_deltas(added=recipes))
+    if not worker_hooks:
+        return
+    invalidate_recipe_caches([recipe["id"] for recipe in recipes])
+    queue_suggestion_update(recipes)
+    queue_similarity_update(recipes)
+
+# Background work
+background_tasks = set()
+
+def run_in_background(coro, name: str):
+    """Run a coroutine off the request path, logging failures"""
+    async def runner():
+        try:
+            await coro
+        except Exception as e:
+            logger.error(f"Background {name} failed: {e}")
+
+    task = asyncio.create_task(runner())
+    # Keep a reference so the task isn't garbage collected mid-flight
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def backfill_derived_fields(batch_size: int = 1000, worker_hooks: bool = True) -> int:
+    """Recompute the derived time and ingredient fields of every stored recipe
+
+    Without worker_hooks the caches are left alone, as in on_recipes_added.
+    """
+    updated = 0
+    updates = {}
+    async for recipe in store.iter_recipes(("id", "prep_time", "cook_time", "ingredients"), batch_size=batch_size):
+        updates[recipe["id"]] = derive_recipe_fields(
+            recipe.get("prep_time"), recipe.get("cook_time"), recipe.get("ingredients", [])
+        )
+        if len(updates) >= batch_size:
+            await store.update_recipes(updates)
+            updated += len(updates)
+            updates = {}
+    if updates:
+        await store.update_recipes(updates)
+        updated += len(updates)
+
+    if worker_hooks:
+        invalidate_recipe_caches()
+    return updated
+
+# Bulk ingestion
+BULK_BATCH_SIZE = 500
+MAX_BULK_JSON_ITEMS = 10000
+# Request bodies are counted while they stream in, so an oversized upload is
+# refused without ever being held in memory
+MAX_BULK_JSON_BYTES = 32 * 1024 * 1024
+MAX_BULK_NDJSON_BYTES = 1024 * 1024 * 1024
+MAX_NDJSON_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_BULK_ERRORS = 1000
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+def describe_validation_error(error: ValidationError) -> str:
+    """Compact one-line summary of a Pydantic validation error"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'item'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+async def insert_recipe_batch(items: List[Tuple[int, Any]], worker_hooks: bool = True) -> Tuple[int, List[BulkItemError]]:
+    """Validate and insert one batch of (index, raw item) pairs, reporting per-item failures"""
+    errors = []
+    documents = []
+    positions = []
+    for index, item in items:
+        if isinstance(item, BulkItemError):
+            errors.append(item)
+            continue
+        if not isinstance(item, dict):
+            errors.append(BulkItemError(index=index, error="Item must be a JSON object"))
+            continue
+        try:
+            documents.append(build_recipe(item).dict())
+            positions.append(index)
+        except ValidationError as e:
+            errors.append(BulkItemError(index=index, id=item.get("id"), error=describe_validation_error(e)))
+
+    if not documents:
+        return 0, errors
+
+    # The insert keeps going past individual failures such as duplicate ids
+    failed_offsets = set()
+    for offset, message in await store.insert_recipes(documents):
+        failed_offsets.add(offset)
+        errors.append(BulkItemError(index=positions[offset], id=documents[offset]["id"], error=message))
+
+    inserted = [document for offset, document in enumerate(documents) if offset not in failed_offsets]
+    if inserted:
+        await on_recipes_added(inserted, worker_hooks=worker_hooks)
+    return len(inserted), errors
+
+async def ingest_recipes(items: AsyncIterator[Any], batch_size: int = BULK_BATCH_SIZE,
+                         worker_hooks: bool = True) -> BulkInsertResult:
+    """Insert a stream of raw recipe items in bounded batches
+
+    Offline imports pass worker_hooks=False: see on_recipes_added.
+    """
+    received = 0
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+
+    async def flush():
+        nonlocal inserted, failed
+        batch_inserted, batch_errors = await insert_recipe_batch(batch, worker_hooks=worker_hooks)
+        inserted += batch_inserted
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:MAX_REPORTED_BULK_ERRORS - len(errors)])
+        batch.clear()
+
+    async for item in items:
+        batch.append((received, item))
+        received += 1
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    return BulkInsertResult(received=received, inserted=inserted, failed=failed, errors=errors)
+
+def parse_json_line(index: int, line: bytes) -> Any:
+    """Decode one NDJSON line, turning syntax errors into per-item failures"""
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return BulkItemError(index=index, error=f"Invalid JSON: {e}")
+
+def oversized_line(index: int) -> BulkItemError:
+    return BulkItemError(index=index, error=f"Line exceeds {MAX_NDJSON_LINE_BYTES} bytes")
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Split a byte stream into decoded NDJSON items, skipping blank lines
+
+    A line longer than MAX_NDJSON_LINE_BYTES is reported as a failed item
+    and skipped rather than buffered.
+    """
+    buffer = b""
+    index = 0
+    skipping = False  # Inside an oversized line that was already reported
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > MAX_NDJSON_LINE_BYTES:
+                yield oversized_line(index)
+                index += 1
+            elif line.strip():
+                yield parse_json_line(index, line)
+                index += 1
+        if skipping:
+            buffer = b""
+        elif len(buffer) > MAX_NDJSON_LINE_BYTES:
+            yield oversized_line(index)
+            index += 1
+            skipping = True
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield parse_json_line(index, buffer)
+
+async def limited_body(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    """The request body as it streams in, failing with a 413 once it exceeds max_bytes"""
+    too_large = HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise too_large
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise too_large
+        yield chunk
+
+async def iter_items(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+@api_router.post("/recipes/bulk", response_model=BulkInsertResult)
+async def create_recipes_bulk(request: Request):
+    """Insert many recipes from a JSON array or an NDJSON stream (application/x-ndjson)"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    # NDJSON is validated and inserted while the body is still streaming in; a
+    # stream cut off by the size limit keeps the batches inserted before it
+    if content_type in NDJSON_CONTENT_TYPES:
+        return await ingest_recipes(iter_ndjson(limited_body(request, MAX_BULK_NDJSON_BYTES)))
+
+    body = b"".join([chunk async for chunk in limited_body(request, MAX_BULK_JSON_BYTES)])
+    try:
+        items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of recipes")
+    if len(items) > MAX_BULK_JSON_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"JSON arrays are limited to {MAX_BULK_JSON_ITEMS} recipes, use NDJSON for larger imports"
+        )
+    return await ingest_recipes(iter_items(items))
+
+# Dietary tag counters
+# Counts are stored per tag and adjusted on every write, so reading them
+# costs O(tags) rather than a scan over all recipes.
+DIETARY_TAG_LABELS = {
+    "gluten-free": "Gluten-Free",
+    "dairy-free": "Dairy-Free",
+    "low-fodmap": "Low-FODMAP",
+    "vegan": "Vegan",
+    "paleo": "Paleo",
+    "keto": "Keto"
+}
+
+def dietary_tag_label(tag_id: str) -> str:
+    """Readable label for a dietary tag"""
+    return DIETARY_TAG_LABELS.get(tag_id, tag_id.title())
+
+def tag_count_deltas(added: List[dict] = (), removed: List[dict] = ()) -> Counter:
+    """Per-tag count changes caused by adding and removing recipes"""
+    deltas = Counter()
+    for recipe in added:
+        deltas.update(recipe.get("dietary_tags", []))
+    for recipe in removed:
+        deltas.subtract(recipe.get("dietary_tags", []))
+    return deltas
+
+async def apply_tag_count_deltas(deltas: Dict[str, int]):
+    """Incrementally adjust the stored dietary tag counters"""
+    await store.apply_tag_count_deltas(deltas)
+
+async def rebuild_tag_counts():
+    """Recompute every dietary tag counter from the recipes"""
+    # Increments from recipes inserted while it runs may be lost, so run it
+    # when writes are quiet and re-check with verify_tag_counts
+    await store.rebuild_tag_counts()
+
+async def verify_tag_counts() -> Dict[str, tuple]:
+    """Compare stored counters against a fresh count, returning drifted tags"""
+    actual = await store.recipe_tag_counts()
+    stored = {item["tag"]: item["count"] for item in await store.tag_counts()}
+    return {
+        tag: (stored.get(tag, 0), actual.get(tag, 0))
+        for tag in set(actual) | set(stored)
+        if stored.get(tag, 0) != actual.get(tag, 0)
     }
-    
+
+# Dietary Filter Endpoints
+async def load_dietary_filters() -> Tuple[List[DietaryFilter], Optional[datetime]]:
+    """Filters with their counts, and when a counter last changed"""
+    # Read the precomputed tag counters
+    result = await store.tag_counts()
+
     filters = []
     for item in result:
-        tag_id = item["_id"]
+        tag_id = item["tag"]
         filters.append(DietaryFilter(
             id=tag_id,
-            label=label_map.get(tag_id, tag_id.title()),
+            label=dietary_tag_label(tag_id),
             count=item["count"]
         ))
-    
-    return filters
+    last_modified = max((item["updated_at"] for item in result if item.get("updated_at")), default=None)
+    return filters, last_modified
+
+@api_router.get("/dietary-filters", response_model=List[DietaryFilter])
+async def get_dietary_filters(request: Request):
+    cache_key = ("dietary-filters",)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return conditional_response(request, cached, CACHE_CONTROL["dietary-filters"])
+
+    async def load() -> RenderedResponse:
+        generation = response_cache.generation("dietary-filters")
+        filters, last_modified = await load_dietary_filters()
+        rendered = render_json(filters, last_modified=last_modified, fast=FAST_RESPONSES)
+        response_cache.set(cache_key, rendered, generation=generation)
+        return rendered
+
+    rendered = await single_flight.run(cache_key, load)
+    return conditional_response(request, rendered, CACHE_CONTROL["dietary-filters"])
+
+# Similar recipes
+# Neighbours are stored per recipe; reads are a single lookup. The full
+# quadratic build runs once, while the database is initialized (for catalogs
+# up to SIMILARITY_MAX_RECIPES) or through `manage.py rebuild-similar`, and
+# also stores each feature's document frequency. Recipes added afterwards are
+# scored against the recipes sharing an ingredient (then a tag) with them,
+# fetched from the database, and offered to those recipes' lists with an
+# atomic merge, so any worker can apply updates without an index of its own.
+SIMILAR_TOP_K = 10
+SIMILARITY_FIELDS = ("id", "dietary_tags", "ingredients")
+SIMILARITY_MODEL_ID = "similarity-model"
+DERIVED_FIELDS_ID = "derived-fields"
+# Larger catalogs are left to `manage.py rebuild-similar` at initialization
+SIMILARITY_MAX_RECIPES = 50_000
+# Upper bound on existing recipes scored against each batch of new ones
+MAX_SIMILARITY_CANDIDATES = 5000
+
+async def rebuild_similarities():
+    """Recompute every recipe's neighbours and the stored document frequencies from scratch"""
+    recipes = [recipe async for recipe in store.iter_recipes(SIMILARITY_FIELDS)]
+    index = SimilarityIndex(top_k=SIMILAR_TOP_K)
+    # The matrix work is CPU bound, keep it off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, index.build, recipes)
+
+    await store.replace_similar_lists({
+        recipe_id: [{"id": n, "score": score} for n, score in index.neighbours(position)]
+        for position, recipe_id in enumerate(index.ids)
+    })
+    await store.replace_feature_counts(index.feature_frequencies())
+    await store.set_marker(SIMILARITY_MODEL_ID, {"recipes": len(index), "built_at": datetime.utcnow()})
+    logger.info(f"Similar recipes computed for {len(index)} recipes")
+
+async def update_similarities(recipes: List[dict]):
+    """Score newly added recipes and fold them into the stored neighbour lists"""
+    if await store.get_marker(SIMILARITY_MODEL_ID) is None:
+        # Never built; the first rebuild covers these recipes
+        return
+
+    features = Counter(feature for recipe in recipes for feature in recipe_features(recipe))
+    if not features:
+        return
+    await store.add_feature_counts(features)
+    model = await store.increment_marker(SIMILARITY_MODEL_ID, "recipes", len(recipes))
+
+    new_ids = [recipe["id"] for recipe in recipes]
+    keys = sorted({feature.split(":", 1)[1] for feature in features if feature.startswith("ingredient:")})
+    candidates = await store.recipes_sharing(
+        "ingredient_keys", keys, new_ids, SIMILARITY_FIELDS, MAX_SIMILARITY_CANDIDATES
+    ) if keys else []
+    # Recipes sharing only dietary tags fill the rest of the budget
+    tags = sorted({tag for recipe in recipes for tag in recipe.get("dietary_tags", [])})
+    if tags and len(candidates) < MAX_SIMILARITY_CANDIDATES:
+        candidates += await store.recipes_sharing(
+            "dietary_tags", tags, new_ids + [recipe["id"] for recipe in candidates],
+            SIMILARITY_FIELDS, MAX_SIMILARITY_CANDIDATES - len(candidates)
+        )
+    candidate_features = {feature for recipe in candidates for feature in recipe_features(recipe)}
+    document_frequency = await store.feature_counts(candidate_features | set(features))
+
+    lists, offers = await asyncio.get_running_loop().run_in_executor(
+        None, score_new_recipes, recipes, candidates, document_frequency, model["recipes"], SIMILAR_TOP_K
+    )
+
+    # Only offer recipes that beat the current last place of a full list
+    floors = {
+        recipe_id: similar[-1]["score"] if len(similar) >= SIMILAR_TOP_K else 0.0
+        for recipe_id, similar in (await store.get_similar_lists(offers)).items()
+    }
+    better_offers = {}
+    for recipe_id, offered in offers.items():
+        better = [{"id": n, "score": score} for n, score in offered if score > floors.get(recipe_id, 0.0)]
+        if better:
+            better_offers[recipe_id] = better
+    # Offers are merged by the database, so concurrent updates from other workers are not overwritten
+    await store.update_similar_lists(
+        {recipe_id: [{"id": n, "score": score} for n, score in neighbours] for recipe_id, neighbours in lists.items()},
+        better_offers,
+        SIMILAR_TOP_K
+    )
+
+similarity_queue: List[dict] = []
+similarity_drain: Optional[asyncio.Task] = None
+
+def queue_similarity_update(recipes: List[dict]):
+    """Score new recipes in the background, coalescing bursts of writes into batches"""
+    global similarity_drain
+    similarity_queue.extend(recipes)
+    if similarity_drain is None or similarity_drain.done():
+        similarity_drain = run_in_background(drain_similarity_updates(), "similarity update")
+
+async def drain_similarity_updates():
+    while similarity_queue:
+        batch = similarity_queue[:BULK_BATCH_SIZE]
+        del similarity_queue[:BULK_BATCH_SIZE]
+        try:
+            await update_similarities(batch)
+        except Exception as e:
+            logger.error(f"Error updating similar recipes for {len(batch)} new recipes: {e}")
+
+@api_router.get("/recipes/{recipe_id}/similar", response_model=List[SimilarRecipe])
+async def get_similar_recipes(
+    recipe_id: str,
+    limit: int = Query(6, ge=1, le=SIMILAR_TOP_K, description="Number of similar recipes")
+):
+    similar = await store.get_similar(recipe_id)
+    if similar is None:
+        if not await store.get_recipe(recipe_id, ("id",)):
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        # Not computed yet, the background job will catch up
+        return []
+
+    neighbours = similar[:limit]
+    found = {recipe["id"]: recipe for recipe in await store.get_recipes([n["id"] for n in neighbours], SUMMARY_FIELDS)}
+    return [
+        SimilarRecipe(**found[neighbour["id"]], score=neighbour["score"])
+        for neighbour in neighbours if neighbour["id"] in found
+    ]
+
+# Search suggestions
+# Served from an in-memory prefix index built at startup, so typeahead
+# keystrokes never reach the database. Recipes written through this worker
+# are queued and merged in batches in a worker thread; writes taken by other
+# workers or `manage.py import-recipes` appear after this worker restarts.
+SUGGEST_FIELDS = ("id", "title", "ingredients", "dietary_tags")
+MAX_SUGGESTIONS = 20
+
+suggest_index = SuggestIndex(tag_label=dietary_tag_label)
+suggestion_queue: List[dict] = []
+suggestion_drain: Optional[asyncio.Task] = None
+suggestions_rebuilding = False
+
+def queue_suggestion_update(recipes: List[dict]):
+    """Index new recipes off the event loop, coalescing bursts of writes into one merge"""
+    suggestion_queue.extend(recipes)
+    start_suggestion_drain()
+
+def start_suggestion_drain():
+    global suggestion_drain
+    if not suggestions_rebuilding and (suggestion_drain is None or suggestion_drain.done()):
+        suggestion_drain = run_in_background(drain_suggestion_updates(), "suggestion update")
+
+async def drain_suggestion_updates():
+    # One merge at a time, and none while a rebuild is about to replace the index
+    while suggestion_queue and not suggestions_rebuilding:
+        batch = suggestion_queue[:]
+        suggestion_queue.clear()
+        await asyncio.get_running_loop().run_in_executor(None, suggest_index.add, batch)
+
+async def rebuild_suggestions():
+    """Rebuild the suggestion index from the stored recipes"""
+    global suggest_index, suggestions_rebuilding
+    suggestions_rebuilding = True
+    try:
+        if suggestion_drain is not None and not suggestion_drain.done():
+            await suggestion_drain
+        recipes = [recipe async for recipe in store.iter_recipes(SUGGEST_FIELDS)]
+        index = SuggestIndex(tag_label=dietary_tag_label)
+        await asyncio.get_running_loop().run_in_executor(None, index.build, recipes)
+        suggest_index = index
+    finally:
+        suggestions_rebuilding = False
+    # Recipes queued meanwhile go into the new index
+    start_suggestion_drain()
+    logger.info(f"Suggestion index built with {len(index)} terms")
+
+@api_router.get("/suggest", response_model=List[Suggestion])
+async def get_suggestions(
+    q: str = Query("", max_length=100, description="What the user has typed so far"),
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS, description="Maximum number of suggestions"),
+    types: Optional[str] = Query(None, description=f"Restrict to these types (comma-separated: {', '.join(SUGGESTION_TYPES)})")
+):
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()] if types else None
+    invalid = set(kinds or ()) - set(SUGGESTION_TYPES)
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid suggestion type '{sorted(invalid)[0]}', expected one of: {', '.join(SUGGESTION_TYPES)}"
+        )
+    return suggest_index.suggest(q, limit=limit, kinds=kinds)
 
 # Personal Story Endpoints
 @api_router.get("/personal-story", response_model=PersonalStory)
-async def get_personal_story():
-    story = await db.personal_stories.find_one()
-    if not story:
-        raise HTTPException(status_code=404, detail="Personal story not found")
-    return PersonalStory(**story)
+async def get_personal_story(request: Request):
+    cache_key = ("personal-story",)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return conditional_response(request, cached, CACHE_CONTROL["personal-story"])
+
+    async def load() -> RenderedResponse:
+        generation = response_cache.generation("personal-story")
+        story = await store.get_personal_story(STORY_FIELDS)
+        if not story:
+            raise HTTPException(status_code=404, detail="Personal story not found")
+
+        result = story if FAST_RESPONSES else PersonalStory(**story)
+        rendered = render_json(result, last_modified=story["updated_at"], fast=FAST_RESPONSES)
+        response_cache.set(cache_key, rendered, generation=generation)
+        return rendered
+
+    rendered = await single_flight.run(cache_key, load)
+    return conditional_response(request, rendered, CACHE_CONTROL["personal-story"])
+
+# Homepage bundle
+# The landing page's featured cards, catalog stats and story in one small
+# response, so a page view never downloads the catalog. It is cached like the
+# other reads and rebuilt in the background after recipe writes, at most once
+# per HOME_REBUILD_DELAY_SECONDS however many writes land (a bulk import
+# invalidates it for every batch).
+HOME_FEATURED_RECIPES = 3
+HOME_REBUILD_DELAY_SECONDS = 1.0
+
+home_rebuild_scheduled = False
+
+def schedule_home_rebuild():
+    """Rebuild the bundle shortly, once for any number of writes in between"""
+    global home_rebuild_scheduled
+    if home_rebuild_scheduled:
+        return
+    home_rebuild_scheduled = True
+
+    async def rebuild():
+        global home_rebuild_scheduled
+        try:
+            await asyncio.sleep(HOME_REBUILD_DELAY_SECONDS)
+        finally:
+            # Writes from here on schedule another rebuild, since this one may not see them
+            home_rebuild_scheduled = False
+        await single_flight.run(("home",), build_home_bundle)
+
+    run_in_background(rebuild(), "homepage bundle rebuild")
+
+async def build_home_bundle() -> RenderedResponse:
+    """Render the homepage bundle and store it in the response cache"""
+    generation = response_cache.generation("home")
+    featured, recipe_count, (filters, filters_modified), story = await asyncio.gather(
+        store.find_recipes(RecipeFilter(), SUMMARY_FIELDS, "oldest", limit=HOME_FEATURED_RECIPES),
+        # Collection metadata, so the count stays O(1) however large the catalog grows
+        store.estimated_recipe_count(),
+        load_dietary_filters(),
+        store.get_personal_story(STORY_FIELDS),
+    )
+
+    bundle = {
+        "featured_recipes": response_documents(featured, RecipeSummary),
+        "stats": {"recipe_count": recipe_count, "dietary_filters": filters},
+        "personal_story": story if FAST_RESPONSES or story is None else PersonalStory(**story),
+    }
+    modified = [recipe["updated_at"] for recipe in featured] + [filters_modified, story and story["updated_at"]]
+    rendered = render_json(
+        bundle if FAST_RESPONSES else HomeBundle(**bundle),
+        last_modified=max((value for value in modified if value), default=None),
+        fast=FAST_RESPONSES
+    )
+    response_cache.set(("home",), rendered, generation=generation)
+    return rendered
+
+@api_router.get("/home", response_model=HomeBundle)
+async def get_home(request: Request):
+    """Featured recipes, catalog stats and the personal story for the landing page"""
+    cache_key = ("home",)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return conditional_response(request, cached, CACHE_CONTROL["home"])
+
+    rendered = await single_flight.run(cache_key, build_home_bundle)
+    return conditional_response(request, rendered, CACHE_CONTROL["home"])
+
+# Admin Endpoints
+# Served only with ADMIN_TOKEN set, to requests sending it as a bearer token;
+# without it the admin routes answer 404 as if they did not exist.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+async def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+@api_router.get("/admin/cache-stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """Hit, miss and eviction counters for sizing the response cache"""
+    return {**response_cache.stats(), "single_flight": single_flight.stats()}
+
+@api_router.get("/admin/slow-queries", dependencies=[Depends(require_admin)])
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=100, description="Number of query shapes"),
+    sort: str = Query("total", description="Rank by 'total' time, worst single run ('max') or 'count'")
+):
+    """Slowest query shapes since startup, with their sampled explain plans"""
+    if sort not in SLOW_QUERY_SORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort '{sort}', expected one of: {', '.join(SLOW_QUERY_SORTS)}"
+        )
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "explain_rate": slow_query_log.explain_rate,
+        "explain_verbosity": SLOW_QUERY_EXPLAIN_VERBOSITY,
+        "queries": slow_query_log.top(limit=limit, sort=sort)
+    }
+
+@api_router.get("/ready")
+async def get_readiness():
+    """Whether this worker's database initialization and indexes are in place"""
+    if database_status == "ready":
+        missing = await store.missing_indexes()
+        similarity_model = await store.get_marker(SIMILARITY_MODEL_ID)
+    else:
+        missing = list(EXPECTED_INDEXES)
+        similarity_model = None
+    ready = database_status == "ready" and not missing
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "startup_mode": STARTUP_MODE,
+            "database": database_status,
+            "version": DATABASE_VERSION,
+            "missing_indexes": missing,
+            # The suggestion index fills in after the database is ready; until then
+            # suggestions come back empty. Similar recipes need a table build
+            "suggestion_terms": len(suggest_index),
+            "similar_recipes_ready": similarity_model is not None,
+        }
+    )
+
+async def explain_slow_query(command: dict) -> dict:
+    """Re-run a slow command under explain to see its winning plan"""
+    return await store.explain(command, SLOW_QUERY_EXPLAIN_VERBOSITY)
+
+@app.exception_handler(ExecutionTimeout)
+async def query_timeout_handler(request: Request, exc: ExecutionTimeout):
+    """Answer queries that ran past their time budget with a retryable 503"""
+    logger.warning(f"Query for {request.url.path} exceeded the {QUERY_TIME_BUDGET_MS}ms budget")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The query took too long, please narrow the search and try again"},
+        headers={"Retry-After": "1"}
+    )
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return metrics_response()
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -175,8 +1428,25 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
+# Response compression: COMPRESSION_MIN_BYTES=0 disables it, levels trade CPU for bandwidth
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+if COMPRESSION_MIN_BYTES > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_BYTES,
+        codecs=available_codecs(
+            gzip_level=int(os.environ.get('GZIP_LEVEL', '6')),
+            brotli_quality=int(os.environ.get('BROTLI_QUALITY', '4')),
+            zstd_level=int(os.environ.get('ZSTD_LEVEL', '3')),
+        ),
+    )
+
+# Outermost, so request timings include every other middleware and sizes are as sent
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -349,43 +1619,222 @@ SEED_PERSONAL_STORY = {
 }
 
 async def seed_database():
-    """Seed the database with initial data if collections are empty"""
+    """Seed the database with initial data if it is empty, and build the indexes"""
+    # Check if there are any recipes yet
+    recipe_count = await store.estimated_recipe_count()
+    if recipe_count == 0:
+        logger.info("Seeding recipes...")
+        await store.insert_recipes([build_recipe(recipe_data).dict() for recipe_data in SEED_RECIPES])
+        logger.info(f"Successfully seeded {len(SEED_RECIPES)} recipes")
+
+    # Build the dietary tag counters on first boot or after seeding
+    if recipe_count == 0 or not await store.tag_counts():
+        await rebuild_tag_counts()
+        logger.info("Dietary tag counters rebuilt")
+
+    # Check if personal story exists
+    if await store.get_personal_story(("id",)) is None:
+        logger.info("Seeding personal story...")
+        story = PersonalStory(**SEED_PERSONAL_STORY)
+        await store.insert_personal_story(story.dict())
+        logger.info("Successfully seeded personal story")
+
+    # Recipes stored before the current derivation get their derived fields recomputed;
+    # this runs before any worker is prepared, so there are no caches to invalidate
+    derived = await store.get_marker(DERIVED_FIELDS_ID)
+    if (derived or {}).get("version") != DERIVED_FIELDS_VERSION:
+        if recipe_count > 0:
+            updated = await backfill_derived_fields(worker_hooks=False)
+            logger.info(f"Backfilled derived fields for {updated} recipes")
+        await store.set_marker(DERIVED_FIELDS_ID, {"version": DERIVED_FIELDS_VERSION, "completed_at": datetime.utcnow()})
+
+    # Create indexes for better search performance
+    await store.ensure_indexes()
+    logger.info("Database indexes created successfully")
+
+    # Build the similar-recipe table on first boot; larger catalogs are left to manage.py
+    if await store.get_marker(SIMILARITY_MODEL_ID) is None:
+        catalog_size = await store.estimated_recipe_count()
+        if catalog_size <= SIMILARITY_MAX_RECIPES:
+            await rebuild_similarities()
+        else:
+            logger.warning(
+                f"Skipping the similar-recipe build for {catalog_size} recipes, "
+                f"run 'python manage.py rebuild-similar'"
+            )
+
+# Database initialization
+# Seeding and index builds run once per deployment rather than on every worker
+# boot: one worker takes a lock and initializes, the rest carry on
+# serving and only wait for it in the background. The recorded version changes
+# whenever the index definitions do, so a deploy with new indexes re-runs it.
+#   STARTUP_MODE=background  initialize off the critical path (default)
+#   STARTUP_MODE=inline      initialize before accepting traffic
+#   STARTUP_MODE=external    never initialize, run `python manage.py init` instead
+STARTUP_MODES = ("background", "inline", "external")
+STARTUP_MODE = os.environ.get('STARTUP_MODE', 'background').lower()
+if STARTUP_MODE not in STARTUP_MODES:
+    raise RuntimeError(f"Invalid STARTUP_MODE '{STARTUP_MODE}', expected one of: {', '.join(STARTUP_MODES)}")
+if STARTUP_MODE == "external" and STORAGE_ENGINE == "memory":
+    # An init command would fill its own process's memory, never this worker's
+    raise RuntimeError("STARTUP_MODE=external needs a shared database, it cannot be used with STORAGE_ENGINE=memory")
+
+INIT_STATE_ID = "database-init"
+INIT_LOCK_ID = "database-init-lock"
+INIT_LOCK_SECONDS = 120
+INIT_POLL_SECONDS = 1.0
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+DATABASE_VERSION = hashlib.blake2b(
+    json.dumps(
+        {**INDEX_DEFINITIONS, "derived_fields": DERIVED_FIELDS_VERSION},
+        sort_keys=True, default=str
+    ).encode(),
+    digest_size=6
+).hexdigest()
+
+# This worker's view of initialization: pending, initializing, waiting, ready or failed
+database_status = "pending"
+
+async def database_initialized() -> bool:
+    """Whether the current DATABASE_VERSION has been initialized"""
+    state = await store.get_marker(INIT_STATE_ID)
+    return bool(state) and state.get("version") == DATABASE_VERSION
+
+async def acquire_init_lock() -> bool:
+    """Take (or renew) the initialization lock unless another live worker holds it"""
+    return await store.acquire_lock(INIT_LOCK_ID, WORKER_ID, INIT_LOCK_SECONDS)
+
+async def hold_init_lock():
+    """Keep renewing the lock while a long index build runs"""
+    while True:
+        await asyncio.sleep(INIT_LOCK_SECONDS / 3)
+        await acquire_init_lock()
+
+async def initialize_database(force: bool = False) -> bool:
+    """Seed and build indexes once across all workers; returns whether this call did the work"""
+    global database_status
+    while force or not await database_initialized():
+        if await acquire_init_lock():
+            database_status = "initializing"
+            renewer = asyncio.create_task(hold_init_lock())
+            try:
+                started = time.perf_counter()
+                await seed_database()
+                await store.set_marker(
+                    INIT_STATE_ID,
+                    {"version": DATABASE_VERSION, "completed_at": datetime.utcnow(), "owner": WORKER_ID}
+                )
+                logger.info(f"Database initialized (version {DATABASE_VERSION}) in {time.perf_counter() - started:.1f}s")
+                database_status = "ready"
+                return True
+            finally:
+                renewer.cancel()
+                await store.release_lock(INIT_LOCK_ID, WORKER_ID)
+
+        # Another worker is initializing; wait for it to finish or for its lock to expire
+        database_status = "waiting"
+        await asyncio.sleep(INIT_POLL_SECONDS)
+
+    database_status = "ready"
+    return False
+
+async def wait_for_database():
+    """Wait until `manage.py init` (or another deployment) has initialized the database"""
+    global database_status
+    database_status = "waiting"
+    while not await database_initialized():
+        await asyncio.sleep(INIT_POLL_SECONDS)
+    database_status = "ready"
+
+async def prepare_worker():
+    """Initialization, then the suggestion index that depends on the data"""
+    global database_status
     try:
-        # Check if recipes collection is empty
-        recipe_count = await db.recipes.count_documents({})
-        if recipe_count == 0:
-            logger.info("Seeding recipes collection...")
-            for recipe_data in SEED_RECIPES:
-                recipe = Recipe(**recipe_data)
-                await db.recipes.insert_one(recipe.dict())
-            logger.info(f"Successfully seeded {len(SEED_RECIPES)} recipes")
-        
-        # Check if personal story exists
-        story_count = await db.personal_stories.count_documents({})
-        if story_count == 0:
-            logger.info("Seeding personal story...")
-            story = PersonalStory(**SEED_PERSONAL_STORY)
-            await db.personal_stories.insert_one(story.dict())
-            logger.info("Successfully seeded personal story")
-            
-        # Create indexes for better search performance
-        await db.recipes.create_index([("title", "text"), ("description", "text"), ("ingredients", "text")])
-        await db.recipes.create_index("dietary_tags")
-        logger.info("Database indexes created successfully")
-        
+        if STARTUP_MODE == "external":
+            await wait_for_database()
+        else:
+            await initialize_database()
+    except Exception:
+        database_status = "failed"
+        raise
+    await warm_worker()
+    # Responses computed while preparing may predate the seed data, indexes or
+    # suggestions; drop them rather than serve them for the rest of their TTL
+    single_flight.clear()
+    response_cache.clear()
+
+async def warm_worker():
+    """The in-memory state built from the initialized data"""
+    await rebuild_suggestions()
+    try:
+        await seed_trending()
     except Exception as e:
-        logger.error(f"Error seeding database: {e}")
+        # An empty ranking fills from live views, so this never fails startup
+        logger.error(f"Error seeding trending recipes: {e}")
 
 @app.on_event("startup")
 async def startup_event():
-    await seed_database()
+    global database_status, view_flusher
+    slow_query_log.attach(asyncio.get_running_loop(), explain_slow_query)
+    view_flusher = asyncio.create_task(flush_view_counts_periodically())
+    if STARTUP_MODE == "inline":
+        try:
+            await initialize_database()
+        except Exception as e:
+            # Fail startup rather than serve (and prepare the worker) from an uninitialized database
+            database_status = "failed"
+            view_flusher.cancel()
+            logger.error(f"Error initializing database: {e}")
+            raise
+        await warm_worker()
+    else:
+        # Accept traffic right away; /api/ready reports when everything is in place
+        run_in_background(prepare_worker(), "worker preparation")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    if view_flusher is not None:
+        view_flusher.cancel()
+        # Let a flush in progress put its counts back before the final one
+        try:
+            await view_flusher
+        except asyncio.CancelledError:
+            pass
+    # Drain the views counted since the last periodic flush
+    try:
+        await flush_view_counts()
+    except Exception as e:
+        logger.error(f"Error flushing view counts on shutdown: {e}")
+    store.close()
 
 # React static file serving - MUST BE AT THE VERY END
-if os.path.exists("build"):
+# STATIC_MODE=production (default) indexes the build once at startup and serves
+# it from memory with precompressed variants and long-lived caching for hashed
+# assets; STATIC_MODE=development reads the files on every request so a rebuilt
+# bundle is picked up without a restart.
+STATIC_MODE = os.environ.get('STATIC_MODE', 'production').lower()
+if STATIC_MODE not in ("production", "development"):
+    raise RuntimeError(f"Invalid STATIC_MODE '{STATIC_MODE}', expected 'production' or 'development'")
+
+if os.path.exists("build") and STATIC_MODE == "production":
+    static_bundle = StaticBundle(Path("build")).build()
+
+    # Catch-all route for React Router - MUST BE LAST
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+    async def serve_react_app(request: Request, full_path: str):
+        # Don't serve React for API routes
+        if full_path.startswith("api"):
+            raise HTTPException(status_code=404, detail="API route not found")
+
+        response = static_bundle.response(request, full_path)
+        if response is not None:
+            return response
+        # Missing assets are a 404, anything else is a client-side route
+        if full_path.startswith(("static/", "assets/")):
+            raise HTTPException(status_code=404, detail="Not Found")
+        return static_bundle.index(request)
+elif os.path.exists("build"):
     # Serve static files (CSS, JS, images, etc.)
     app.mount("/static", StaticFiles(directory="build/static"), name="static")
     
@@ -0,0 +1,187 @@
+"""
+Precomputed "similar recipes" neighbours
+
+Each recipe becomes a sparse, IDF-weighted, L2-normalized vector over its
+dietary tags and canonical ingredient keys. Cosine similarities are computed
+as batched sparse matrix products and only the top-k neighbours per recipe
+are kept, so memory stays bounded by the batch size rather than n^2.
+
+A full build is quadratic and runs once (at database initialization or via
+manage.py rebuild-similar). Recipes added later are scored by
+score_new_recipes against candidates fetched from the database, with the
+document frequencies stored by the last build, so no process has to keep
+the whole catalog in memory.
+"""
+
+import math
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from normalization import ingredient_keys
+
+# Tags are broad (most recipes are gluten-free), so ingredients carry more signal
+TAG_WEIGHT = 0.5
+INGREDIENT_WEIGHT = 1.0
+
+# Upper bound on dense similarity cells materialized per batch (rows x recipes)
+MAX_BATCH_CELLS = 4_000_000
+
+# (recipe id, cosine similarity) pairs, best first
+Neighbours = List[Tuple[str, float]]
+
+
+def recipe_features(recipe: dict) -> Dict[str, float]:
+    """Weighted feature set for one recipe"""
+    features = {f"tag:{tag}": TAG_WEIGHT for tag in recipe.get("dietary_tags", [])}
+    for key in ingredient_keys(recipe.get("ingredients", [])):
+        features[f"ingredient:{key}"] = INGREDIENT_WEIGHT
+    return features
+
+
+def inverse_document_frequency(document_frequency: int, total: int) -> float:
+    return math.log((1 + total) / (1 + document_frequency)) + 1.0
+
+
+def normalized_rows(rows: List[int], columns: List[int], values: List[float], shape: Tuple[int, int]) -> sparse.csr_matrix:
+    """Sparse matrix from coordinates with every row scaled to unit length"""
+    vectors = sparse.csr_matrix((np.asarray(values, dtype=np.float32), (rows, columns)), shape=shape)
+    norms = np.sqrt(vectors.multiply(vectors).sum(axis=1)).A1
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(vectors).tocsr().astype(np.float32)
+
+
+def top_k_columns(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k column positions and scores per row, best first, padded with -1"""
+    rows, columns = scores.shape
+    positions = np.full((rows, top_k), -1, dtype=np.int64)
+    values = np.zeros((rows, top_k), dtype=np.float32)
+    k = min(top_k, columns)
+    if k == 0:
+        return positions, values
+
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+    keep = candidate_scores > 0
+    positions[:, :k] = np.where(keep, candidates, -1)
+    values[:, :k] = np.where(keep, candidate_scores, 0.0)
+    return positions, values
+
+
+class SimilarityIndex:
+    """Feature matrix plus the top-k neighbour table for every recipe, for a full build"""
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self.ids: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.document_frequency: List[int] = []
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.neighbour_positions = np.empty((0, top_k), dtype=np.int64)
+        self.neighbour_scores = np.empty((0, top_k), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _vectorize(self, recipes: List[dict]) -> sparse.csr_matrix:
+        """Rows for the given recipes, building the vocabulary"""
+        rows, columns, values = [], [], []
+        for row, recipe in enumerate(recipes):
+            for feature, weight in recipe_features(recipe).items():
+                column = self.vocabulary.setdefault(feature, len(self.vocabulary))
+                if column == len(self.document_frequency):
+                    self.document_frequency.append(0)
+                rows.append(row)
+                columns.append(column)
+                values.append(weight)
+        # Document frequencies must be complete before IDF weighting
+        for column in columns:
+            self.document_frequency[column] += 1
+
+        total = len(recipes)
+        values = [
+            value * inverse_document_frequency(self.document_frequency[column], total)
+            for value, column in zip(values, columns)
+        ]
+        return normalized_rows(rows, columns, values, (len(recipes), len(self.vocabulary)))
+
+    def _similarities(self) -> Iterable[Tuple[int, np.ndarray]]:
+        """Dense similarity rows for every recipe, in bounded batches"""
+        total = self.matrix.shape[0]
+        batch_rows = max(1, MAX_BATCH_CELLS // max(total, 1))
+        transposed = self.matrix.T.tocsc()
+        for batch_start in range(0, total, batch_rows):
+            batch_stop = min(batch_start + batch_rows, total)
+            scores = self.matrix[batch_start:batch_stop].dot(transposed).toarray()
+            # A recipe is never its own neighbour
+            scores[np.arange(batch_stop - batch_start), np.arange(batch_start, batch_stop)] = -1.0
+            yield batch_start, scores
+
+    def build(self, recipes: List[dict]):
+        """Vectorize every recipe and compute all neighbour lists from scratch"""
+        self.ids = [recipe["id"] for recipe in recipes]
+        self.vocabulary = {}
+        self.document_frequency = []
+        self.matrix = self._vectorize(recipes)
+
+        total = len(self.ids)
+        self.neighbour_positions = np.full((total, self.top_k), -1, dtype=np.int64)
+        self.neighbour_scores = np.zeros((total, self.top_k), dtype=np.float32)
+        for start, scores in self._similarities():
+            positions, values = top_k_columns(scores, self.top_k)
+            self.neighbour_positions[start:start + len(scores)] = positions
+            self.neighbour_scores[start:start + len(scores)] = values
+
+    def feature_frequencies(self) -> Dict[str, int]:
+        """Number of recipes carrying each feature, stored for incremental scoring"""
+        return {feature: self.document_frequency[column] for feature, column in self.vocabulary.items()}
+
+    def neighbours(self, position: int) -> Neighbours:
+        """Precomputed neighbours for the recipe at a position, best first"""
+        return [
+            (self.ids[neighbour], round(float(score), 4))
+            for neighbour, score in zip(self.neighbour_positions[position], self.neighbour_scores[position])
+            if neighbour >= 0
+        ]
+
+
+def score_new_recipes(recipes: List[dict], candidates: List[dict], document_frequency: Dict[str, int],
+                      total: int, top_k: int) -> Tuple[Dict[str, Neighbours], Dict[str, Neighbours]]:
+    """Neighbours for new recipes among the candidates and each other, using stored IDF weights
+
+    Returns the new recipes' top-k lists, and for every candidate the
+    (new recipe id, score) pairs that could enter its own list.
+    """
+    pool = candidates + recipes
+    vocabulary: Dict[str, int] = {}
+    rows, columns, values = [], [], []
+    for row, recipe in enumerate(pool):
+        for feature, weight in recipe_features(recipe).items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(feature, len(vocabulary)))
+            values.append(weight * inverse_document_frequency(document_frequency.get(feature, 0), total))
+    matrix = normalized_rows(rows, columns, values, (len(pool), len(vocabulary)))
+
+    start = len(candidates)
+    scores = matrix[start:].dot(matrix.T).toarray()
+    scores[np.arange(len(recipes)), np.arange(start, len(pool))] = -1.0
+
+    positions, values = top_k_columns(scores, top_k)
+    lists = {
+        recipe["id"]: [
+            (pool[position]["id"], round(float(score), 4))
+            for position, score in zip(positions[row], values[row]) if position >= 0
+        ]
+        for row, recipe in enumerate(recipes)
+    }
+    offers: Dict[str, Neighbours] = {}
+    for row, column in zip(*np.nonzero(scores[:, :start] > 0)):
+        offers.setdefault(candidates[column]["id"], []).append(
+            (recipes[row]["id"], round(float(scores[row, column]), 4))
+        )
+    return lists, offers
@@ -0,0 +1,210 @@
+"""
+Slow-query log with sampled explain plans
+
+Commands slower than the threshold are grouped by their normalized shape:
+the filter, pipeline and sort with every literal value replaced by "?", so
+"dietary_tags $all [vegan]" and "[keto, paleo]" are one shape and no user
+data is kept. For a sample of slow commands the explain() winning plan is
+fetched, recording the plan stages and, with executionStats verbosity, the
+documents examined versus returned.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Commands whose shape and plan are worth recording
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# Parts of a command that make up its shape; sort and projection keys are kept verbatim
+SHAPE_FIELDS = ("filter", "query", "pipeline", "sort", "projection", "key")
+VERBATIM_KEYS = {"sort", "$sort", "projection", "$project"}
+
+# queryPlanner only plans the command; executionStats also runs it
+EXPLAIN_VERBOSITIES = ("queryPlanner", "executionStats")
+
+# Driver-added fields that must not be sent back inside an explain command
+DRIVER_FIELDS = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "readConcern", "signature"}
+
+SLOW_QUERY_SORTS = ("total", "max", "count")
+
+
+def shape_value(value: Any, key: Optional[str] = None) -> Any:
+    """Replace literal values with '?' while keeping field names and operators"""
+    if key in VERBATIM_KEYS:
+        return value
+    if isinstance(value, dict):
+        return {field: shape_value(item, field) for field, item in value.items()}
+    if isinstance(value, list):
+        # $in: [a, b, c] and $in: [a] are the same shape; pipelines keep their stages
+        if all(not isinstance(item, (dict, list)) for item in value):
+            return ["?"] if value else []
+        return [shape_value(item) for item in value]
+    return "?"
+
+
+def query_shape(command_name: str, collection: str, command: dict) -> dict:
+    """Normalized, value-free description of a command"""
+    shape = {"command": command_name, "collection": collection}
+    for field in SHAPE_FIELDS:
+        if field in command:
+            shape[field] = shape_value(command[field], field)
+    return shape
+
+
+def _find_key(document: Any, key: str) -> Optional[Any]:
+    """Depth-first search for a key in an explain document"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def plan_stages(plan: dict) -> List[str]:
+    """Stage names of a winning plan from the top down, e.g. ['LIMIT', 'FETCH', 'IXSCAN recipe_text']"""
+    stages = []
+    plan = plan.get("queryPlan", plan)
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage} {plan['indexName']}"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    """The parts of an explain result worth keeping; the counts need executionStats"""
+    winning_plan = _find_key(explain, "winningPlan") or {}
+    stats = _find_key(explain, "executionStats") or {}
+    stages = plan_stages(winning_plan)
+    return {
+        "stages": stages,
+        "collection_scan": any(stage.startswith("COLLSCAN") for stage in stages),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+def explain_command(command: dict) -> dict:
+    """Rebuild an executed command into the body of an explain command"""
+    return {field: value for field, value in command.items() if field not in DRIVER_FIELDS}
+
+
+class SlowQueryLog:
+    """Per-shape statistics for commands over the slow threshold"""
+
+    def __init__(self, threshold_ms: float = 100, explain_rate: float = 0.1,
+                 max_shapes: int = 500):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.max_shapes = max_shapes
+        self._shapes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explain: Optional[Callable[[dict], Awaitable[dict]]] = None
+        self._tasks = set()
+        self._pending = set()  # Shapes with an explain in flight
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop, explain: Callable[[dict], Awaitable[dict]]):
+        """Enable sampled explains, run on the given event loop"""
+        self._loop = loop
+        self._explain = explain
+
+    def wants(self, command_name: str) -> bool:
+        """Whether commands of this kind are tracked at all"""
+        return self.enabled and command_name in EXPLAINABLE_COMMANDS
+
+    def record(self, command_name: str, collection: str, command: dict, duration_ms: float):
+        """Account for a finished command; called from pymongo's monitoring threads"""
+        if duration_ms < self.threshold_ms or not self.wants(command_name):
+            return
+
+        shape = query_shape(command_name, collection, command)
+        key = json.dumps(shape, sort_keys=True, default=str)
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    return
+                entry = self._shapes[key] = {
+                    "shape": shape, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "last_seen": None, "plan": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = datetime.utcnow()
+            explain = key not in self._pending and (entry["plan"] is None or random.random() < self.explain_rate)
+            if explain:
+                self._pending.add(key)
+
+        logger.warning(f"Slow query {duration_ms:.0f}ms: {key}")
+        if explain:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._start_explain, key, explain_command(command))
+            else:
+                self._pending.discard(key)
+
+    def _start_explain(self, key: str, body: dict):
+        task = self._loop.create_task(self._store_plan(key, body))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _store_plan(self, key: str, body: dict):
+        try:
+            plan = summarize_explain(await self._explain(body))
+        except Exception as e:
+            logger.warning(f"Explain failed for slow query {key}: {e}")
+            return
+        finally:
+            self._pending.discard(key)
+        with self._lock:
+            if key in self._shapes:
+                self._shapes[key]["plan"] = plan
+        logger.warning(
+            f"Slow query plan {' > '.join(plan['stages'])}: examined {plan['docs_examined']} docs, "
+            f"returned {plan['returned']}"
+        )
+
+    def top(self, limit: int = 20, sort: str = "total") -> List[dict]:
+        """Slowest shapes since startup, by total time, worst single run or frequency"""
+        field = {"total": "total_ms", "max": "max_ms", "count": "count"}[sort]
+        with self._lock:
+            entries = sorted(self._shapes.values(), key=lambda entry: entry[field], reverse=True)[:limit]
+            return [
+                {
+                    **entry,
+                    "total_ms": round(entry["total_ms"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 1),
+                }
+                for entry in entries
+            ]
+
+    def clear(self):
+        """Forget every recorded shape"""
+        with self._lock:
+            self._shapes.clear()
@@ -0,0 +1,168 @@
+"""
+In-memory serving of the bundled React build
+
+The build directory is indexed once at startup: every file's content type,
+size, ETag and precompressed .br/.gz siblings are recorded, and files small
+enough are read into memory (index.html always is), so a page view costs a
+dict lookup instead of stat() and open() calls. Content-hashed names
+("main.3f2a9c1e.js") are cached by browsers as immutable; everything else is
+revalidated with its ETag.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+from responses import accepted_encodings, etag_matches
+
+logger = logging.getLogger(__name__)
+
+# Precompressed sibling suffixes and their Content-Encoding, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Build tools put an 8+ hex character content hash in the name of every emitted asset
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(chunk\.)?[a-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Text formats worth gzipping at startup when the build has no .gz sibling
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml",
+                      "application/manifest+json")
+MIN_COMPRESS_BYTES = 1024
+
+
+class StaticVariant(NamedTuple):
+    """One encoding of a file, held in memory or left on disk"""
+    encoding: Optional[str]
+    size: int
+    etag: str
+    body: Optional[bytes] = None
+    path: Optional[Path] = None
+    stat: Optional[os.stat_result] = None
+
+
+class StaticFile(NamedTuple):
+    media_type: str
+    cache_control: str
+    variants: Dict[Optional[str], StaticVariant]
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class StaticBundle:
+    """Index of a build directory, answering requests without touching the filesystem"""
+
+    def __init__(self, root: Path, index: str = "index.html",
+                 max_file_bytes: int = 1024 * 1024, max_memory_bytes: int = 64 * 1024 * 1024):
+        self.root = Path(root)
+        self.index_name = index
+        self.max_file_bytes = max_file_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_bytes = 0
+        self.files: Dict[str, StaticFile] = {}
+
+    def _load(self, path: Path, stat: os.stat_result, encoding: Optional[str], pinned: bool) -> StaticVariant:
+        """Read small files into memory, within the budget; larger ones stay on disk"""
+        fits = stat.st_size <= self.max_file_bytes and self.memory_bytes + stat.st_size <= self.max_memory_bytes
+        if pinned or fits:
+            body = path.read_bytes()
+            self.memory_bytes += len(body)
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            return StaticVariant(encoding, len(body), f'"{etag}"', body=body)
+        # Files too large to hold get a validator from their size and mtime, like StaticFiles
+        etag = hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode()).hexdigest()
+        return StaticVariant(encoding, stat.st_size, f'"{etag}"', path=path, stat=stat)
+
+    def build(self) -> "StaticBundle":
+        """Walk the build directory once; precompressed siblings become variants of their file"""
+        paths = sorted(path for path in self.root.rglob("*") if path.is_file())
+        siblings = {str(path) for path in paths}
+        for path in paths:
+            # main.js.gz is served as an encoding of main.js, not as a file of its own
+            if any(path.name.endswith(suffix) and str(path)[:-len(suffix)] in siblings for _, suffix in ENCODINGS):
+                continue
+            relative = path.relative_to(self.root).as_posix()
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            pinned = relative == self.index_name
+
+            variants = {None: self._load(path, path.stat(), None, pinned)}
+            for encoding, suffix in ENCODINGS:
+                sibling = f"{path}{suffix}"
+                if sibling in siblings:
+                    variants[encoding] = self._load(Path(sibling), os.stat(sibling), encoding, pinned)
+
+            # Builds without a compression step still get gzip for in-memory text files
+            identity = variants[None]
+            if ("gzip" not in variants and identity.body is not None
+                    and identity.size >= MIN_COMPRESS_BYTES and is_compressible(media_type)):
+                body = gzip.compress(identity.body, compresslevel=9, mtime=0)
+                if len(body) < identity.size:
+                    self.memory_bytes += len(body)
+                    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+                    variants["gzip"] = StaticVariant("gzip", len(body), f'"{etag}"', body=body)
+
+            cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(path.name) else REVALIDATE_CACHE_CONTROL
+            self.files[relative] = StaticFile(media_type, cache_control, variants)
+
+        logger.info(
+            f"Indexed {len(self.files)} static files from {self.root}, "
+            f"{self.memory_bytes / (1024 * 1024):.1f} MiB in memory"
+        )
+        return self
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.files
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def response(self, request: Request, path: str) -> Optional[Response]:
+        """Serve an indexed file in the best encoding the client accepts, or None if unknown"""
+        static_file = self.files.get(path)
+        if static_file is None:
+            return None
+
+        variant = static_file.variants[None]
+        if len(static_file.variants) > 1:
+            accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+            for encoding, _ in ENCODINGS:
+                if encoding in static_file.variants and encoding in accepted:
+                    variant = static_file.variants[encoding]
+                    break
+
+        etag = variant.etag
+        if variant.encoding is None and is_compressible(static_file.media_type):
+            # The compression middleware may encode this body, so its validator is weak on 200s and 304s alike
+            etag = "W/" + etag
+        headers = {"ETag": etag, "Cache-Control": static_file.cache_control}
+        if len(static_file.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if variant.encoding:
+            headers["Content-Encoding"] = variant.encoding
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, variant.etag):
+            return Response(status_code=304, headers=headers)
+
+        if variant.body is None:
+            # stat_result is passed along so FileResponse does not stat the file again
+            return FileResponse(variant.path, media_type=static_file.media_type, headers=headers,
+                                stat_result=variant.stat, method=request.method)
+        body = b"" if request.method == "HEAD" else variant.body
+        headers["Content-Length"] = str(variant.size)
+        return Response(content=body, media_type=static_file.media_type, headers=headers)
+
+    def index(self, request: Request) -> Response:
+        """The app shell, for client-side routes"""
+        return self.response(request, self.index_name)
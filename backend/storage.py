@@ -0,0 +1,1038 @@
+"""
+The storage repository behind the server
+
+Handlers never build database queries themselves: they call the Repository
+operations below, which cover what the API needs and nothing more (recipe
+pages, counts, batch lookups and inserts, the dietary tag counters, the
+personal story, view counts, the similar-recipe table and maintenance
+markers). open_storage() returns the implementation for the configured engine:
+
+- "mongodb": MongoRepository, Motor against MONGO_URL, the default
+- "memory": MemoryRepository, in-process dicts with secondary indexes on the
+  recipe id, dietary tags and ingredient keys, for development, tests and
+  benchmarks without a mongod, and small single-worker deployments
+
+The memory engine stems text searches with a light suffix stemmer rather than
+MongoDB's Snowball stemmer, so rankings can differ slightly. Its data lives in
+the process: run a single worker, and expect an empty catalog after a restart.
+Scans of catalogs with THREAD_SCAN_MIN_RECIPES recipes or more run in a worker
+thread, so the event loop keeps serving other requests while they run.
+"""
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from pymongo import IndexModel, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ExecutionTimeout, OperationFailure
+
+STORAGE_ENGINES = ("mongodb", "memory")
+
+logger = logging.getLogger(__name__)
+
+# Listing sort orders, and the fields each keyset cursor carries. Relevance
+# ranks by text score and is only paged by offset
+RECIPE_SORTS = ("oldest", "newest", "relevance", "total_time")
+SORT_KEYS = {
+    "oldest": (("created_at", 1), ("id", 1)),
+    "newest": (("created_at", -1), ("id", -1)),
+    "total_time": (("total_minutes", 1), ("id", 1)),
+}
+
+# Fields matched by searches; the text index weighs them
+SEARCH_FIELDS = ("title", "description", "ingredients")
+TEXT_INDEX_NAME = "recipe_text"
+TEXT_INDEX_WEIGHTS = {"title": 10, "ingredients": 5, "description": 2}
+# Words of a text search, matched as prefixes by the "prefix" search mode
+SEARCH_WORD = re.compile(r"\w+")
+
+# MongoDB secondary indexes, besides the unique id and text indexes
+RECIPE_INDEXES = [
+    IndexModel("dietary_tags"),
+    IndexModel([("created_at", 1), ("id", 1)]),
+    IndexModel([("total_minutes", 1), ("id", 1)]),
+    IndexModel("ingredient_keys"),
+]
+# Startup reads the most recently viewed recipes to seed trending
+RECIPE_VIEW_INDEXES = [IndexModel("updated_at")]
+EXPECTED_INDEXES = ["id_1", TEXT_INDEX_NAME, *(index.document["name"] for index in RECIPE_INDEXES)]
+# Part of the initialized database version: changing an index re-runs initialization
+INDEX_DEFINITIONS = {
+    "indexes": [index.document for index in RECIPE_INDEXES],
+    "view_indexes": [index.document for index in RECIPE_VIEW_INDEXES],
+    "text": TEXT_INDEX_WEIGHTS,
+}
+
+# Rows per write batch for the similar-recipe table
+SIMILARITY_WRITE_BATCH = 1000
+
+
+class RecipeFilter(NamedTuple):
+    """Which recipes a listing, count or export covers; the conditions combine with AND"""
+    search: Optional[str] = None
+    # "text" (stemmed words), "substring", "regex" (validated by the caller) or
+    # "prefix" (every word starts a word in a search field)
+    search_mode: str = "text"
+    dietary_tags: Tuple[str, ...] = ()  # All of them
+    max_total_time: Optional[int] = None
+    ingredients: Tuple[str, ...] = ()  # Canonical keys, all of them
+    timed: bool = False  # Only recipes with a parsed total time
+
+    @property
+    def text_search(self) -> bool:
+        return bool(self.search) and self.search_mode == "text"
+
+    @property
+    def matches_all(self) -> bool:
+        return not (self.search or self.dietary_tags or self.max_total_time is not None
+                    or self.ingredients or self.timed)
+
+
+def search_words(search: str) -> List[str]:
+    """Words of a text search for prefix matching: negated words stay out, phrases contribute theirs"""
+    return [word for token in search.split() if not token.startswith("-")
+            for word in SEARCH_WORD.findall(token.lower())]
+
+
+def open_storage(engine: str, mongo_url: Optional[str], db_name: str, event_listeners: list = (),
+                 query_time_ms: Optional[int] = None) -> "Repository":
+    """The repository for a storage engine"""
+    if engine == "mongodb":
+        return MongoRepository(mongo_url, db_name, event_listeners=event_listeners, query_time_ms=query_time_ms)
+    if engine == "memory":
+        return MemoryRepository(db_name, query_time_ms=query_time_ms)
+    raise ValueError(f"Unknown storage engine '{engine}', expected one of: {', '.join(STORAGE_ENGINES)}")
+
+
+class Repository:
+    """The storage operations the server uses
+
+    Reads that serve requests are held to query_time_ms and raise pymongo's
+    ExecutionTimeout past it; maintenance reads and writes are not. Recipes
+    are returned with only the requested fields, plus "score" for relevance
+    sorts. Timestamps are naive UTC with millisecond precision.
+    """
+
+    name: str
+    query_time_ms: Optional[int] = None
+
+    # Recipes
+
+    async def find_recipes(self, recipe_filter: RecipeFilter, fields: Iterable[str], sort: str = "oldest",
+                           offset: int = 0, limit: Optional[int] = None, after: Optional[list] = None) -> List[dict]:
+        """One page of matching recipes; after holds the SORT_KEYS values of the previous page's last recipe"""
+        raise NotImplementedError
+
+    async def has_text_match(self, search: str) -> bool:
+        """Whether a text search matches any recipe"""
+        raise NotImplementedError
+
+    async def count_recipes(self, recipe_filter: RecipeFilter) -> Tuple[int, Dict[str, int]]:
+        """Number of matching recipes and how many of them carry each dietary tag"""
+        raise NotImplementedError
+
+    async def estimated_recipe_count(self) -> int:
+        """Catalog size from metadata, without counting"""
+        raise NotImplementedError
+
+    def iter_recipes(self, fields: Iterable[str], recipe_filter: RecipeFilter = RecipeFilter(),
+                     batch_size: int = 500) -> AsyncIterator[dict]:
+        """Every matching recipe, oldest first, read in batches without a time budget"""
+        raise NotImplementedError
+
+    async def get_recipes(self, ids: Iterable[str], fields: Iterable[str]) -> List[dict]:
+        """The recipes with these ids that exist, in no particular order"""
+        raise NotImplementedError
+
+    async def get_recipe(self, recipe_id: str, fields: Iterable[str]) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def insert_recipes(self, recipes: List[dict]) -> List[Tuple[int, str]]:
+        """Insert recipes, skipping duplicate ids; returns (position, message) per recipe not inserted"""
+        raise NotImplementedError
+
+    async def update_recipes(self, updates: Dict[str, dict]):
+        """Set fields on recipes, by recipe id"""
+        raise NotImplementedError
+
+    async def recipes_sharing(self, field: str, values: List[str], exclude_ids: List[str],
+                              fields: Iterable[str], limit: int) -> List[dict]:
+        """Up to limit recipes whose dietary_tags or ingredient_keys contain any of values"""
+        raise NotImplementedError
+
+    # Dietary tag counters
+
+    async def tag_counts(self) -> List[dict]:
+        """Positive counters as {"tag", "count", "updated_at"}, largest first, then by tag"""
+        raise NotImplementedError
+
+    async def recipe_tag_counts(self) -> Dict[str, int]:
+        """Tag counts computed from the recipes themselves"""
+        raise NotImplementedError
+
+    async def apply_tag_count_deltas(self, deltas: Dict[str, int]):
+        """Adjust the counters, dropping those that reach zero"""
+        raise NotImplementedError
+
+    async def rebuild_tag_counts(self):
+        """Replace the counters with counts computed from the recipes"""
+        raise NotImplementedError
+
+    # Personal story
+
+    async def get_personal_story(self, fields: Iterable[str]) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def insert_personal_story(self, story: dict):
+        raise NotImplementedError
+
+    # View counts
+
+    async def add_recipe_views(self, counts: Dict[str, int]):
+        """Add to the lifetime view counts, stamping each recipe's last view"""
+        raise NotImplementedError
+
+    async def recent_recipe_views(self, limit: int) -> List[dict]:
+        """The most recently viewed recipes as {"id", "views", "updated_at"}, newest first"""
+        raise NotImplementedError
+
+    # Similar recipes
+
+    async def get_similar(self, recipe_id: str) -> Optional[List[dict]]:
+        """A recipe's stored neighbours ({"id", "score"}, best first), None when not computed"""
+        raise NotImplementedError
+
+    async def get_similar_lists(self, recipe_ids: Iterable[str]) -> Dict[str, List[dict]]:
+        raise NotImplementedError
+
+    async def replace_similar_lists(self, lists: Dict[str, List[dict]]):
+        """Replace the whole table, dropping recipes missing from lists"""
+        raise NotImplementedError
+
+    async def update_similar_lists(self, lists: Dict[str, List[dict]], offers: Dict[str, List[dict]], top_k: int):
+        """Set some lists outright, and merge offered neighbours into others keeping the best top_k
+
+        Offers are merged by the database, so concurrent updates from other
+        workers are not overwritten.
+        """
+        raise NotImplementedError
+
+    async def feature_counts(self, features: Iterable[str]) -> Dict[str, int]:
+        """Stored document frequencies of similarity features"""
+        raise NotImplementedError
+
+    async def replace_feature_counts(self, counts: Dict[str, int]):
+        raise NotImplementedError
+
+    async def add_feature_counts(self, counts: Dict[str, int]):
+        raise NotImplementedError
+
+    # Maintenance markers and the initialization lock
+
+    async def get_marker(self, marker_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def set_marker(self, marker_id: str, fields: dict):
+        """Set fields on a marker, creating it if needed"""
+        raise NotImplementedError
+
+    async def increment_marker(self, marker_id: str, field: str, amount: int) -> Optional[dict]:
+        """Increment a field of an existing marker, returning the marker after the update"""
+        raise NotImplementedError
+
+    async def delete_marker(self, marker_id: str):
+        raise NotImplementedError
+
+    async def acquire_lock(self, lock_id: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew a lock unless another owner holds an unexpired one"""
+        raise NotImplementedError
+
+    async def release_lock(self, lock_id: str, owner: str):
+        raise NotImplementedError
+
+    # Schema and lifecycle
+
+    async def ensure_indexes(self):
+        raise NotImplementedError
+
+    async def missing_indexes(self) -> List[str]:
+        """Expected indexes that are not built yet"""
+        raise NotImplementedError
+
+    async def explain(self, command: dict, verbosity: str) -> dict:
+        """The database's plan for a command recorded by the slow-query log"""
+        raise NotImplementedError
+
+    async def drop(self):
+        """Delete all stored data"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# MongoDB
+
+def _projection(fields: Iterable[str]) -> dict:
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def _any_search_field(pattern: str) -> dict:
+    return {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in SEARCH_FIELDS]}
+
+
+def recipe_query(recipe_filter: RecipeFilter) -> dict:
+    """MongoDB filter for a RecipeFilter"""
+    query = {}
+    search, mode = recipe_filter.search, recipe_filter.search_mode
+    if search:
+        if mode == "text":
+            query["$text"] = {"$search": search}
+        elif mode == "prefix":
+            query["$and"] = [_any_search_field(rf"\b{re.escape(word)}") for word in search_words(search)]
+        else:
+            # User input only reaches $regex escaped, unless regex mode was asked for explicitly
+            query.update(_any_search_field(search if mode == "regex" else re.escape(search)))
+    if recipe_filter.dietary_tags:
+        query["dietary_tags"] = {"$all": list(recipe_filter.dietary_tags)}
+    total_minutes = {}
+    if recipe_filter.max_total_time is not None:
+        total_minutes["$lte"] = recipe_filter.max_total_time
+    if recipe_filter.timed:
+        total_minutes["$type"] = "number"
+    if total_minutes:
+        query["total_minutes"] = total_minutes
+    if recipe_filter.ingredients:
+        query["ingredient_keys"] = {"$all": list(recipe_filter.ingredients)}
+    return query
+
+
+def keyset_query(sort: str, after: list) -> dict:
+    """Filter selecting the recipes that come after a keyset cursor position"""
+    (first_field, first_dir), (second_field, second_dir) = SORT_KEYS[sort]
+    first_op = "$gt" if first_dir == 1 else "$lt"
+    second_op = "$gt" if second_dir == 1 else "$lt"
+    return {"$or": [
+        {first_field: {first_op: after[0]}},
+        {first_field: after[0], second_field: {second_op: after[1]}}
+    ]}
+
+
+def _tag_facet(rows: List[dict]) -> Dict[str, int]:
+    return {row["_id"]: row["count"] for row in rows}
+
+
+TAG_COUNT_PIPELINE = [
+    {"$unwind": "$dietary_tags"},
+    {"$group": {"_id": "$dietary_tags", "count": {"$sum": 1}}}
+]
+
+
+class MongoRepository(Repository):
+    """The repository on MongoDB through Motor"""
+
+    def __init__(self, mongo_url: str, db_name: str, event_listeners: list = (),
+                 query_time_ms: Optional[int] = None):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        self.client = AsyncIOMotorClient(mongo_url, event_listeners=list(event_listeners))
+        self.db = self.client[db_name]
+        self.name = db_name
+        self.query_time_ms = query_time_ms
+
+    # Recipes
+
+    async def find_recipes(self, recipe_filter, fields, sort="oldest", offset=0, limit=None, after=None):
+        query = recipe_query(recipe_filter)
+        if after is not None:
+            query = {"$and": [query, keyset_query(sort, after)]} if query else keyset_query(sort, after)
+        projection = _projection(fields)
+        if sort == "relevance":
+            projection["score"] = {"$meta": "textScore"}
+            sort_spec = [("score", {"$meta": "textScore"}), ("id", 1)]
+        else:
+            sort_spec = list(SORT_KEYS[sort])
+        cursor = self.db.recipes.find(query, projection, sort=sort_spec, skip=offset, limit=limit or 0,
+                                      max_time_ms=self.query_time_ms)
+        return await cursor.to_list(length=None)
+
+    async def has_text_match(self, search):
+        return await self.db.recipes.find_one(
+            {"$text": {"$search": search}}, {"_id": 1}, max_time_ms=self.query_time_ms
+        ) is not None
+
+    async def count_recipes(self, recipe_filter):
+        pipeline = [
+            {"$match": recipe_query(recipe_filter)},
+            {"$facet": {"total": [{"$count": "count"}], "tags": TAG_COUNT_PIPELINE}}
+        ]
+        options = {"maxTimeMS": self.query_time_ms} if self.query_time_ms else {}
+        facet = (await self.db.recipes.aggregate(pipeline, **options).to_list(length=1))[0]
+        return (facet["total"][0]["count"] if facet["total"] else 0), _tag_facet(facet["tags"])
+
+    async def estimated_recipe_count(self):
+        options = {"maxTimeMS": self.query_time_ms} if self.query_time_ms else {}
+        return await self.db.recipes.estimated_document_count(**options)
+
+    async def iter_recipes(self, fields, recipe_filter=RecipeFilter(), batch_size=500):
+        cursor = self.db.recipes.find(recipe_query(recipe_filter), _projection(fields), sort=list(SORT_KEYS["oldest"]))
+        async for recipe in cursor.batch_size(batch_size):
+            yield recipe
+
+    async def get_recipes(self, ids, fields):
+        cursor = self.db.recipes.find({"id": {"$in": list(ids)}}, _projection(fields), max_time_ms=self.query_time_ms)
+        return await cursor.to_list(length=None)
+
+    async def get_recipe(self, recipe_id, fields):
+        return await self.db.recipes.find_one({"id": recipe_id}, _projection(fields), max_time_ms=self.query_time_ms)
+
+    async def insert_recipes(self, recipes):
+        # Unordered inserts keep going past individual failures such as duplicate ids
+        try:
+            await self.db.recipes.insert_many(recipes, ordered=False)
+        except BulkWriteError as e:
+            return [(error["index"], error.get("errmsg", "Write failed")) for error in e.details.get("writeErrors", [])]
+        return []
+
+    async def update_recipes(self, updates):
+        if updates:
+            await self.db.recipes.bulk_write(
+                [UpdateOne({"id": recipe_id}, {"$set": fields}) for recipe_id, fields in updates.items()],
+                ordered=False
+            )
+
+    async def recipes_sharing(self, field, values, exclude_ids, fields, limit):
+        cursor = self.db.recipes.find(
+            {field: {"$in": list(values)}, "id": {"$nin": list(exclude_ids)}}, _projection(fields), limit=limit
+        )
+        return await cursor.to_list(length=None)
+
+    # Dietary tag counters
+
+    async def tag_counts(self):
+        cursor = self.db.dietary_tag_counts.find(
+            {"count": {"$gt": 0}}, sort=[("count", -1), ("_id", 1)], max_time_ms=self.query_time_ms
+        )
+        return [{"tag": item["_id"], "count": item["count"], "updated_at": item.get("updated_at")}
+                async for item in cursor]
+
+    async def recipe_tag_counts(self):
+        return _tag_facet(await self.db.recipes.aggregate(TAG_COUNT_PIPELINE).to_list(length=None))
+
+    async def apply_tag_count_deltas(self, deltas):
+        ops = [
+            UpdateOne({"_id": tag}, {"$inc": {"count": delta}, "$currentDate": {"updated_at": True}}, upsert=True)
+            for tag, delta in deltas.items() if delta
+        ]
+        if not ops:
+            return
+        await self.db.dietary_tag_counts.bulk_write(ops, ordered=False)
+        if any(delta < 0 for delta in deltas.values()):
+            await self.db.dietary_tag_counts.delete_many({"count": {"$lte": 0}})
+
+    async def rebuild_tag_counts(self):
+        # $out swaps the counters collection atomically once the aggregation is done.
+        # Increments from recipes inserted while it runs land on the old collection
+        # and are lost, so run it when writes are quiet and re-check with verify_tag_counts
+        pipeline = TAG_COUNT_PIPELINE + [{"$set": {"updated_at": "$$NOW"}}, {"$out": "dietary_tag_counts"}]
+        await self.db.recipes.aggregate(pipeline).to_list(length=None)
+
+    # Personal story
+
+    async def get_personal_story(self, fields):
+        return await self.db.personal_stories.find_one({}, _projection(fields), max_time_ms=self.query_time_ms)
+
+    async def insert_personal_story(self, story):
+        await self.db.personal_stories.insert_one(dict(story))
+
+    # View counts
+
+    async def add_recipe_views(self, counts):
+        await self.db.recipe_views.bulk_write([
+            UpdateOne({"_id": recipe_id}, {"$inc": {"views": views}, "$currentDate": {"updated_at": True}}, upsert=True)
+            for recipe_id, views in counts.items()
+        ], ordered=False)
+
+    async def recent_recipe_views(self, limit):
+        cursor = self.db.recipe_views.find({}, sort=[("updated_at", -1)], limit=limit, max_time_ms=self.query_time_ms)
+        return [{"id": item["_id"], "views": item.get("views", 0), "updated_at": item.get("updated_at")}
+                async for item in cursor]
+
+    # Similar recipes
+
+    async def _write_in_batches(self, collection, ops: list):
+        for start in range(0, len(ops), SIMILARITY_WRITE_BATCH):
+            await collection.bulk_write(ops[start:start + SIMILARITY_WRITE_BATCH], ordered=False)
+
+    async def get_similar(self, recipe_id):
+        entry = await self.db.recipe_similarities.find_one({"_id": recipe_id}, max_time_ms=self.query_time_ms)
+        return entry["similar"] if entry is not None else None
+
+    async def get_similar_lists(self, recipe_ids):
+        return {entry["_id"]: entry["similar"]
+                async for entry in self.db.recipe_similarities.find({"_id": {"$in": list(recipe_ids)}})}
+
+    async def replace_similar_lists(self, lists):
+        # Tagged with this rebuild, so every list it didn't write can be dropped afterwards
+        now, generation = datetime.utcnow(), uuid.uuid4().hex
+        await self._write_in_batches(self.db.recipe_similarities, [
+            ReplaceOne({"_id": recipe_id},
+                       {"_id": recipe_id, "similar": similar, "updated_at": now, "generation": generation},
+                       upsert=True)
+            for recipe_id, similar in lists.items()
+        ])
+        await self.db.recipe_similarities.delete_many({"generation": {"$ne": generation}})
+
+    async def update_similar_lists(self, lists, offers, top_k):
+        now = datetime.utcnow()
+        ops = [
+            ReplaceOne({"_id": recipe_id}, {"_id": recipe_id, "similar": similar, "updated_at": now}, upsert=True)
+            for recipe_id, similar in lists.items()
+        ]
+        ops += [
+            UpdateOne(
+                {"_id": recipe_id},
+                {"$push": {"similar": {"$each": offered, "$sort": {"score": -1}, "$slice": top_k}},
+                 "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for recipe_id, offered in offers.items()
+        ]
+        await self._write_in_batches(self.db.recipe_similarities, ops)
+
+    async def feature_counts(self, features):
+        return {item["_id"]: item["count"]
+                async for item in self.db.similarity_features.find({"_id": {"$in": sorted(features)}})}
+
+    async def replace_feature_counts(self, counts):
+        await self.db.similarity_features.delete_many({})
+        await self._write_in_batches(self.db.similarity_features, [
+            InsertOne({"_id": feature, "count": count}) for feature, count in counts.items()
+        ])
+
+    async def add_feature_counts(self, counts):
+        await self._write_in_batches(self.db.similarity_features, [
+            UpdateOne({"_id": feature}, {"$inc": {"count": count}}, upsert=True) for feature, count in counts.items()
+        ])
+
+    # Maintenance markers and the initialization lock
+
+    async def get_marker(self, marker_id):
+        return await self.db.maintenance.find_one({"_id": marker_id})
+
+    async def set_marker(self, marker_id, fields):
+        await self.db.maintenance.update_one({"_id": marker_id}, {"$set": fields}, upsert=True)
+
+    async def increment_marker(self, marker_id, field, amount):
+        return await self.db.maintenance.find_one_and_update(
+            {"_id": marker_id}, {"$inc": {field: amount}}, return_document=ReturnDocument.AFTER
+        )
+
+    async def delete_marker(self, marker_id):
+        await self.db.maintenance.delete_one({"_id": marker_id})
+
+    async def acquire_lock(self, lock_id, owner, ttl_seconds):
+        now = datetime.utcnow()
+        try:
+            await self.db.maintenance.find_one_and_update(
+                {"_id": lock_id, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The lock exists and belongs to someone else
+            return False
+
+    async def release_lock(self, lock_id, owner):
+        await self.db.maintenance.delete_one({"_id": lock_id, "owner": owner})
+
+    # Schema and lifecycle
+
+    async def ensure_indexes(self):
+        # Lookups by id are an index point read, and duplicate ids are rejected
+        try:
+            await self.db.recipes.create_index("id", unique=True)
+        except OperationFailure as e:
+            logger.error(f"Could not create unique index on recipes.id, check for duplicate ids: {e}")
+
+        # MongoDB allows a single text index per collection, so an older index
+        # with different options has to be dropped before the new one is built
+        for name, info in (await self.db.recipes.index_information()).items():
+            if name != TEXT_INDEX_NAME and any(kind == "text" for _, kind in info["key"]):
+                logger.info(f"Dropping legacy text index {name}")
+                await self.db.recipes.drop_index(name)
+        await self.db.recipes.create_index(
+            [(field, "text") for field in TEXT_INDEX_WEIGHTS],
+            name=TEXT_INDEX_NAME,
+            weights=TEXT_INDEX_WEIGHTS,
+            default_language="english"
+        )
+
+        await self.db.recipes.create_indexes(RECIPE_INDEXES)
+        await self.db.recipe_views.create_indexes(RECIPE_VIEW_INDEXES)
+
+    async def missing_indexes(self):
+        existing = await self.db.recipes.index_information()
+        return [name for name in EXPECTED_INDEXES if name not in existing]
+
+    async def explain(self, command, verbosity):
+        # The command keeps its own maxTimeMS, so an executionStats explain is bounded too
+        return await self.db.command({"explain": command, "verbosity": verbosity})
+
+    async def drop(self):
+        await self.client.drop_database(self.name)
+
+    def close(self):
+        self.client.close()
+
+
+# In-memory engine
+
+# Catalogs at least this large are scanned in a worker thread
+THREAD_SCAN_MIN_RECIPES = 5000
+# Scans check the query time budget every this many recipes
+DEADLINE_CHECK_INTERVAL = 1024
+# Recipe fields with a secondary index from each value to the recipe ids
+MEMORY_INDEXED_FIELDS = ("dietary_tags", "ingredient_keys")
+
+TEXT_STOP_WORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+                   "of", "on", "or", "the", "to", "with"}
+TEXT_SUFFIXES = ("ings", "ing", "edly", "ed", "ies", "es", "s")
+TEXT_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _stored(value: Any) -> Any:
+    """Copy a value the way a BSON round trip would: fresh containers, millisecond naive UTC datetimes"""
+    if isinstance(value, dict):
+        return {key: _stored(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_stored(item) for item in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    """Copy containers so callers never alias stored data"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _pick(document: dict, fields: Iterable[str]) -> dict:
+    return {field: _copy(document[field]) for field in fields if field in document}
+
+
+def _now() -> datetime:
+    return _stored(datetime.utcnow())
+
+
+def stem(word: str) -> str:
+    for suffix in TEXT_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def text_terms(text: str) -> List[str]:
+    return [stem(word) for word in TEXT_TOKEN.findall(text.lower()) if word not in TEXT_STOP_WORDS]
+
+
+def parse_text_search(search: str) -> Tuple[Set[str], List[str], Set[str]]:
+    """Terms, quoted phrases and negated terms of a text search, as MongoDB reads $search"""
+    phrases = re.findall(r'"([^"]*)"', search)
+    rest = re.sub(r'"[^"]*"', " ", search)
+    terms, negated = set(), set()
+    for word in rest.split():
+        target = negated if word.startswith("-") else terms
+        target.update(text_terms(word.lstrip("-")))
+    for phrase in phrases:
+        terms.update(text_terms(phrase))
+    return terms, [phrase.lower() for phrase in phrases if phrase.strip()], negated
+
+
+def _field_text(document: dict, field: str) -> str:
+    value = document.get(field)
+    if isinstance(value, list):
+        return " ".join(item for item in value if isinstance(item, str))
+    return value if isinstance(value, str) else ""
+
+
+def _order(value: Any) -> tuple:
+    # Missing values sort first, as null does in MongoDB
+    return (value is not None, value)
+
+
+class _Deadline:
+    def __init__(self, max_time_ms: Optional[int]):
+        self.expires = time.perf_counter() + max_time_ms / 1000 if max_time_ms else None
+
+    def check(self, scanned: int):
+        if (self.expires is not None and scanned % DEADLINE_CHECK_INTERVAL == 0
+                and time.perf_counter() > self.expires):
+            raise ExecutionTimeout("operation exceeded time limit", code=50)
+
+
+class MemoryRepository(Repository):
+    """The repository in process memory
+
+    Recipes are kept by id, in insertion order, with secondary indexes from
+    each dietary tag and ingredient key to recipe ids and an inverted index of
+    stemmed text terms. Stored recipes are never changed in place, only
+    replaced, so a scan in a worker thread can read them while the event loop
+    writes.
+    """
+
+    def __init__(self, name: str, query_time_ms: Optional[int] = None):
+        self.name = name
+        self.query_time_ms = query_time_ms
+        self._reset()
+
+    def _reset(self):
+        self._recipes: Dict[str, dict] = {}
+        self._indexes: Dict[str, Dict[str, Set[str]]] = {field: {} for field in MEMORY_INDEXED_FIELDS}
+        # Text term -> recipe id -> occurrences per search field
+        self._postings: Dict[str, Dict[str, Dict[str, int]]] = {}
+        # Recipe id -> length in terms of each search field
+        self._text_lengths: Dict[str, Dict[str, int]] = {}
+        self._tag_counts: Dict[str, dict] = {}
+        self._stories: List[dict] = []
+        self._views: Dict[str, dict] = {}
+        self._similar: Dict[str, List[dict]] = {}
+        self._features: Dict[str, int] = {}
+        self._markers: Dict[str, dict] = {}
+
+    async def _scan(self, function, *args):
+        if len(self._recipes) < THREAD_SCAN_MIN_RECIPES:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    # Index maintenance
+
+    def _index(self, recipe: dict):
+        recipe_id = recipe["id"]
+        for field, index in self._indexes.items():
+            for value in recipe.get(field) or ():
+                index.setdefault(value, set()).add(recipe_id)
+        lengths = {}
+        entries: Dict[str, Dict[str, int]] = {}
+        for field in TEXT_INDEX_WEIGHTS:
+            words = text_terms(_field_text(recipe, field))
+            for word in words:
+                counts = entries.setdefault(word, {})
+                counts[field] = counts.get(field, 0) + 1
+            lengths[field] = len(words)
+        for term, counts in entries.items():
+            self._postings.setdefault(term, {})[recipe_id] = counts
+        self._text_lengths[recipe_id] = lengths
+
+    def _unindex(self, recipe: dict):
+        recipe_id = recipe["id"]
+        for field, index in self._indexes.items():
+            for value in recipe.get(field) or ():
+                ids = index.get(value)
+                if ids is not None:
+                    ids.discard(recipe_id)
+                    if not ids:
+                        del index[value]
+        for term in {term for field in TEXT_INDEX_WEIGHTS for term in text_terms(_field_text(recipe, field))}:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(recipe_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._text_lengths.pop(recipe_id, None)
+
+    # Matching
+
+    def _text_scores(self, search: str) -> Dict[str, float]:
+        """Scores of the recipes matching a text search, from the inverted index"""
+        terms, phrases, negated = parse_text_search(search)
+        scores: Dict[str, float] = {}
+        for term in terms:
+            for recipe_id, counts in list(self._postings.get(term, {}).items()):
+                lengths = self._text_lengths.get(recipe_id, {})
+                for field, hits in counts.items():
+                    # Repeated terms count, diminished by the field length as MongoDB does
+                    weight = TEXT_INDEX_WEIGHTS[field] * hits * (0.5 + 0.5 / max(lengths.get(field, 1), 1))
+                    scores[recipe_id] = scores.get(recipe_id, 0.0) + weight
+        for term in negated:
+            for recipe_id in list(self._postings.get(term, {})):
+                scores.pop(recipe_id, None)
+        if phrases:
+            for recipe_id in list(scores):
+                recipe = self._recipes.get(recipe_id, {})
+                combined = " ".join(_field_text(recipe, field) for field in TEXT_INDEX_WEIGHTS).lower()
+                if not all(phrase in combined for phrase in phrases):
+                    del scores[recipe_id]
+        return scores
+
+    def _match(self, recipe_filter: RecipeFilter, deadline: _Deadline) -> List[Tuple[dict, Optional[float]]]:
+        """Matching (recipe, text score) rows in insertion order"""
+        candidates = None
+        for field, values in (("dietary_tags", recipe_filter.dietary_tags),
+                              ("ingredient_keys", recipe_filter.ingredients)):
+            for value in values:
+                ids = set(self._indexes[field].get(value, ()))
+                candidates = ids if candidates is None else candidates & ids
+
+        scores = None
+        patterns = []
+        search, mode = recipe_filter.search, recipe_filter.search_mode
+        if search and mode == "text":
+            scores = self._text_scores(search)
+            candidates = set(scores) if candidates is None else candidates & set(scores)
+        elif search and mode == "prefix":
+            patterns = [re.compile(rf"\b{re.escape(word)}", re.IGNORECASE) for word in search_words(search)]
+        elif search:
+            patterns = [re.compile(search if mode == "regex" else re.escape(search), re.IGNORECASE)]
+
+        if candidates is None:
+            recipes = list(self._recipes.values())
+        else:
+            recipes = [recipe for recipe in list(self._recipes.values()) if recipe["id"] in candidates]
+
+        rows = []
+        for scanned, recipe in enumerate(recipes, 1):
+            deadline.check(scanned)
+            total = recipe.get("total_minutes")
+            timed = isinstance(total, int) and not isinstance(total, bool)
+            if recipe_filter.timed and not timed:
+                continue
+            if recipe_filter.max_total_time is not None and not (timed and total <= recipe_filter.max_total_time):
+                continue
+            if patterns and not all(
+                any(pattern.search(_field_text(recipe, field)) for field in SEARCH_FIELDS) for pattern in patterns
+            ):
+                continue
+            rows.append((recipe, scores[recipe["id"]] if scores is not None else None))
+        return rows
+
+    @staticmethod
+    def _sort_key(sort: str):
+        (first, _), (second, _) = SORT_KEYS[sort]
+        return lambda recipe: (_order(recipe.get(first)), _order(recipe.get(second)))
+
+    def _find(self, recipe_filter: RecipeFilter, fields: Tuple[str, ...], sort: str, offset: int,
+              limit: Optional[int], after: Optional[list], deadline: _Deadline) -> List[dict]:
+        rows = self._match(recipe_filter, deadline)
+        if sort == "relevance":
+            rows.sort(key=lambda row: (-(row[1] or 0.0), _order(row[0].get("id"))))
+        else:
+            key = self._sort_key(sort)
+            descending = SORT_KEYS[sort][0][1] == -1
+            if after is not None:
+                position = (_order(after[0]), _order(after[1]))
+                rows = [row for row in rows if (key(row[0]) < position if descending else key(row[0]) > position)]
+            rows.sort(key=lambda row: key(row[0]), reverse=descending)
+        rows = rows[offset:offset + limit] if limit else rows[offset:]
+        results = []
+        for recipe, score in rows:
+            result = _pick(recipe, fields)
+            if sort == "relevance":
+                result["score"] = score or 0.0
+            results.append(result)
+        return results
+
+    # Recipes
+
+    async def find_recipes(self, recipe_filter, fields, sort="oldest", offset=0, limit=None, after=None):
+        return await self._scan(
+            self._find, recipe_filter, tuple(fields), sort, offset, limit, after, _Deadline(self.query_time_ms)
+        )
+
+    async def has_text_match(self, search):
+        return bool(self._text_scores(search))
+
+    def _count(self, recipe_filter: RecipeFilter) -> Tuple[int, Dict[str, int]]:
+        rows = self._match(recipe_filter, _Deadline(self.query_time_ms))
+        tags: Dict[str, int] = {}
+        for recipe, _ in rows:
+            for tag in recipe.get("dietary_tags") or ():
+                tags[tag] = tags.get(tag, 0) + 1
+        return len(rows), tags
+
+    async def count_recipes(self, recipe_filter):
+        return await self._scan(self._count, recipe_filter)
+
+    async def estimated_recipe_count(self):
+        return len(self._recipes)
+
+    async def iter_recipes(self, fields, recipe_filter=RecipeFilter(), batch_size=500):
+        fields = tuple(fields)
+        rows = await self._scan(self._find, recipe_filter, ("id",), "oldest", 0, None, None, _Deadline(None))
+        for start in range(0, len(rows), batch_size):
+            for row in rows[start:start + batch_size]:
+                recipe = self._recipes.get(row["id"])
+                if recipe is not None:
+                    yield _pick(recipe, fields)
+            # Let other tasks run between batches, like a cursor's round trips
+            await asyncio.sleep(0)
+
+    async def get_recipes(self, ids, fields):
+        recipes = (self._recipes.get(recipe_id) for recipe_id in dict.fromkeys(ids))
+        return [_pick(recipe, fields) for recipe in recipes if recipe is not None]
+
+    async def get_recipe(self, recipe_id, fields):
+        recipe = self._recipes.get(recipe_id)
+        return _pick(recipe, fields) if recipe is not None else None
+
+    async def insert_recipes(self, recipes):
+        errors = []
+        for position, recipe in enumerate(recipes):
+            recipe_id = recipe.get("id")
+            if recipe_id in self._recipes:
+                errors.append((position, (
+                    f"E11000 duplicate key error collection: {self.name}.recipes "
+                    f"index: id_1 dup key: {{ id: {recipe_id!r} }}"
+                )))
+                continue
+            stored = _stored(recipe)
+            self._recipes[recipe_id] = stored
+            self._index(stored)
+        return errors
+
+    async def update_recipes(self, updates):
+        for recipe_id, fields in updates.items():
+            current = self._recipes.get(recipe_id)
+            if current is None:
+                continue
+            replacement = {**current, **_stored(fields)}
+            self._unindex(current)
+            self._recipes[recipe_id] = replacement
+            self._index(replacement)
+
+    async def recipes_sharing(self, field, values, exclude_ids, fields, limit):
+        index = self._indexes[field]
+        ids = set().union(*(index.get(value, ()) for value in values)) - set(exclude_ids)
+        recipes = [recipe for recipe in list(self._recipes.values()) if recipe["id"] in ids]
+        return [_pick(recipe, fields) for recipe in recipes[:limit]]
+
+    # Dietary tag counters
+
+    async def tag_counts(self):
+        items = [{"tag": tag, **counter} for tag, counter in self._tag_counts.items() if counter["count"] > 0]
+        items.sort(key=lambda item: (-item["count"], item["tag"]))
+        return items
+
+    async def recipe_tag_counts(self):
+        return {tag: len(ids) for tag, ids in self._indexes["dietary_tags"].items()}
+
+    async def apply_tag_count_deltas(self, deltas):
+        now = _now()
+        for tag, delta in deltas.items():
+            if delta:
+                counter = self._tag_counts.setdefault(tag, {"count": 0})
+                counter["count"] += delta
+                counter["updated_at"] = now
+        if any(delta < 0 for delta in deltas.values()):
+            self._tag_counts = {tag: counter for tag, counter in self._tag_counts.items() if counter["count"] > 0}
+
+    async def rebuild_tag_counts(self):
+        now = _now()
+        self._tag_counts = {tag: {"count": count, "updated_at": now}
+                            for tag, count in (await self.recipe_tag_counts()).items()}
+
+    # Personal story
+
+    async def get_personal_story(self, fields):
+        return _pick(self._stories[0], fields) if self._stories else None
+
+    async def insert_personal_story(self, story):
+        self._stories.append(_stored(story))
+
+    # View counts
+
+    async def add_recipe_views(self, counts):
+        now = _now()
+        for recipe_id, views in counts.items():
+            current = self._views.get(recipe_id, {"views": 0})
+            self._views[recipe_id] = {"views": current["views"] + views, "updated_at": now}
+
+    async def recent_recipe_views(self, limit):
+        recent = sorted(self._views.items(), key=lambda item: item[1]["updated_at"], reverse=True)[:limit]
+        return [{"id": recipe_id, **entry} for recipe_id, entry in recent]
+
+    # Similar recipes
+
+    async def get_similar(self, recipe_id):
+        return _copy(self._similar.get(recipe_id))
+
+    async def get_similar_lists(self, recipe_ids):
+        return {recipe_id: _copy(self._similar[recipe_id]) for recipe_id in recipe_ids if recipe_id in self._similar}
+
+    async def replace_similar_lists(self, lists):
+        self._similar = {recipe_id: _stored(similar) for recipe_id, similar in lists.items()}
+
+    async def update_similar_lists(self, lists, offers, top_k):
+        for recipe_id, similar in lists.items():
+            self._similar[recipe_id] = _stored(similar)
+        for recipe_id, offered in offers.items():
+            merged = self._similar.get(recipe_id, []) + _stored(offered)
+            # Stable, so equal scores keep the stored entries first like $push with $sort
+            merged.sort(key=lambda entry: -entry["score"])
+            self._similar[recipe_id] = merged[:top_k]
+
+    async def feature_counts(self, features):
+        return {feature: self._features[feature] for feature in features if feature in self._features}
+
+    async def replace_feature_counts(self, counts):
+        self._features = dict(counts)
+
+    async def add_feature_counts(self, counts):
+        for feature, count in counts.items():
+            self._features[feature] = self._features.get(feature, 0) + count
+
+    # Maintenance markers and the initialization lock
+
+    async def get_marker(self, marker_id):
+        marker = self._markers.get(marker_id)
+        return {"_id": marker_id, **_copy(marker)} if marker is not None else None
+
+    async def set_marker(self, marker_id, fields):
+        self._markers.setdefault(marker_id, {}).update(_stored(fields))
+
+    async def increment_marker(self, marker_id, field, amount):
+        marker = self._markers.get(marker_id)
+        if marker is None:
+            return None
+        marker[field] = marker.get(field, 0) + amount
+        return await self.get_marker(marker_id)
+
+    async def delete_marker(self, marker_id):
+        self._markers.pop(marker_id, None)
+
+    async def acquire_lock(self, lock_id, owner, ttl_seconds):
+        now = datetime.utcnow()
+        lock = self._markers.get(lock_id)
+        if lock is not None and lock.get("owner") != owner and lock.get("expires_at", now) >= now:
+            return False
+        self._markers[lock_id] = {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}
+        return True
+
+    async def release_lock(self, lock_id, owner):
+        if (self._markers.get(lock_id) or {}).get("owner") == owner:
+            del self._markers[lock_id]
+
+    # Schema and lifecycle
+
+    async def ensure_indexes(self):
+        # The secondary indexes are kept up to date on every write
+        pass
+
+    async def missing_indexes(self):
+        return []
+
+    async def explain(self, command, verbosity):
+        raise OperationFailure("explain is not supported by the memory engine", code=59)
+
+    async def drop(self):
+        self._reset()
@@ -0,0 +1,151 @@
+"""
+In-memory prefix index for search-box suggestions
+
+Recipe titles, canonical ingredient names and dietary tags are kept in a
+sorted array of lowercase terms. A prefix lookup is a bisect to the first
+candidate followed by a short forward scan, so typeahead never reaches
+MongoDB. Titles are also indexed from each word onwards, so "tea" finds
+"Gentle Ginger Tea".
+
+New recipes are merged in batches: their sorted terms are placed by
+bisection and the existing arrays are copied around them in slices. The
+three arrays are swapped in as a single tuple, so an add can run in a worker
+thread while lookups keep reading the previous arrays.
+"""
+
+import bisect
+import heapq
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from normalization import ingredient_keys
+
+# Suggestion kinds, in the order they are shown for equally popular matches
+SUGGESTION_TYPES = ("recipe", "ingredient", "tag")
+
+# Upper bound on index entries scanned per lookup, so a one-letter prefix stays cheap
+MAX_SCANNED_ENTRIES = 500
+
+# (kind, value) identifies a suggestion: a recipe id, ingredient key or tag id
+SuggestionKey = Tuple[str, str]
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace, the same way indexed terms are stored"""
+    return " ".join(text.lower().split())
+
+
+def title_terms(title: str) -> List[str]:
+    """The title from each word onwards: 'ginger tea' -> ['ginger tea', 'tea'], full title first"""
+    words = normalize_query(title).split()
+    return [" ".join(words[start:]) for start in range(len(words))]
+
+
+class SuggestIndex:
+    """Sorted prefix array over titles, ingredients and tags"""
+
+    def __init__(self, tag_label: Callable[[str], str] = lambda tag: tag):
+        self.tag_label = tag_label
+        # Sorted terms, their suggestion keys, and whether each term is the start of
+        # the label as opposed to a later title word; replaced together, never mutated
+        self._table: Tuple[List[str], List[SuggestionKey], List[bool]] = ([], [], [])
+        self._indexed = set()
+        self.counts: Counter = Counter()
+        self.labels: Dict[SuggestionKey, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._table[0])
+
+    def _entries(self, recipe: dict) -> Iterable[Tuple[SuggestionKey, str, List[Tuple[str, bool]]]]:
+        """Suggestion keys, display labels and (term, leading) pairs for one recipe"""
+        title = recipe.get("title", "")
+        terms = title_terms(title)
+        yield ("recipe", recipe["id"]), title, [(term, position == 0) for position, term in enumerate(terms)]
+        for key in ingredient_keys(recipe.get("ingredients", [])):
+            yield ("ingredient", key), key, [(key, True)]
+        for tag in recipe.get("dietary_tags", []):
+            label = self.tag_label(tag)
+            yield ("tag", tag), label, [(normalize_query(tag), True), (normalize_query(label), True)]
+
+    def build(self, recipes: Iterable[dict]):
+        """Index every recipe from scratch"""
+        entries = set()
+        self.counts = Counter()
+        self.labels = {}
+        for recipe in recipes:
+            for key, label, terms in self._entries(recipe):
+                self.counts[key] += 1
+                self.labels[key] = label
+                entries.update((term, key, leading) for term, leading in terms if term)
+
+        ordered = sorted(entries)
+        self._table = (
+            [term for term, _, _ in ordered],
+            [key for _, key, _ in ordered],
+            [leading for _, _, leading in ordered],
+        )
+        self._indexed = entries
+
+    def add(self, recipes: Iterable[dict]):
+        """Index newly written recipes, merging their terms in one pass (calls must not overlap)"""
+        entries = set()
+        for recipe in recipes:
+            # Recipes already indexed, e.g. written while a rebuild read the catalog, are not counted twice
+            if ("recipe", recipe["id"]) in self.counts:
+                continue
+            for key, label, terms in self._entries(recipe):
+                self.counts[key] += 1
+                self.labels[key] = label
+                entries.update((term, key, leading) for term, leading in terms if term)
+        entries -= self._indexed
+        if not entries:
+            return
+
+        terms, keys, leading = self._table
+        merged = ([], [], [])
+        copied = 0
+        for term, key, is_leading in sorted(entries):
+            # Position among entries with the same term follows the (key, leading) order
+            start = bisect.bisect_left(terms, term, copied)
+            stop = bisect.bisect_right(terms, term, start)
+            position = start + bisect.bisect_left(
+                range(start, stop), (key, is_leading), key=lambda at: (keys[at], leading[at])
+            )
+            for column, source, value in zip(merged, (terms, keys, leading), (term, key, is_leading)):
+                column.extend(source[copied:position])
+                column.append(value)
+            copied = position
+        for column, source in zip(merged, (terms, keys, leading)):
+            column.extend(source[copied:])
+        self._table = merged
+        self._indexed |= entries
+
+    def suggest(self, prefix: str, limit: int = 8, kinds: Optional[Iterable[str]] = None) -> List[dict]:
+        """Best suggestions for a prefix, most widely used first"""
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        kinds = set(kinds or SUGGESTION_TYPES)
+
+        # Labels that start with the prefix beat mid-title word matches
+        matches: Dict[SuggestionKey, bool] = {}
+        terms, keys, leading = self._table
+        start = bisect.bisect_left(terms, prefix)
+        stop = min(start + MAX_SCANNED_ENTRIES, len(terms))
+        for position in range(start, stop):
+            if not terms[position].startswith(prefix):
+                break
+            key = keys[position]
+            if key[0] in kinds:
+                matches[key] = matches.get(key, False) or leading[position]
+
+        ranked = heapq.nsmallest(limit, matches, key=lambda key: (
+            not matches[key],
+            -self.counts[key],
+            SUGGESTION_TYPES.index(key[0]),
+            self.labels[key].lower(),
+        ))
+        return [
+            {"type": kind, "value": value, "text": self.labels[(kind, value)], "count": self.counts[(kind, value)]}
+            for kind, value in ranked
+        ]
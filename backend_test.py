@@ -5,8 +5,12 @@ Tests all API endpoints for the GutWise recipe application
 """
 
 import requests
+import gzip
 import json
+import subprocess
 import sys
+import tempfile
+import time
 from typing import Dict, Any, List
 import os
 from pathlib import Path
@@ -28,6 +32,8 @@ def load_env_file(file_path: str) -> Dict[str, str]:
 frontend_env = load_env_file('/app/frontend/.env')
 BASE_URL = frontend_env.get('REACT_APP_BACKEND_URL', 'http://localhost:8001')
 API_BASE_URL = f"{BASE_URL}/api"
+# The admin endpoints are only served to requests carrying the backend's ADMIN_TOKEN
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or load_env_file('/app/backend/.env').get('ADMIN_TOKEN', '')
 
 print(f"Testing GutWise Recipe API at: {API_BASE_URL}")
 print("=" * 60)
@@ -36,6 +42,7 @@ class APITester:
     def __init__(self, base_url: str):
         self.base_url = base_url
         self.session = requests.Session()
+        self.admin_headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
         self.test_results = []
         
     def log_test(self, test_name: str, success: bool, message: str = "", response_data: Any = None):
@@ -311,6 +318,559 @@ class APITester:
         except Exception as e:
             self.log_test("Create Recipe", False, f"Exception: {str(e)}")
     
+    def test_search_relevance(self):
+        """Test GET /api/recipes?search=ginger&sort=relevance - Ranked full-text search"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes?search=ginger&sort=relevance")
+            if response.status_code == 200:
+                recipes = response.json()
+                if recipes and recipes[0]['title'] == "Gentle Ginger Tea":
+                    self.log_test("Search Relevance (ginger)", True, f"Top result: {recipes[0]['title']}")
+                else:
+                    self.log_test("Search Relevance (ginger)", False, f"Unexpected ranking: {[r['title'] for r in recipes]}")
+            else:
+                self.log_test("Search Relevance (ginger)", False, f"Status: {response.status_code}", response.text)
+
+            response = self.session.get(f"{self.base_url}/recipes?sort=relevance")
+            if response.status_code == 400:
+                self.log_test("Search Relevance (no search term)", True, "Correctly returned 400 without a search term")
+            else:
+                self.log_test("Search Relevance (no search term)", False, f"Expected 400, got {response.status_code}")
+        except Exception as e:
+            self.log_test("Search Relevance (ginger)", False, f"Exception: {str(e)}")
+    
+    def test_cursor_pagination(self):
+        """Test GET /api/recipes?limit=2&cursor=... - Keyset pagination via X-Next-Cursor"""
+        try:
+            seen_ids = []
+            params = {"limit": 2}
+            while True:
+                response = self.session.get(f"{self.base_url}/recipes", params=params)
+                if response.status_code != 200:
+                    self.log_test("Cursor Pagination", False, f"Status: {response.status_code}", response.text)
+                    return
+                seen_ids.extend(recipe['id'] for recipe in response.json())
+                next_cursor = response.headers.get("X-Next-Cursor")
+                if not next_cursor:
+                    break
+                params = {"limit": 2, "cursor": next_cursor}
+
+            all_ids = [recipe['id'] for recipe in self.session.get(f"{self.base_url}/recipes?limit=100").json()]
+            if seen_ids == all_ids:
+                self.log_test("Cursor Pagination", True, f"Walked {len(seen_ids)} recipes in stable order")
+            else:
+                self.log_test("Cursor Pagination", False, f"Paged ids {seen_ids} differ from full listing {all_ids}")
+        except Exception as e:
+            self.log_test("Cursor Pagination", False, f"Exception: {str(e)}")
+    
+    def test_summary_view(self):
+        """Test GET /api/recipes?view=summary - Lightweight listing projection"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes?view=summary")
+            if response.status_code == 200:
+                recipes = response.json()
+                heavy_fields = {'ingredients', 'instructions', 'story'}
+                leaked = [recipe['id'] for recipe in recipes if heavy_fields & recipe.keys()]
+                if recipes and not leaked and all('title' in recipe and 'image' in recipe for recipe in recipes):
+                    self.log_test("Summary View", True, f"Returned {len(recipes)} summary cards")
+                else:
+                    self.log_test("Summary View", False, f"Summary view leaked full fields for: {leaked}")
+            else:
+                self.log_test("Summary View", False, f"Status: {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Summary View", False, f"Exception: {str(e)}")
+    
+    def test_faceted_search(self):
+        """Test GET /api/recipes/search?dietary_tags=vegan - Results, total and facets in one call"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes/search?dietary_tags=vegan")
+            if response.status_code == 200:
+                data = response.json()
+                facet_counts = {f['id']: f['count'] for f in data['facets']}
+                all_vegan = all("vegan" in recipe['dietary_tags'] for recipe in data['results'])
+                if (all_vegan and data['total'] == len(data['results']) and
+                        facet_counts.get("vegan") == data['total'] and "keto" not in facet_counts):
+                    self.log_test("Faceted Search (vegan)", True, f"Total {data['total']}, facets: {facet_counts}")
+                else:
+                    self.log_test("Faceted Search (vegan)", False, f"Inconsistent facets or results: {data}")
+            else:
+                self.log_test("Faceted Search (vegan)", False, f"Status: {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Faceted Search (vegan)", False, f"Exception: {str(e)}")
+    
+    def admin_disabled(self, test_name: str) -> bool:
+        """Without ADMIN_TOKEN the admin endpoints answer 404, so there is nothing to test"""
+        if ADMIN_TOKEN:
+            return False
+        status = self.session.get(f"{self.base_url}/admin/cache-stats").status_code
+        self.log_test(test_name, status == 404, f"ADMIN_TOKEN is not set, admin endpoints answer {status}")
+        return True
+    
+    
+    def test_admin_auth(self):
+        """Test the admin endpoints refuse requests without the admin token"""
+        try:
+            url = f"{self.base_url}/admin/cache-stats"
+            anonymous = self.session.get(url)
+            wrong = self.session.get(url, headers={"Authorization": "Bearer not-the-token"})
+            expected = 401 if ADMIN_TOKEN else 404
+            if anonymous.status_code == expected and wrong.status_code == expected:
+                self.log_test("Admin Auth", True, f"Requests without the admin token get {expected}")
+            else:
+                self.log_test("Admin Auth", False, f"Status: {anonymous.status_code}/{wrong.status_code}, expected {expected}")
+        except Exception as e:
+            self.log_test("Admin Auth", False, f"Exception: {str(e)}")
+    
+    
+    def test_cache_stats(self):
+        """Test GET /api/admin/cache-stats - Repeated reads are served from the cache"""
+        if self.admin_disabled("Cache Stats"):
+            return
+        try:
+            before = self.session.get(f"{self.base_url}/admin/cache-stats", headers=self.admin_headers).json()
+            self.session.get(f"{self.base_url}/recipes/1")
+            self.session.get(f"{self.base_url}/recipes/1")
+            after = self.session.get(f"{self.base_url}/admin/cache-stats", headers=self.admin_headers).json()
+
+            if not after.get("enabled"):
+                self.log_test("Cache Stats", True, "Response cache is disabled on this deployment")
+            elif after["hits"] > before["hits"]:
+                self.log_test("Cache Stats", True, f"Hits: {after['hits']}, misses: {after['misses']}, size: {after['size']}")
+            else:
+                self.log_test("Cache Stats", False, f"Repeated read did not hit the cache: {after}")
+        except Exception as e:
+            self.log_test("Cache Stats", False, f"Exception: {str(e)}")
+    
+    def test_conditional_get(self):
+        """Test GET /api/recipes/1 with If-None-Match / If-Modified-Since - Conditional GET"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes/1")
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status_code != 200 or not etag or not last_modified:
+                self.log_test("Conditional GET", False, f"Missing validators: {dict(response.headers)}")
+                return
+
+            by_etag = self.session.get(f"{self.base_url}/recipes/1", headers={"If-None-Match": etag})
+            by_date = self.session.get(f"{self.base_url}/recipes/1", headers={"If-Modified-Since": last_modified})
+            if by_etag.status_code == 304 and by_date.status_code == 304 and not by_etag.content:
+                self.log_test("Conditional GET", True, f"ETag {etag} revalidated with 304")
+            else:
+                self.log_test("Conditional GET", False, f"Expected 304s, got {by_etag.status_code} and {by_date.status_code}")
+        except Exception as e:
+            self.log_test("Conditional GET", False, f"Exception: {str(e)}")
+    
+    def test_bulk_create(self):
+        """Test POST /api/recipes/bulk - Batch insert with per-item errors (JSON array and NDJSON)"""
+        try:
+            valid_recipe = {
+                "title": "Test Bulk Congee",
+                "description": "Plain rice congee added through the bulk endpoint",
+                "image": "https://images.unsplash.com/photo-1547592166-23ac45744acd?w=600&h=400&fit=crop",
+                "prep_time": "5 min",
+                "cook_time": "60 min",
+                "servings": 4,
+                "difficulty": "Easy",
+                "dietary_tags": ["gluten-free", "dairy-free"],
+                "ingredients": ["1 cup jasmine rice", "8 cups water"],
+                "instructions": ["Simmer rice in water until creamy"],
+                "story": "Created by the bulk ingestion test."
+            }
+            invalid_recipe = {"title": "Missing everything else"}
+
+            response = self.session.post(f"{self.base_url}/recipes/bulk", json=[valid_recipe, invalid_recipe])
+            ndjson_body = "\n".join([json.dumps(valid_recipe), "{not json"]) + "\n"
+            ndjson_response = self.session.post(
+                f"{self.base_url}/recipes/bulk",
+                data=ndjson_body.encode(),
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+
+            if response.status_code == 200 and ndjson_response.status_code == 200:
+                result = response.json()
+                ndjson_result = ndjson_response.json()
+                if (result['inserted'] == 1 and result['failed'] == 1 and result['errors'][0]['index'] == 1 and
+                        ndjson_result['inserted'] == 1 and ndjson_result['failed'] == 1):
+                    self.log_test("Bulk Create Recipes", True, "Inserted valid items and reported per-item errors")
+                else:
+                    self.log_test("Bulk Create Recipes", False, f"Unexpected results: {result}, {ndjson_result}")
+            else:
+                self.log_test("Bulk Create Recipes", False, f"Status: {response.status_code}/{ndjson_response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Bulk Create Recipes", False, f"Exception: {str(e)}")
+    
+    def test_export_recipes(self):
+        """Test GET /api/recipes/export?dietary_tags=keto - Streaming NDJSON export"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes/export?dietary_tags=keto")
+            gzip_response = self.session.get(f"{self.base_url}/recipes/export?dietary_tags=keto&compress=true")
+            if response.status_code == 200 and gzip_response.status_code == 200:
+                lines = [json.loads(line) for line in response.text.splitlines() if line.strip()]
+                gzip_lines = [line for line in gzip_response.text.splitlines() if line.strip()]
+                if lines and all("keto" in recipe['dietary_tags'] for recipe in lines) and len(gzip_lines) == len(lines):
+                    self.log_test("Export Recipes (NDJSON)", True, f"Exported {len(lines)} keto recipe(s), gzip stream matches")
+                else:
+                    self.log_test("Export Recipes (NDJSON)", False, f"Unexpected export: {len(lines)} plain vs {len(gzip_lines)} gzip lines")
+            else:
+                self.log_test("Export Recipes (NDJSON)", False, f"Status: {response.status_code}/{gzip_response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Export Recipes (NDJSON)", False, f"Exception: {str(e)}")
+    
+    def test_batch_fetch(self):
+        """Test POST /api/recipes/batch - Multiple recipes in request order with explicit misses"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/recipes/batch",
+                json={"ids": ["3", "does-not-exist", "1"]}
+            )
+            if response.status_code == 200:
+                result = response.json()
+                returned_ids = [recipe['id'] for recipe in result['recipes']]
+                if returned_ids == ["3", "1"] and result['missing'] == ["does-not-exist"]:
+                    self.log_test("Batch Fetch Recipes", True, f"Returned {returned_ids} in order, missing {result['missing']}")
+                else:
+                    self.log_test("Batch Fetch Recipes", False, f"Unexpected batch result: {returned_ids}, missing {result['missing']}")
+            else:
+                self.log_test("Batch Fetch Recipes", False, f"Status: {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Batch Fetch Recipes", False, f"Exception: {str(e)}")
+    
+    def test_similar_recipes(self):
+        """Test GET /api/recipes/{id}/similar - Precomputed similar recipes"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes/3/similar?limit=3")
+            missing = self.session.get(f"{self.base_url}/recipes/invalid-id/similar")
+            if response.status_code == 200 and missing.status_code == 404:
+                similar = response.json()
+                scores = [recipe['score'] for recipe in similar]
+                if len(similar) <= 3 and all(recipe['id'] != "3" for recipe in similar) and scores == sorted(scores, reverse=True):
+                    self.log_test("Similar Recipes", True, f"Similar to id=3: {[recipe['title'] for recipe in similar]}")
+                else:
+                    self.log_test("Similar Recipes", False, f"Unexpected similar recipes: {similar}")
+            else:
+                self.log_test("Similar Recipes", False, f"Status: {response.status_code}/{missing.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Similar Recipes", False, f"Exception: {str(e)}")
+    
+    def test_structured_filters(self):
+        """Test max_total_time, ingredient and sort=total_time on GET /api/recipes"""
+        try:
+            response = self.session.get(f"{self.base_url}/recipes?max_total_time=30&sort=total_time")
+            by_ingredient = self.session.get(f"{self.base_url}/recipes?ingredient=ginger")
+            if response.status_code == 200 and by_ingredient.status_code == 200:
+                quick = response.json()
+                times = [recipe['total_minutes'] for recipe in quick]
+                ginger = by_ingredient.json()
+                if (quick and all(t <= 30 for t in times) and times == sorted(times)
+                        and ginger and all('ginger' in recipe['ingredient_keys'] for recipe in ginger)):
+                    self.log_test("Structured Filters", True, f"{len(quick)} recipes under 30 min, {len(ginger)} with ginger")
+                else:
+                    self.log_test("Structured Filters", False, f"Unexpected results: {times}, {len(ginger)} ginger recipes")
+            else:
+                self.log_test("Structured Filters", False, f"Status: {response.status_code}/{by_ingredient.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Structured Filters", False, f"Exception: {str(e)}")
+    
+    
+    def test_suggest(self):
+        """Test GET /api/suggest - Typeahead suggestions from the prefix index"""
+        try:
+            response = self.session.get(f"{self.base_url}/suggest?q=gin")
+            invalid = self.session.get(f"{self.base_url}/suggest?q=gin&types=color")
+            if response.status_code == 200 and invalid.status_code == 400:
+                suggestions = response.json()
+                texts = [suggestion['text'] for suggestion in suggestions]
+                if any(s['type'] == 'recipe' and s['value'] == "4" for s in suggestions) and all(
+                        suggestion['type'] in ('recipe', 'ingredient', 'tag') for suggestion in suggestions):
+                    self.log_test("Suggest", True, f"Suggestions for 'gin': {texts}")
+                else:
+                    self.log_test("Suggest", False, f"Unexpected suggestions: {suggestions}")
+            else:
+                self.log_test("Suggest", False, f"Status: {response.status_code}/{invalid.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Suggest", False, f"Exception: {str(e)}")
+    
+    
+    def test_request_coalescing(self):
+        """Test concurrent identical GET /api/recipes requests share one query"""
+        if self.admin_disabled("Request Coalescing"):
+            return
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+            url = f"{self.base_url}/recipes?search=ginger&limit=3"
+            stats_url = f"{self.base_url}/admin/cache-stats"
+            before = self.session.get(stats_url, headers=self.admin_headers).json()["single_flight"]
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                responses = list(pool.map(lambda _: requests.get(url, timeout=30), range(20)))
+            after = self.session.get(stats_url, headers=self.admin_headers).json()["single_flight"]
+
+            handled = (after["executions"] + after["coalesced"]) - (before["executions"] + before["coalesced"])
+            bodies = {response.text for response in responses}
+            if all(response.status_code == 200 for response in responses) and len(bodies) == 1 and handled >= 20:
+                self.log_test("Request Coalescing", True,
+                              f"20 requests, {after['coalesced'] - before['coalesced']} coalesced onto in-flight queries")
+            else:
+                self.log_test("Request Coalescing", False, f"Unexpected results: {len(bodies)} distinct bodies, stats {after}")
+        except Exception as e:
+            self.log_test("Request Coalescing", False, f"Exception: {str(e)}")
+    
+    
+    def test_search_modes(self):
+        """Test search_mode=substring/regex and rejection of pathological patterns"""
+        try:
+            substring = self.session.get(f"{self.base_url}/recipes", params={"search": "(a+)+$", "search_mode": "substring"})
+            regex = self.session.get(f"{self.base_url}/recipes", params={"search": "ginger.*tea", "search_mode": "regex"})
+            nested = self.session.get(f"{self.base_url}/recipes", params={"search": "(a+)+$", "search_mode": "regex"})
+            alternation = self.session.get(f"{self.base_url}/recipes", params={"search": "(a|a)*$", "search_mode": "regex"})
+            invalid = self.session.get(f"{self.base_url}/recipes", params={"search": "(ginger", "search_mode": "regex"})
+            statuses = (substring.status_code, regex.status_code, nested.status_code, alternation.status_code, invalid.status_code)
+            if statuses == (200, 200, 400, 400, 400) and substring.json() == [] and any(
+                    recipe['title'] == "Gentle Ginger Tea" for recipe in regex.json()):
+                self.log_test("Search Modes", True, "Substring input is escaped, unsafe and invalid regexes are rejected")
+            else:
+                self.log_test("Search Modes", False, f"Statuses: {statuses}")
+        except Exception as e:
+            self.log_test("Search Modes", False, f"Exception: {str(e)}")
+    
+    
+    def test_metrics(self):
+        """Test GET /metrics - Prometheus request and MongoDB metrics"""
+        try:
+            self.session.get(f"{self.base_url}/recipes/1")
+            response = self.session.get(f"{BASE_URL}/metrics")
+            if response.status_code == 200:
+                text = response.text
+                expected = ['route="/api/recipes/{recipe_id}"', "http_request_duration_seconds_bucket",
+                            "mongodb_command_duration_seconds"]
+                missing = [name for name in expected if name not in text]
+                if not missing:
+                    self.log_test("Metrics", True, "Per-route and MongoDB metrics exposed")
+                else:
+                    self.log_test("Metrics", False, f"Missing from /metrics: {missing}")
+            else:
+                self.log_test("Metrics", False, f"Status: {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Metrics", False, f"Exception: {str(e)}")
+    
+    
+    def test_slow_queries(self):
+        """Test GET /api/admin/slow-queries - Slowest query shapes since startup"""
+        if self.admin_disabled("Slow Queries"):
+            return
+        try:
+            response = self.session.get(f"{self.base_url}/admin/slow-queries?limit=5&sort=max", headers=self.admin_headers)
+            invalid = self.session.get(f"{self.base_url}/admin/slow-queries?sort=bogus", headers=self.admin_headers)
+            if response.status_code == 200 and invalid.status_code == 400:
+                data = response.json()
+                max_times = [query['max_ms'] for query in data['queries']]
+                if len(data['queries']) <= 5 and max_times == sorted(max_times, reverse=True):
+                    self.log_test("Slow Queries", True, f"{len(data['queries'])} shapes over {data['threshold_ms']}ms")
+                else:
+                    self.log_test("Slow Queries", False, f"Unexpected response: {data}")
+            else:
+                self.log_test("Slow Queries", False, f"Status: {response.status_code}/{invalid.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Slow Queries", False, f"Exception: {str(e)}")
+    
+    
+    def test_readiness(self):
+        """Test GET /api/ready - Database initialization and index status"""
+        try:
+            response = self.session.get(f"{self.base_url}/ready")
+            if response.status_code == 200:
+                data = response.json()
+                if data['ready'] and data['database'] == 'ready' and not data['missing_indexes']:
+                    self.log_test("Readiness", True, f"Ready at database version {data['version']}")
+                else:
+                    self.log_test("Readiness", False, f"Unexpected readiness report: {data}")
+            else:
+                self.log_test("Readiness", False, f"Status: {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Readiness", False, f"Exception: {str(e)}")
+    
+    def test_compression(self):
+        """Test negotiated response compression on GET /api/recipes"""
+        try:
+            compressed = self.session.get(f"{self.base_url}/recipes", headers={"Accept-Encoding": "gzip"})
+            plain = self.session.get(f"{self.base_url}/recipes", headers={"Accept-Encoding": "identity"})
+            if compressed.status_code == 200 and plain.status_code == 200:
+                encoding = compressed.headers.get("Content-Encoding")
+                if encoding == "gzip" and "Content-Encoding" not in plain.headers and compressed.json() == plain.json():
+                    self.log_test("Compression", True, "gzip negotiated, identity honoured")
+                else:
+                    self.log_test("Compression", False, f"Content-Encoding: {encoding} / {plain.headers.get('Content-Encoding')}")
+            else:
+                self.log_test("Compression", False, f"Status: {compressed.status_code}/{plain.status_code}")
+        except Exception as e:
+            self.log_test("Compression", False, f"Exception: {str(e)}")
+    
+    def test_home_bundle(self):
+        """Test GET /api/home - Featured recipes, stats and story in one response"""
+        try:
+            response = self.session.get(f"{self.base_url}/home")
+            if response.status_code == 200:
+                data = response.json()
+                featured = data['featured_recipes']
+                stats = data['stats']
+                if len(featured) <= 3 and stats['recipe_count'] >= 5 and stats['dietary_filters'] and data['personal_story']:
+                    if 'ingredients' not in featured[0]:
+                        self.log_test("Home Bundle", True, f"{len(featured)} featured of {stats['recipe_count']} recipes")
+                    else:
+                        self.log_test("Home Bundle", False, "Featured recipes should be summary cards")
+                else:
+                    self.log_test("Home Bundle", False, f"Incomplete bundle: {stats}")
+            else:
+                self.log_test("Home Bundle", False, f"Status: {response.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Home Bundle", False, f"Exception: {str(e)}")
+    
+    def test_trending(self):
+        """Test GET /api/recipes/trending - Recipes ranked by recent detail views"""
+        try:
+            for _ in range(25):
+                self.session.get(f"{self.base_url}/recipes/2")
+            response = self.session.get(f"{self.base_url}/recipes/trending?limit=3")
+            invalid = self.session.get(f"{self.base_url}/recipes/trending?limit=0")
+            if response.status_code == 200 and invalid.status_code == 422:
+                trending = response.json()
+                views = [recipe['views'] for recipe in trending]
+                if trending and trending[0]['id'] == "2" and len(trending) <= 3 and views == sorted(views, reverse=True):
+                    self.log_test("Trending Recipes", True, f"Top: {[(recipe['title'], recipe['views']) for recipe in trending]}")
+                else:
+                    self.log_test("Trending Recipes", False, f"Unexpected trending recipes: {trending}")
+            else:
+                self.log_test("Trending Recipes", False, f"Status: {response.status_code}/{invalid.status_code}", response.text)
+        except Exception as e:
+            self.log_test("Trending Recipes", False, f"Exception: {str(e)}")
+    
+    def test_tag_counts(self):
+        """Test that /api/dietary-filters counts follow POST /api/recipes and bulk inserts"""
+        def counts():
+            return {item['id']: item['count'] for item in self.session.get(f"{self.base_url}/dietary-filters").json()}
+
+        try:
+            recipe = {
+                "title": "Test Counted Broth",
+                "description": "Bone-free vegetable broth for the tag counter test",
+                "image": "https://images.unsplash.com/photo-1547592166-23ac45744acd?w=600&h=400&fit=crop",
+                "prep_time": "10 min",
+                "cook_time": "40 min",
+                "servings": 4,
+                "difficulty": "Easy",
+                "dietary_tags": ["vegan", "keto"],
+                "ingredients": ["8 cups water", "2 carrots", "1 leek"],
+                "instructions": ["Simmer everything for 40 minutes", "Strain"],
+                "story": "Created by the tag counter test."
+            }
+            before = counts()
+            created = self.session.post(f"{self.base_url}/recipes", json=recipe)
+            after_create = counts()
+            bulk = self.session.post(f"{self.base_url}/recipes/bulk", json=[recipe, recipe])
+            after_bulk = counts()
+
+            if created.status_code == 200 and bulk.status_code == 200:
+                expected_create = {tag: before.get(tag, 0) + 1 for tag in recipe['dietary_tags']}
+                expected_bulk = {tag: before.get(tag, 0) + 3 for tag in recipe['dietary_tags']}
+                if (all(after_create.get(tag) == count for tag, count in expected_create.items()) and
+                        all(after_bulk.get(tag) == count for tag, count in expected_bulk.items())):
+                    self.log_test("Dietary Tag Counts", True, f"vegan {before.get('vegan', 0)} -> {after_create['vegan']} -> {after_bulk['vegan']}")
+                else:
+                    self.log_test("Dietary Tag Counts", False, f"Counts did not follow inserts: {before} -> {after_create} -> {after_bulk}")
+            else:
+                self.log_test("Dietary Tag Counts", False, f"Status: {created.status_code}/{bulk.status_code}", bulk.text)
+        except Exception as e:
+            self.log_test("Dietary Tag Counts", False, f"Exception: {str(e)}")
+    
+    
+    def test_load_benchmark(self):
+        """Smoke test benchmarks.load against this server, saving and comparing a baseline"""
+        try:
+            backend_dir = Path(__file__).resolve().parent / "backend"
+            with tempfile.TemporaryDirectory() as workdir:
+                baseline = Path(workdir) / "baseline.json"
+                command = [sys.executable, "-m", "benchmarks.load", "--url", BASE_URL,
+                           "--scenarios", "list,search,tag_filter,detail,filters",
+                           "--concurrency", "4", "--requests", "20", "--warmup", "5"]
+                saved = subprocess.run(command + ["--save-baseline", str(baseline)],
+                                       cwd=backend_dir, capture_output=True, text=True, timeout=120)
+                report = json.loads(baseline.read_text()) if baseline.exists() else {"results": []}
+                # A generous tolerance keeps the comparison itself from flaking on a shared machine
+                compared = subprocess.run(command + ["--baseline", str(baseline), "--tolerance", "100"],
+                                          cwd=backend_dir, capture_output=True, text=True, timeout=120)
+
+            scenarios = {result['scenario']: result for result in report['results']}
+            if (saved.returncode == 0 and compared.returncode == 0
+                    and set(scenarios) == {"list", "search", "tag_filter", "detail", "filters"}
+                    and all(result['requests'] == 20 and result['errors'] == 0 and result['p99_ms'] > 0
+                            for result in scenarios.values())
+                    and "No regressions" in compared.stdout):
+                self.log_test("Load Benchmark", True,
+                              f"{len(scenarios)} scenarios, list p95 {scenarios['list']['p95_ms']} ms, baseline compared")
+            else:
+                self.log_test("Load Benchmark", False,
+                              f"Exit codes {saved.returncode}/{compared.returncode}: {saved.stdout[-300:]} {saved.stderr[-300:]} "
+                              f"{compared.stdout[-300:]}")
+        except Exception as e:
+            self.log_test("Load Benchmark", False, f"Exception: {str(e)}")
+    
+    
+    def test_static_bundle(self):
+        """Test production static serving: ETag/304, precompressed variants and the client route fallback"""
+        server = None
+        try:
+            backend_dir = Path(__file__).resolve().parent / "backend"
+            with tempfile.TemporaryDirectory() as workdir:
+                build = Path(workdir) / "build"
+                (build / "static" / "js").mkdir(parents=True)
+                index_html = b"<!doctype html><div id=\"root\"></div>"
+                script = b"console.log('gutwise');"
+                (build / "index.html").write_bytes(index_html)
+                (build / "static" / "js" / "main.3f2a9c1e.js").write_bytes(script)
+                (build / "static" / "js" / "main.3f2a9c1e.js.gz").write_bytes(gzip.compress(script))
+
+                # A second server whose working directory holds the build, so the production catch-all is mounted
+                port = 8011
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", str(backend_dir), "--port", str(port)],
+                    cwd=workdir, env={**os.environ, "STORAGE_ENGINE": "memory", "STATIC_MODE": "production"},
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                static_url = f"http://localhost:{port}"
+                for _ in range(100):
+                    try:
+                        if requests.get(f"{static_url}/api/", timeout=1).status_code == 200:
+                            break
+                    except requests.ConnectionError:
+                        pass
+                    time.sleep(0.1)
+
+                page = requests.get(f"{static_url}/")
+                revalidated = requests.get(f"{static_url}/", headers={"If-None-Match": page.headers.get("ETag", "")})
+                asset = requests.get(f"{static_url}/static/js/main.3f2a9c1e.js", headers={"Accept-Encoding": "gzip"})
+                identity = requests.get(f"{static_url}/static/js/main.3f2a9c1e.js", headers={"Accept-Encoding": "identity"})
+                client_route = requests.get(f"{static_url}/recipes/42")
+                missing_asset = requests.get(f"{static_url}/static/js/missing.0badc0de.js")
+
+            statuses = (page.status_code, revalidated.status_code, asset.status_code, identity.status_code,
+                        client_route.status_code, missing_asset.status_code)
+            if (statuses == (200, 304, 200, 200, 200, 404)
+                    and page.content == index_html and page.headers.get("ETag")
+                    and asset.headers.get("Content-Encoding") == "gzip" and asset.content == script
+                    and "immutable" in asset.headers.get("Cache-Control", "")
+                    and "Content-Encoding" not in identity.headers and identity.content == script
+                    and client_route.content == index_html
+                    and client_route.headers.get("Cache-Control") == "no-cache"):
+                self.log_test("Static Bundle", True, "ETag revalidation, .gz variant and client route fallback served")
+            else:
+                self.log_test("Static Bundle", False, f"Statuses: {statuses}, asset headers: {dict(asset.headers)}")
+        except Exception as e:
+            self.log_test("Static Bundle", False, f"Exception: {str(e)}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+    
+    
     def run_all_tests(self):
         """Run all API tests"""
         print("Starting GutWise Recipe API Tests...")
@@ -328,6 +888,30 @@ class APITester:
         self.test_get_dietary_filters()
         self.test_get_personal_story()
         self.test_create_recipe()
+        self.test_search_relevance()
+        self.test_cursor_pagination()
+        self.test_summary_view()
+        self.test_faceted_search()
+        self.test_admin_auth()
+        self.test_cache_stats()
+        self.test_conditional_get()
+        self.test_bulk_create()
+        self.test_export_recipes()
+        self.test_batch_fetch()
+        self.test_similar_recipes()
+        self.test_structured_filters()
+        self.test_suggest()
+        self.test_request_coalescing()
+        self.test_search_modes()
+        self.test_metrics()
+        self.test_slow_queries()
+        self.test_readiness()
+        self.test_compression()
+        self.test_home_bundle()
+        self.test_trending()
+        self.test_tag_counts()
+        self.test_load_benchmark()
+        self.test_static_bundle()
         
         # Summary
         total_tests = len(self.test_results)
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { ArrowRight, Clock, Users, Heart } from 'lucide-react';
-import { recipeApi, personalStoryApi } from '../services/api';
+import { homeApi } from '../services/api';
 
 const HomePage = () => {
   const [featuredRecipes, setFeaturedRecipes] = useState([]);
@@ -16,17 +16,11 @@ const HomePage = () => {
         setLoading(true);
         setError(null);
 
-        // Fetch featured recipes (first 3)
-        const recipes = await recipeApi.getRecipes({ limit: 3 });
-        setFeaturedRecipes(recipes);
-
-        // Fetch all recipes count
-        const allRecipes = await recipeApi.getRecipes();
-        setTotalRecipes(allRecipes.length);
-
-        // Fetch personal story
-        const story = await personalStoryApi.getPersonalStory();
-        setPersonalStory(story);
+        // Featured recipes, stats and story come in one bundle
+        const home = await homeApi.getHome();
+        setFeaturedRecipes(home.featured_recipes);
+        setTotalRecipes(home.stats.recipe_count);
+        setPersonalStory(home.personal_story);
 
       } catch (err) {
         setError('Failed to load content. Please try again later.');
@@ -1,5 +1,5 @@
-import React, { useState, useMemo, useEffect } from 'react';
-import { Link } from 'react-router-dom';
+import React, { useState, useEffect } from 'react';
+import { Link, useNavigate } from 'react-router-dom';
 import { Search, Filter, Clock, Users, ChefHat } from 'lucide-react';
 import { recipeApi } from '../services/api';
 import { Button } from '../components/ui/button';
@@ -8,56 +8,111 @@ import { Badge } from '../components/ui/badge';
 import { Card, CardContent } from '../components/ui/card';
 
 const RecipesPage = () => {
+  const navigate = useNavigate();
+  const [query, setQuery] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
   const [selectedFilters, setSelectedFilters] = useState([]);
   const [showFilters, setShowFilters] = useState(false);
   const [recipes, setRecipes] = useState([]);
+  const [totalRecipes, setTotalRecipes] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [dietaryFilters, setDietaryFilters] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
+  const searchParams = () => ({
+    search: searchTerm.trim() || undefined,
+    dietary_tags: selectedFilters.length > 0 ? selectedFilters.join(',') : undefined,
+  });
+
   useEffect(() => {
-    const fetchInitialData = async () => {
+    let cancelled = false;
+
+    const fetchRecipes = async () => {
       try {
-        setLoading(true);
         setError(null);
 
-        // Fetch all recipes and dietary filters
-        const [recipesData, filtersData] = await Promise.all([
-          recipeApi.getRecipes(),
-          recipeApi.getDietaryFilters()
-        ]);
+        // One faceted request returns the results, total and tag counts
+        const data = await recipeApi.searchRecipes(searchParams());
 
-        setRecipes(recipesData);
-        setDietaryFilters(filtersData);
+        if (!cancelled) {
+          setRecipes(data.results);
+          setTotalRecipes(data.total);
+          setNextCursor(data.next_cursor);
+          setDietaryFilters(data.facets);
+        }
       } catch (err) {
-        setError('Failed to load recipes. Please try again later.');
+        if (!cancelled) {
+          setError('Failed to load recipes. Please try again later.');
+        }
         console.error('Error fetching recipes data:', err);
       } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+        }
       }
     };
 
-    fetchInitialData();
-  }, []);
+    fetchRecipes();
+    return () => {
+      cancelled = true;
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchTerm, selectedFilters]);
+
+  useEffect(() => {
+    let cancelled = false;
+
+    // Suggestions come from an in-memory index, so every keystroke can ask
+    if (query.trim()) {
+      recipeApi.suggest(query)
+        .then(data => { if (!cancelled) setSuggestions(data); })
+        .catch(() => { if (!cancelled) setSuggestions([]); });
+    } else {
+      setSuggestions([]);
+    }
+
+    // The full search only runs once typing pauses
+    const timer = setTimeout(() => setSearchTerm(query), 500);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  const runSearch = (term) => {
+    setQuery(term);
+    setSearchTerm(term);
+    setSuggestions([]);
+  };
+
+  const selectSuggestion = (suggestion) => {
+    if (suggestion.type === 'recipe') {
+      navigate(`/recipe/${suggestion.value}`);
+    } else if (suggestion.type === 'tag') {
+      if (!selectedFilters.includes(suggestion.value)) {
+        toggleFilter(suggestion.value);
+      }
+      runSearch('');
+    } else {
+      runSearch(suggestion.value);
+    }
+  };
 
-  const filteredRecipes = useMemo(() => {
-    return recipes.filter(recipe => {
-      const matchesSearch = searchTerm === '' || 
-                           recipe.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                           recipe.description.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                           recipe.ingredients.some(ingredient => 
-                             ingredient.toLowerCase().includes(searchTerm.toLowerCase())
-                           );
-      
-      const matchesFilters = selectedFilters.length === 0 || 
-                            selectedFilters.every(filter => 
-                              recipe.dietary_tags.includes(filter)
-                            );
-      
-      return matchesSearch && matchesFilters;
-    });
-  }, [recipes, searchTerm, selectedFilters]);
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await recipeApi.searchRecipes({ ...searchParams(), cursor: nextCursor });
+      setRecipes(prev => [...prev, ...data.results]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error('Error loading more recipes:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const toggleFilter = (filterId) => {
     setSelectedFilters(prev => 
@@ -69,7 +124,7 @@ const RecipesPage = () => {
 
   const clearFilters = () => {
     setSelectedFilters([]);
-    setSearchTerm('');
+    runSearch('');
   };
 
   if (loading) {
@@ -120,10 +175,27 @@ const RecipesPage = () => {
               <Input
                 type="text"
                 placeholder="Search recipes, ingredients..."
-                value={searchTerm}
-                onChange={(e) => setSearchTerm(e.target.value)}
+                value={query}
+                onChange={(e) => setQuery(e.target.value)}
+                onKeyDown={(e) => e.key === 'Enter' && runSearch(query)}
                 className="pl-10 py-3 text-lg"
               />
+              {suggestions.length > 0 && (
+                <ul className="absolute z-10 mt-1 w-full bg-white border border-gray-200 rounded-lg shadow-lg overflow-hidden">
+                  {suggestions.map((suggestion) => (
+                    <li key={`${suggestion.type}:${suggestion.value}`}>
+                      <button
+                        type="button"
+                        onClick={() => selectSuggestion(suggestion)}
+                        className="w-full flex items-center justify-between px-4 py-2 text-left hover:bg-gray-50"
+                      >
+                        <span className="text-gray-900">{suggestion.text}</span>
+                        <span className="text-xs text-gray-500 capitalize">{suggestion.type}</span>
+                      </button>
+                    </li>
+                  ))}
+                </ul>
+              )}
             </div>
 
             <div className="flex flex-col sm:flex-row items-center justify-between gap-4">
@@ -144,7 +216,7 @@ const RecipesPage = () => {
               {(selectedFilters.length > 0 || searchTerm) && (
                 <div className="flex items-center gap-2">
                   <span className="text-sm text-gray-600">
-                    {filteredRecipes.length} recipes found
+                    {totalRecipes} recipes found
                   </span>
                   <Button variant="ghost" size="sm" onClick={clearFilters}>
                     Clear all
@@ -190,7 +262,7 @@ const RecipesPage = () => {
                       className="cursor-pointer hover:bg-gray-300"
                       onClick={() => toggleFilter(filterId)}
                     >
-                      {filter?.label} ✕
+                      {filter?.label ?? filterId} ✕
                     </Badge>
                   );
                 })}
@@ -202,7 +274,7 @@ const RecipesPage = () => {
 
       {/* Recipes Grid */}
       <div className="max-w-6xl mx-auto px-4 sm:px-6 lg:px-8 py-12">
-        {filteredRecipes.length === 0 ? (
+        {recipes.length === 0 ? (
           <div className="text-center py-16">
             <ChefHat className="h-16 w-16 text-gray-300 mx-auto mb-4" />
             <h3 className="text-xl font-semibold text-gray-600 mb-2">No recipes found</h3>
@@ -215,7 +287,7 @@ const RecipesPage = () => {
           </div>
         ) : (
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
-            {filteredRecipes.map((recipe) => (
+            {recipes.map((recipe) => (
               <Link
                 key={recipe.id}
                 to={`/recipe/${recipe.id}`}
@@ -265,6 +337,14 @@ const RecipesPage = () => {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="text-center mt-12">
+            <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more recipes'}
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -24,6 +24,28 @@ export const recipeApi = {
     }
   },
 
+  // Search recipes, returning a page of results, the total and tag facets
+  searchRecipes: async (params = {}) => {
+    try {
+      const response = await apiClient.get('/recipes/search', { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error searching recipes:', error);
+      throw error;
+    }
+  },
+
+  // Typeahead suggestions (titles, ingredients and tags) for the search box
+  suggest: async (q, params = {}) => {
+    try {
+      const response = await apiClient.get('/suggest', { params: { q, ...params } });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching suggestions:', error);
+      throw error;
+    }
+  },
+
   // Get single recipe by ID
   getRecipe: async (id) => {
     try {
@@ -72,6 +94,20 @@ export const personalStoryApi = {
   },
 };
 
+// Homepage API methods
+export const homeApi = {
+  // Featured recipes, catalog stats and the personal story in one request
+  getHome: async () => {
+    try {
+      const response = await apiClient.get('/home');
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching homepage:', error);
+      throw error;
+    }
+  },
+};
+
 // Health check
 export const healthApi = {
   checkHealth: async () => {
@@ -88,5 +124,6 @@ export const healthApi = {
 export default {
   recipeApi,
   personalStoryApi,
+  homeApi,
   healthApi,
 };
@@ -0,0 +1,32 @@
+"""
+Shared setup for the in-process tests
+
+The backend is imported from backend/ and runs on the in-memory storage
+engine unless STORAGE_ENGINE is set, so these tests need no mongod.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("STORAGE_ENGINE", "memory")
+os.environ.setdefault("DB_NAME", "gutwise_test")
+
+
+@pytest.fixture
+def server():
+    """The server module with a freshly seeded database and empty caches"""
+    import server
+
+    async def reset():
+        await server.store.drop()
+        await server.initialize_database(force=True)
+
+    asyncio.run(reset())
+    server.response_cache.clear()
+    return server
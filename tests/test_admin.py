@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+
+
+def test_admin_endpoints_need_the_admin_token(server, monkeypatch):
+    async def statuses(headers=None):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                (await client.get(f"/api/admin/{path}", headers=headers)).status_code
+                for path in ("cache-stats", "slow-queries")
+            ]
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "")
+    assert asyncio.run(statuses({"Authorization": "Bearer "})) == [404, 404]
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "s3cret")
+    assert asyncio.run(statuses()) == [401, 401]
+    assert asyncio.run(statuses({"Authorization": "Bearer wrong"})) == [401, 401]
+    assert asyncio.run(statuses({"Authorization": "Basic s3cret"})) == [401, 401]
+    assert asyncio.run(statuses({"Authorization": "Bearer s3cret"})) == [200, 200]
+
+
+def test_slow_queries_are_explained_without_running_them_by_default(server, monkeypatch):
+    explained = []
+
+    async def explain(command, verbosity):
+        explained.append((command, verbosity))
+        return {}
+
+    monkeypatch.setattr(server.store, "explain", explain)
+    asyncio.run(server.explain_slow_query({"find": "recipes", "filter": {}}))
+    assert explained == [({"find": "recipes", "filter": {}}, "queryPlanner")]
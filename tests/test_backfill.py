@@ -0,0 +1,33 @@
+import asyncio
+from argparse import Namespace
+
+
+def test_initialization_backfills_recipes_stored_before_the_derived_fields(server, monkeypatch):
+    import manage
+
+    invalidations = []
+    monkeypatch.setattr(server, "invalidate_recipe_caches", lambda *args: invalidations.append(args))
+
+    async def scenario():
+        await server.store.insert_recipes([{
+            "id": "legacy", "title": "Legacy Broth", "prep_time": "10 mins", "cook_time": "1 hour",
+            "ingredients": ["2 cups bone broth", "Fresh ginger root"], "dietary_tags": ["paleo"],
+        }])
+        derived_fields = ("total_minutes", "ingredient_keys")
+        # Already initialized at this version: nothing is recomputed
+        await server.initialize_database()
+        assert "total_minutes" not in await server.store.get_recipe("legacy", derived_fields)
+
+        await server.store.delete_marker(server.DERIVED_FIELDS_ID)
+        await server.initialize_database(force=True)
+        legacy = await server.store.get_recipe("legacy", derived_fields)
+        assert legacy["total_minutes"] == 70
+        assert {"bone broth", "ginger root", "ginger"} <= set(legacy["ingredient_keys"])
+        marker = await server.store.get_marker(server.DERIVED_FIELDS_ID)
+        assert marker["version"] == server.DERIVED_FIELDS_VERSION
+
+        # Neither initialization nor the command touch the serving caches
+        assert await manage.cmd_backfill_derived_fields(Namespace(batch_size=2)) == 0
+        assert invalidations == []
+
+    asyncio.run(scenario())
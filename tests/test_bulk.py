@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import httpx
+
+
+def recipe(title: str) -> dict:
+    return {
+        "title": title, "description": "Bulk test recipe", "image": "https://example.com/bulk.jpg",
+        "prep_time": "5 mins", "cook_time": "5 mins", "servings": 1, "difficulty": "Easy",
+        "dietary_tags": ["vegan"], "ingredients": ["water"], "instructions": ["Boil"], "story": "",
+    }
+
+
+def test_oversized_ndjson_lines_are_reported_and_skipped(server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_NDJSON_LINE_BYTES", 400)
+    long_line = json.dumps(recipe("Long " + "x" * 1000))
+    lines = [json.dumps(recipe("Bulk One")), long_line, json.dumps(recipe("Bulk Two"))]
+    body = ("\n".join(lines) + "\n").encode()
+
+    async def chunked():
+        # Small chunks so the long line spans several reads
+        for start in range(0, len(body), 64):
+            yield body[start:start + 64]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/recipes/bulk", content=chunked(), headers={"Content-Type": "application/x-ndjson"}
+            )
+            assert response.status_code == 200, response.text
+            result = response.json()
+            assert (result["received"], result["inserted"], result["failed"]) == (3, 2, 1)
+            assert result["errors"][0]["index"] == 1
+            assert "exceeds" in result["errors"][0]["error"]
+
+            titles = {item["title"] for item in (await client.get("/api/recipes", params={"limit": 100})).json()}
+            assert {"Bulk One", "Bulk Two"} <= titles
+
+    asyncio.run(scenario())
+
+
+def test_oversized_bodies_are_refused_while_streaming(server, monkeypatch):
+    monkeypatch.setattr(server, "MAX_BULK_JSON_BYTES", 1024)
+    body = json.dumps([recipe(f"Too Big {index}") for index in range(20)]).encode()
+
+    async def chunked():
+        yield body[:512]
+        yield body[512:]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Refused from the declared length, and from the counted bytes when there is none
+            declared = await client.post("/api/recipes/bulk", content=body, headers={"Content-Type": "application/json"})
+            assert declared.status_code == 413
+            streamed = await client.post("/api/recipes/bulk", content=chunked(), headers={"Content-Type": "application/json"})
+            assert streamed.status_code == 413
+
+            small = await client.post("/api/recipes/bulk", json=[recipe("Small Enough")])
+            assert small.status_code == 200
+            assert small.json()["inserted"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+
+from cache import ResponseCache
+
+NEW_RECIPE = {
+    "title": "Test Late Porridge",
+    "description": "Created while a listing query is still running",
+    "image": "https://images.unsplash.com/photo-1517673400267-0251440c45dc?w=600&h=400&fit=crop",
+    "prep_time": "5 min",
+    "cook_time": "10 min",
+    "servings": 1,
+    "difficulty": "Easy",
+    "dietary_tags": ["gluten-free"],
+    "ingredients": ["1/2 cup oats", "1 cup water"],
+    "instructions": ["Simmer the oats in the water"],
+    "story": "Created by the cache race test."
+}
+
+
+def test_set_is_dropped_after_invalidation():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    generation = cache.generation("recipes")
+    cache.invalidate_namespace("recipes")
+    cache.set(("recipes", "page-1"), "stale", generation=generation)
+    assert cache.get(("recipes", "page-1")) is None
+    assert cache.stale_writes == 1
+
+    cache.set(("recipes", "page-1"), "fresh", generation=cache.generation("recipes"))
+    assert cache.get(("recipes", "page-1")) == "fresh"
+
+
+def test_slow_read_does_not_recache_data_from_before_a_write(server, monkeypatch):
+    find = server.store.find_recipes
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_find(*args, **kwargs):
+        """A listing query that reads its rows, then stalls until released"""
+        rows = await find(*args, **kwargs)
+        started.set()
+        await release.wait()
+        return rows
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            monkeypatch.setattr(server.store, "find_recipes", slow_find)
+            read = asyncio.create_task(client.get("/api/recipes?view=summary"))
+            await started.wait()
+            monkeypatch.setattr(server.store, "find_recipes", find)
+
+            created = (await client.post("/api/recipes", json=NEW_RECIPE)).json()
+            release.set()
+            stale = await read
+            fresh = await client.get("/api/recipes?view=summary")
+
+        assert created["id"] not in [recipe["id"] for recipe in stale.json()]
+        assert created["id"] in [recipe["id"] for recipe in fresh.json()]
+
+    asyncio.run(scenario())
+
+
+def test_home_rebuilds_are_coalesced_and_never_cache_stale_bundles(server, monkeypatch):
+    monkeypatch.setattr(server, "HOME_REBUILD_DELAY_SECONDS", 0.05)
+    count = server.store.estimated_recipe_count
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_count(*args, **kwargs):
+        result = await count(*args, **kwargs)
+        started.set()
+        await release.wait()
+        return result
+
+    async def scenario():
+        # A bundle read before a write must not be cached once the write invalidated it
+        monkeypatch.setattr(server.store, "estimated_recipe_count", slow_count)
+        stale_build = asyncio.create_task(server.build_home_bundle())
+        await started.wait()
+        monkeypatch.setattr(server.store, "estimated_recipe_count", count)
+        executions = server.single_flight.executions
+        for _ in range(5):
+            server.invalidate_recipe_caches()
+        release.set()
+        await stale_build
+        assert server.response_cache.get(("home",)) is None
+
+        # Five invalidations, one rebuild
+        await asyncio.sleep(0.2)
+        assert server.single_flight.executions == executions + 1
+        assert server.response_cache.get(("home",)) is not None
+
+    asyncio.run(scenario())
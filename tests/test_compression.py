@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+
+import compression
+
+
+def test_cached_responses_are_compressed_once_with_one_validator(server, monkeypatch):
+    compressed = []
+    original = compression.GzipCodec.compressor
+
+    def counting_compressor(codec):
+        compressed.append(codec.encoding)
+        return original(codec)
+
+    monkeypatch.setattr(compression.GzipCodec, "compressor", counting_compressor)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            gzipped = {"Accept-Encoding": "gzip"}
+            first = await client.get("/api/recipes", headers=gzipped)
+            second = await client.get("/api/recipes", headers=gzipped)
+            for response in (first, second):
+                assert response.headers["Content-Encoding"] == "gzip"
+                assert response.headers["Vary"] == "Accept-Encoding"
+            assert first.json() == second.json()
+            # Served from the cache without compressing the body again
+            assert compressed == ["gzip"]
+
+            etag = first.headers["ETag"]
+            assert etag.startswith('W/"') and second.headers["ETag"] == etag
+            revalidated = await client.get("/api/recipes", headers={**gzipped, "If-None-Match": etag})
+            assert revalidated.status_code == 304
+            assert revalidated.headers["ETag"] == etag
+            assert revalidated.headers["Vary"] == "Accept-Encoding"
+
+            # Uncompressed answers to the same URL share the validator and still vary
+            identity = await client.get("/api/recipes", headers={"Accept-Encoding": "identity"})
+            assert "Content-Encoding" not in identity.headers
+            assert identity.headers["ETag"] == etag
+            assert identity.headers["Vary"] == "Accept-Encoding"
+
+            small = await client.get("/api/", headers=gzipped)
+            assert "Content-Encoding" not in small.headers
+            assert small.headers["Vary"] == "Accept-Encoding"
+
+    asyncio.run(scenario())
@@ -0,0 +1,39 @@
+import asyncio
+import base64
+from datetime import datetime
+
+import httpx
+from bson import json_util
+
+
+def make_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_tampered_cursors_are_rejected(server):
+    tampered = [
+        {"s": "oldest", "k": 5},
+        {"s": "oldest", "k": "ab"},
+        {"s": "oldest", "k": [{"$ne": None}, ""]},
+        {"s": "oldest", "k": [datetime(2024, 1, 1), {"$gt": ""}]},
+        {"s": "total_time", "k": [True, "1"]},
+        {"s": "total_time", "k": ["10", "1"]},
+        ["oldest"],
+        "oldest",
+    ]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/api/recipes", params={"limit": 2, "view": "summary"})
+            valid = await client.get("/api/recipes", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+            assert valid.status_code == 200
+
+            for payload in tampered:
+                for sort in ("oldest", "total_time"):
+                    response = await client.get("/api/recipes", params={"sort": sort, "cursor": make_cursor(payload)})
+                    assert response.status_code == 400, (payload, sort, response.text)
+                    searched = await client.get("/api/recipes/search", params={"sort": sort, "cursor": make_cursor(payload)})
+                    assert searched.status_code == 400, (payload, sort, searched.text)
+
+    asyncio.run(scenario())
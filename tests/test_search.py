@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+
+
+def test_unfiltered_search_reads_the_counters_and_pages_share_one_count(server, monkeypatch):
+    count_recipes = server.store.count_recipes
+    aggregations = []
+
+    async def counting_count_recipes(recipe_filter):
+        aggregations.append(recipe_filter)
+        return await count_recipes(recipe_filter)
+
+    monkeypatch.setattr(server.store, "count_recipes", counting_count_recipes)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/api/recipes/search", params={"limit": 2})).json()
+            assert aggregations == []
+            assert first["total"] == 5
+            assert {facet["id"]: facet["count"] for facet in first["facets"]}["gluten-free"] == 5
+            assert [recipe["id"] for recipe in first["results"]] == ["1", "2"]
+
+            second = (await client.get("/api/recipes/search", params={"limit": 2, "cursor": first["next_cursor"]})).json()
+            assert [recipe["id"] for recipe in second["results"]] == ["3", "4"]
+            assert second["total"] == 5
+
+            # A filtered search aggregates its counts once, however many pages are loaded
+            vegan = (await client.get("/api/recipes/search", params={"dietary_tags": "vegan", "limit": 1})).json()
+            more = (await client.get("/api/recipes/search", params={"dietary_tags": "vegan", "limit": 1,
+                                                                    "cursor": vegan["next_cursor"]})).json()
+            assert len(aggregations) == 1
+            assert vegan["total"] == more["total"] == 3
+            assert vegan["results"][0]["id"] != more["results"][0]["id"]
+
+            # Writes invalidate the cached counts
+            created = await client.post("/api/recipes", json={**server.SEED_RECIPES[2], "title": "Another Sweet Potato"})
+            assert created.status_code == 200
+            again = (await client.get("/api/recipes/search", params={"dietary_tags": "vegan", "limit": 1})).json()
+            assert again["total"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_partial_words_fall_back_to_prefix_matching(server):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def titles(path, search):
+                response = (await client.get(path, params={"search": search})).json()
+                return [recipe["title"] for recipe in (response["results"] if "results" in response else response)]
+
+            # "ginger" is a whole word for the text index, "ging" only the start of one
+            assert await titles("/api/recipes", "ginger") == ["Gentle Ginger Tea"]
+            assert await titles("/api/recipes", "ging") == ["Gentle Ginger Tea"]
+            assert await titles("/api/recipes/search", "ging") == ["Gentle Ginger Tea"]
+            searched = (await client.get("/api/recipes/search", params={"search": "ging"})).json()
+            assert searched["total"] == 1
+            assert {facet["id"] for facet in searched["facets"]} == {"gluten-free", "dairy-free", "vegan"}
+
+            # Prefixes only match at the start of a word
+            assert await titles("/api/recipes", "inger") == []
+            assert await titles("/api/recipes/search", "zzzq") == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,38 @@
+import asyncio
+
+
+def test_incremental_neighbours_match_a_full_rebuild(server):
+    recipe = server.build_recipe({
+        "title": "Ginger Carrot Soup",
+        "description": "Carrots simmered with fresh ginger",
+        "image": "https://images.unsplash.com/photo-1547592166-23ac45744acd?w=600&h=400&fit=crop",
+        "prep_time": "10 min",
+        "cook_time": "25 min",
+        "servings": 2,
+        "difficulty": "Easy",
+        "dietary_tags": ["gluten-free", "vegan"],
+        "ingredients": ["2 carrots", "1 tbsp fresh ginger", "4 cups water"],
+        "instructions": ["Simmer everything", "Blend"],
+        "story": "Created by the similarity test."
+    }).dict()
+
+    async def listing(recipe_id):
+        """Recipes whose neighbours include recipe_id"""
+        ids = [seed["id"] for seed in server.SEED_RECIPES]
+        return {other for other, similar in (await server.store.get_similar_lists(ids)).items()
+                if recipe_id in {neighbour["id"] for neighbour in similar}}
+
+    async def scenario():
+        assert await server.store.insert_recipes([dict(recipe)]) == []
+        await server.update_similarities([recipe])
+        incremental = await server.store.get_similar(recipe["id"])
+        offered_to = await listing(recipe["id"])
+
+        await server.rebuild_similarities()
+        rebuilt = await server.store.get_similar(recipe["id"])
+        listed_by = await listing(recipe["id"])
+        return incremental, rebuilt, offered_to, listed_by
+
+    incremental, rebuilt, offered_to, listed_by = asyncio.run(scenario())
+    assert incremental == rebuilt
+    assert offered_to == listed_by
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+
+def test_inline_startup_fails_when_initialization_fails(server, monkeypatch):
+    rebuilt = []
+
+    async def broken_seed():
+        raise RuntimeError("seed failed")
+
+    async def rebuild_suggestions():
+        rebuilt.append(True)
+
+    async def scenario():
+        await server.store.delete_marker(server.INIT_STATE_ID)
+        with pytest.raises(RuntimeError, match="seed failed"):
+            await server.startup_event()
+
+    monkeypatch.setattr(server, "STARTUP_MODE", "inline")
+    monkeypatch.setattr(server, "seed_database", broken_seed)
+    monkeypatch.setattr(server, "rebuild_suggestions", rebuild_suggestions)
+    asyncio.run(scenario())
+
+    assert server.database_status == "failed"
+    assert rebuilt == []
+
+
+def test_background_preparation_drops_responses_cached_before_it(server, monkeypatch):
+    async def scenario():
+        server.response_cache.set(("recipes", "early"), "cached while preparing")
+        await server.prepare_worker()
+
+    monkeypatch.setattr(server, "STARTUP_MODE", "background")
+    asyncio.run(scenario())
+
+    assert server.database_status == "ready"
+    assert server.response_cache.get(("recipes", "early")) is None
@@ -0,0 +1,230 @@
+"""
+The same repository operations against every storage engine
+
+The memory engine always runs; MongoDB runs when MONGO_URL points at a mongod.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+from storage import SORT_KEYS, RecipeFilter, open_storage
+
+ENGINES = [
+    "memory",
+    pytest.param("mongodb", marks=pytest.mark.skipif(not os.environ.get("MONGO_URL"), reason="MONGO_URL is not set")),
+]
+
+
+def recipe(recipe_id, title, description, ingredients, tags, minutes, day):
+    return {
+        "id": recipe_id, "title": title, "description": description, "ingredients": ingredients,
+        "ingredient_keys": [ingredient.split()[-1] for ingredient in ingredients], "dietary_tags": tags,
+        "total_minutes": minutes, "created_at": datetime(2024, 1, day), "updated_at": datetime(2024, 1, day),
+    }
+
+
+RECIPES = [
+    recipe("1", "Ginger Tea", "Warm tea for the stomach", ["fresh ginger", "water"], ["vegan", "gluten-free"], 10, 1),
+    recipe("2", "Quinoa Porridge", "Porridge with a little ginger", ["quinoa", "coconut milk"],
+           ["vegan", "gluten-free", "dairy-free"], 25, 2),
+    recipe("3", "Salmon Bake", "Baked salmon with lemon", ["salmon", "lemon"], ["gluten-free", "paleo"], 40, 3),
+    recipe("4", "Bone Broth", "Slow simmered broth", ["beef bones", "water"], ["paleo", "keto"], None, 3),
+    recipe("5", "Banana Oat Cookies", "Soft cookies sweetened with banana", ["banana", "oats"], ["vegan"], 25, 5),
+]
+
+
+def run(engine: str, scenario):
+    """Run a scenario against a repository holding RECIPES in a throwaway database"""
+    async def main():
+        store = open_storage(engine, os.environ.get("MONGO_URL"), f"gutwise_storage_test_{uuid.uuid4().hex[:8]}")
+        try:
+            await store.ensure_indexes()
+            assert await store.insert_recipes([dict(item) for item in RECIPES]) == []
+            await scenario(store)
+        finally:
+            await store.drop()
+            store.close()
+
+    asyncio.run(main())
+
+
+async def ids(store, recipe_filter=RecipeFilter(), sort="oldest", **kwargs) -> list:
+    return [item["id"] for item in await store.find_recipes(recipe_filter, ("id",), sort, **kwargs)]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_filters(engine):
+    async def scenario(store):
+        assert await ids(store, RecipeFilter(dietary_tags=("vegan", "gluten-free"))) == ["1", "2"]
+        assert await ids(store, RecipeFilter(max_total_time=25)) == ["1", "2", "5"]
+        assert await ids(store, RecipeFilter(ingredients=("water",))) == ["1", "4"]
+        assert await ids(store, RecipeFilter(timed=True, dietary_tags=("paleo",))) == ["3"]
+        assert await ids(store, RecipeFilter(search="OAT C", search_mode="substring")) == ["5"]
+        assert await ids(store, RecipeFilter(search="^b", search_mode="regex")) == ["3", "4", "5"]
+        # Every word has to start a word somewhere in the search fields
+        assert await ids(store, RecipeFilter(search="gin", search_mode="prefix")) == ["1", "2"]
+        assert await ids(store, RecipeFilter(search="porr gin", search_mode="prefix")) == ["2"]
+        assert await ids(store, RecipeFilter(search="inger", search_mode="prefix")) == []
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_text_search_ranks_weighted_fields_first(engine):
+    async def scenario(store):
+        ranked = await store.find_recipes(RecipeFilter(search="ginger"), ("id",), "relevance")
+        assert [item["id"] for item in ranked] == ["1", "2"]
+        assert ranked[0]["score"] > ranked[1]["score"] > 0
+
+        # Stemming matches "baking" to "Baked", negation and phrases narrow the match
+        assert await ids(store, RecipeFilter(search="baking")) == ["3"]
+        assert await ids(store, RecipeFilter(search="ginger -tea")) == ["2"]
+        assert await ids(store, RecipeFilter(search='"baked salmon"')) == ["3"]
+        assert await store.has_text_match("ginger")
+        assert not await store.has_text_match("ging")
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("sort,expected", [
+    ("oldest", ["1", "2", "3", "4", "5"]),
+    ("newest", ["5", "4", "3", "2", "1"]),
+    # Untimed recipes are filtered out to order by time
+    ("total_time", ["1", "2", "5", "3"]),
+])
+def test_sorts_page_by_offset_and_keyset(engine, sort, expected):
+    recipe_filter = RecipeFilter(timed=sort == "total_time")
+
+    async def scenario(store):
+        assert await ids(store, recipe_filter, sort) == expected
+        assert await ids(store, recipe_filter, sort, offset=1, limit=2) == expected[1:3]
+
+        paged, after = [], None
+        while True:
+            page = await store.find_recipes(recipe_filter, ("id", "created_at", "total_minutes"), sort,
+                                            limit=2, after=after)
+            if not page:
+                break
+            paged += [item["id"] for item in page]
+            after = [page[-1][field] for field, _ in SORT_KEYS[sort]]
+        assert paged == expected
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_counts_and_lookups(engine):
+    async def scenario(store):
+        total, tags = await store.count_recipes(RecipeFilter(dietary_tags=("gluten-free",)))
+        assert total == 3
+        assert tags == {"gluten-free": 3, "vegan": 2, "dairy-free": 1, "paleo": 1}
+        assert await store.count_recipes(RecipeFilter(search="zzzq")) == (0, {})
+        assert await store.recipe_tag_counts() == {"vegan": 3, "gluten-free": 3, "dairy-free": 1, "paleo": 2, "keto": 1}
+        assert await store.estimated_recipe_count() == 5
+
+        assert sorted(item["id"] for item in await store.get_recipes(["5", "9", "1"], ("id",))) == ["1", "5"]
+        assert await store.get_recipe("3", ("title", "total_minutes")) == {"title": "Salmon Bake", "total_minutes": 40}
+        assert await store.get_recipe("9", ("id",)) is None
+        shared = await store.recipes_sharing("ingredient_keys", ["water", "lemon"], ["4"], ("id",), limit=5)
+        assert sorted(item["id"] for item in shared) == ["1", "3"]
+        assert [item["id"] async for item in store.iter_recipes(("id",), batch_size=2)] == ["1", "2", "3", "4", "5"]
+
+        await store.update_recipes({"4": {"total_minutes": 720}})
+        assert await ids(store, RecipeFilter(timed=True), "total_time") == ["1", "2", "5", "3", "4"]
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_insert_skips_duplicate_ids(engine):
+    async def scenario(store):
+        errors = await store.insert_recipes([{"id": "6"}, {"id": "1"}, {"id": "7"}, {"id": "6"}, {"id": "8"}])
+        assert [position for position, _ in errors] == [1, 3]
+        assert all("duplicate key" in message for _, message in errors)
+        assert sorted(item["id"] for item in await store.get_recipes([str(n) for n in range(1, 10)], ("id",))) == [
+            "1", "2", "3", "4", "5", "6", "7", "8"
+        ]
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tag_counters(engine):
+    async def scenario(store):
+        await store.apply_tag_count_deltas({"vegan": 2, "keto": 1})
+        await store.apply_tag_count_deltas({"keto": -1, "paleo": 3})
+        counters = await store.tag_counts()
+        assert [(item["tag"], item["count"]) for item in counters] == [("paleo", 3), ("vegan", 2)]
+        assert all(isinstance(item["updated_at"], datetime) for item in counters)
+
+        await store.rebuild_tag_counts()
+        assert [(item["tag"], item["count"]) for item in await store.tag_counts()] == [
+            ("gluten-free", 3), ("vegan", 3), ("paleo", 2), ("dairy-free", 1), ("keto", 1)
+        ]
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_similar_lists_and_features(engine):
+    async def scenario(store):
+        await store.replace_similar_lists({"1": [{"id": "2", "score": 0.5}], "2": [{"id": "1", "score": 0.5}]})
+        await store.update_similar_lists(
+            {"5": [{"id": "1", "score": 0.3}]},
+            {"1": [{"id": "5", "score": 0.9}, {"id": "3", "score": 0.1}]},
+            top_k=2
+        )
+        assert await store.get_similar("1") == [{"id": "5", "score": 0.9}, {"id": "2", "score": 0.5}]
+        assert await store.get_similar_lists(["5", "9"]) == {"5": [{"id": "1", "score": 0.3}]}
+
+        # A full rebuild drops the lists it doesn't write
+        await store.replace_similar_lists({"3": []})
+        assert await store.get_similar("1") is None
+        assert await store.get_similar("3") == []
+
+        await store.replace_feature_counts({"tag:vegan": 1, "ingredient:water": 2})
+        await store.add_feature_counts({"ingredient:water": 1, "ingredient:lemon": 1})
+        assert await store.feature_counts(["tag:vegan", "ingredient:water", "ingredient:lemon", "tag:keto"]) == {
+            "tag:vegan": 1, "ingredient:water": 3, "ingredient:lemon": 1
+        }
+
+    run(engine, scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_markers_locks_views_and_story(engine):
+    async def scenario(store):
+        await store.set_marker("model", {"version": 1})
+        await store.set_marker("model", {"recipes": 5})
+        assert (await store.increment_marker("model", "recipes", 2))["recipes"] == 7
+        assert (await store.get_marker("model"))["version"] == 1
+        assert await store.increment_marker("missing", "recipes", 1) is None
+        await store.delete_marker("model")
+        assert await store.get_marker("model") is None
+
+        assert await store.acquire_lock("init", "a", 60)
+        assert not await store.acquire_lock("init", "b", 60)
+        assert await store.acquire_lock("init", "a", 60)
+        await store.release_lock("init", "b")
+        assert not await store.acquire_lock("init", "b", 60)
+        await store.release_lock("init", "a")
+        assert await store.acquire_lock("init", "b", 60)
+        # An expired lock can be taken over
+        assert await store.acquire_lock("expired", "a", -1)
+        assert await store.acquire_lock("expired", "b", 60)
+
+        await store.add_recipe_views({"1": 2})
+        await store.add_recipe_views({"2": 1, "1": 1})
+        assert {item["id"]: item["views"] for item in await store.recent_recipe_views(10)} == {"1": 3, "2": 1}
+        assert len(await store.recent_recipe_views(1)) == 1
+
+        assert await store.get_personal_story(("title",)) is None
+        await store.insert_personal_story({"id": "story", "title": "My Story", "content": ["One"]})
+        assert await store.get_personal_story(("title", "content")) == {"title": "My Story", "content": ["One"]}
+
+    run(engine, scenario)
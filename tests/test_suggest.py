@@ -0,0 +1,19 @@
+from benchmarks.datagen import generate_recipes
+from suggest import SuggestIndex
+
+
+def test_batched_add_matches_a_full_build():
+    recipes = list(generate_recipes(300, seed=7))
+    full = SuggestIndex()
+    full.build(recipes)
+
+    incremental = SuggestIndex()
+    incremental.build(recipes[:200])
+    incremental.add(recipes[200:250])
+    incremental.add(recipes[250:])
+    # Recipes the index already holds are not counted again
+    incremental.add(recipes[240:260])
+
+    assert incremental._table == full._table
+    assert incremental.counts == full.counts
+    assert incremental.suggest("gin", limit=5) == full.suggest("gin", limit=5)
@@ -0,0 +1,23 @@
+import asyncio
+from argparse import Namespace
+
+
+def test_verify_tag_counts_finds_and_repairs_drift(server):
+    import manage
+
+    async def scenario():
+        assert await server.verify_tag_counts() == {}
+        # One seed recipe is keto, so this drops its counter
+        await server.store.apply_tag_count_deltas({"vegan": 3, "keto": -1})
+
+        drift = await server.verify_tag_counts()
+        assert set(drift) == {"vegan", "keto"}
+        assert drift["vegan"][0] == drift["vegan"][1] + 3
+        assert drift["keto"][0] == 0
+
+        assert await manage.cmd_verify_tag_counts(Namespace(fix=False)) == 1
+        assert await manage.cmd_verify_tag_counts(Namespace(fix=True)) == 0
+        assert await server.verify_tag_counts() == {}
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+from popularity import ViewCounter
+
+
+def test_shutdown_keeps_the_views_of_a_cancelled_flush(server, monkeypatch):
+    monkeypatch.setattr(server, "view_counter", ViewCounter(half_life=3600))
+    written = []
+
+    async def scenario():
+        started = asyncio.Event()
+        original = server.store.add_recipe_views
+
+        async def slow_add_recipe_views(counts):
+            if not written:
+                # The periodic flush hangs until shutdown cancels it
+                written.append(None)
+                started.set()
+                await asyncio.Event().wait()
+            written.append(len(counts))
+            return await original(counts)
+
+        monkeypatch.setattr(server.store, "add_recipe_views", slow_add_recipe_views)
+        server.view_counter.record("recipe-1", 3)
+        server.view_counter.record("recipe-2")
+        monkeypatch.setattr(server, "view_flusher", asyncio.create_task(server.flush_view_counts()))
+        await started.wait()
+
+        await server.shutdown_db_client()
+        assert written == [None, 2]
+        views = {viewed["id"]: viewed["views"] for viewed in await server.store.recent_recipe_views(10)}
+        assert views == {"recipe-1": 3, "recipe-2": 1}
+
+    asyncio.run(scenario())
+
+
+def test_trending_is_seeded_from_persisted_views(server, monkeypatch):
+    monkeypatch.setattr(server, "view_counter", ViewCounter(half_life=server.TRENDING_HALF_LIFE_HOURS * 3600))
+
+    ids = [recipe["id"] for recipe in server.SEED_RECIPES]
+    now = datetime.utcnow()
+    half_life = timedelta(hours=server.TRENDING_HALF_LIFE_HOURS)
+
+    async def recent_recipe_views(limit):
+        # Many views long ago rank below a few recent ones
+        return [
+            {"id": ids[1], "views": 5, "updated_at": now},
+            {"id": ids[2], "views": 8, "updated_at": now - half_life},
+            {"id": ids[0], "views": 48, "updated_at": now - 4 * half_life},
+        ]
+
+    monkeypatch.setattr(server.store, "recent_recipe_views", recent_recipe_views)
+
+    async def scenario():
+        await server.seed_trending()
+        assert server.view_counter.pending == {}
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            trending = (await client.get("/api/recipes/trending")).json()
+
+        assert [recipe["id"] for recipe in trending] == [ids[1], ids[2], ids[0]]
+        assert [round(recipe["views"]) for recipe in trending] == [5, 4, 3]
+
+    asyncio.run(scenario())